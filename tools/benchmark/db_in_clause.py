@@ -0,0 +1,80 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark the bulk node paths of the DB API with large name lists.
+
+Usage:
+    python tools/benchmark/db_in_clause.py [--connection URL] [counts...]
+
+The default connection is an in-memory SQLite database, counts default to
+1000 10000 50000.
+"""
+
+import argparse
+import time
+
+from oslo_db import options as db_options
+
+from xcat3.conf import CONF
+
+DEFAULT_COUNTS = (1000, 10000, 50000)
+
+
+def _timed(label, func, *args, **kwargs):
+    start = time.time()
+    ret = func(*args, **kwargs)
+    print('  %-24s %8.3f sec' % (label, time.time() - start))
+    return ret
+
+
+def run(count):
+    from xcat3.db.sqlalchemy import api as db_api
+
+    conn = db_api.Connection()
+    names = ['bench%d' % i for i in range(count)]
+    values = [{'name': name, 'mgt': 'ipmi', 'netboot': 'pxe',
+               'nics_info': {'nics': [{'mac': '42:87:0a:%02x:%02x:%02x' % (
+                   i >> 16 & 0xff, i >> 8 & 0xff, i & 0xff)}]}}
+              for i, name in enumerate(names)]
+    print('%d nodes (max_in_clause_size=%d)' % (
+        count, CONF.database.max_in_clause_size))
+    _timed('create_nodes', conn.create_nodes, values)
+    nodes = _timed('get_node_in', conn.get_node_in, names)
+    ids = [node.id for node in nodes]
+    _timed('get_nics_in_node_ids', conn.get_nics_in_node_ids, ids)
+    _timed('reserve_nodes', conn.reserve_nodes, 'bench', names)
+    _timed('release_nodes', conn.release_nodes, 'bench', names)
+    _timed('destroy_nodes', conn.destroy_nodes, ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--connection', default='sqlite://')
+    parser.add_argument('counts', nargs='*', type=int,
+                        default=DEFAULT_COUNTS)
+    args = parser.parse_args()
+
+    db_options.set_defaults(CONF)
+    CONF([], project='xcat3')
+    CONF.set_override('connection', args.connection, group='database')
+
+    from oslo_db.sqlalchemy import enginefacade
+    from xcat3.db.sqlalchemy import models
+    engine = enginefacade.get_legacy_facade().get_engine()
+    models.Base.metadata.create_all(engine)
+
+    for count in args.counts:
+        run(count)
+
+
+if __name__ == '__main__':
+    main()
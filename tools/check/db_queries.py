@@ -0,0 +1,123 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Check the indexes and the chunked IN clauses of the node queries.
+
+Usage:
+    python tools/check/db_queries.py
+
+Against an in-memory SQLite database, check that:
+- the nodes table has the reservation and conductor_affinity indexes, and
+  the reservation lookups of the node locking use them.
+- the bulk node queries split the names into IN clauses of at most
+  [database]max_in_clause_size values, and merge the results.
+"""
+
+import re
+import sys
+
+from oslo_db import options as db_options
+from sqlalchemy import event
+from sqlalchemy import inspect
+
+from xcat3.conf import CONF
+
+CHUNK = 10
+COUNT = 35
+INDEXES = ('nodes_reservation_name_idx', 'nodes_conductor_affinity_idx')
+
+
+class _Statements(object):
+    """Record the statements executed on the engine."""
+
+    def __init__(self, engine):
+        self.statements = []
+        event.listen(engine, 'before_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context,
+                executemany):
+        self.statements.append((statement, parameters))
+
+    def in_sizes(self, verb):
+        """Return the number of values of each IN clause of the verb."""
+        sizes = []
+        for statement, parameters in self.statements:
+            if not statement.lstrip().upper().startswith(verb):
+                continue
+            for values in re.findall(r'IN \(([^)]*)\)', statement):
+                sizes.append(values.count('?'))
+        return sizes
+
+    def clear(self):
+        del self.statements[:]
+
+
+def _check(failures, label, ok, detail):
+    print('%-40s %s' % (label, 'OK' if ok else 'FAIL: %s' % detail))
+    if not ok:
+        failures.append(label)
+
+
+def main():
+    db_options.set_defaults(CONF)
+    CONF([], project='xcat3')
+    CONF.set_override('connection', 'sqlite://', group='database')
+    CONF.set_override('max_in_clause_size', CHUNK, group='database')
+
+    from oslo_db.sqlalchemy import enginefacade
+    from xcat3.db.sqlalchemy import api as db_api
+    from xcat3.db.sqlalchemy import models
+    engine = enginefacade.get_legacy_facade().get_engine()
+    models.Base.metadata.create_all(engine)
+    failures = []
+
+    names = set(i['name'] for i in inspect(engine).get_indexes('nodes'))
+    missing = [name for name in INDEXES if name not in names]
+    _check(failures, 'nodes indexes', not missing, 'missing %s' % missing)
+    plan = engine.execute(
+        'EXPLAIN QUERY PLAN SELECT id FROM nodes '
+        'WHERE reservation IS NULL AND name IN (?, ?)', ('a', 'b')).fetchall()
+    plan = ' '.join(str(tuple(row)[-1]) for row in plan)
+    _check(failures, 'reservation lookup uses the index',
+           INDEXES[0] in plan, plan)
+
+    conn = db_api.Connection()
+    node_names = ['check%d' % i for i in range(COUNT)]
+    conn.create_nodes([{'name': name, 'mgt': 'ipmi', 'netboot': 'pxe'}
+                       for name in node_names])
+    statements = _Statements(engine)
+    expected = [CHUNK] * (COUNT // CHUNK) + [COUNT % CHUNK]
+
+    nodes = conn.get_node_in(node_names)
+    sizes = statements.in_sizes('SELECT')
+    _check(failures, 'get_node_in chunks',
+           sorted(sizes, reverse=True) == expected and
+           len(nodes) == COUNT,
+           'IN sizes %s, %d nodes' % (sizes, len(nodes)))
+
+    statements.clear()
+    conn.reserve_nodes('check', node_names)
+    sizes = statements.in_sizes('UPDATE')
+    _check(failures, 'reserve_nodes chunks',
+           sorted(sizes, reverse=True) == expected, 'IN sizes %s' % sizes)
+
+    statements.clear()
+    conn.release_nodes('check', node_names)
+    sizes = statements.in_sizes('UPDATE')
+    _check(failures, 'release_nodes chunks',
+           sorted(sizes, reverse=True) == expected, 'IN sizes %s' % sizes)
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
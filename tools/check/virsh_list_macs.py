@@ -0,0 +1,77 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Run the virsh list_macs command of the ssh driver through a shell.
+
+Usage:
+    python tools/check/virsh_list_macs.py
+
+A fake virsh prints two domains followed by the blank line the real
+`virsh list --all --name` always ends with. The command must print one
+"<domain> <mac>" pair per interface and exit with status 0, otherwise
+processutils.ssh_execute raises SSHCommandFailed for every lookup.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from xcat3.plugins.control import ssh
+
+FAKE_VIRSH = """#!/bin/sh
+if [ "$1" = list ]; then
+    printf 'vm1\\nvm2\\n\\n'
+    exit 0
+fi
+echo "<domain><name>$2</name>"
+echo "  <mac address='52:54:00:00:00:01'/>"
+if [ "$2" = vm2 ]; then
+    echo "  <mac address='52:54:00:00:00:02'/>"
+fi
+echo "</domain>"
+"""
+
+EXPECTED = ['vm1 52:54:00:00:00:01',
+            'vm2 52:54:00:00:00:01',
+            'vm2 52:54:00:00:00:02']
+
+
+def main():
+    tmpdir = tempfile.mkdtemp()
+    try:
+        virsh = os.path.join(tmpdir, 'virsh')
+        with open(virsh, 'w') as f:
+            f.write(FAKE_VIRSH)
+        os.chmod(virsh, 0o755)
+
+        cmd = ssh._get_command_sets('virsh')['list_macs']
+        cmd = cmd.replace('{_BaseCmd_}', 'LC_ALL=C %s' % virsh)
+        proc = subprocess.Popen(['/bin/sh', '-c', cmd],
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE)
+        stdout, stderr = proc.communicate()
+    finally:
+        shutil.rmtree(tmpdir)
+
+    lines = stdout.decode('utf-8').splitlines()
+    if proc.returncode != 0 or lines != EXPECTED:
+        print('FAIL: exit status %d, output %r, stderr %r' % (
+            proc.returncode, lines, stderr))
+        return 1
+    print('OK')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
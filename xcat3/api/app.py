@@ -32,9 +32,9 @@ def get_pecan_config():
     return pecan.configuration.conf_from_file(filename)
 
 
-def setup_app(pecan_config=None, extra_hooks=None):
+def setup_app(pecan_config=None, extra_hooks=None, rpc_hook=None):
     app_hooks = [hooks.ConfigHook(),
-                 hooks.RPCHook(),
+                 rpc_hook or hooks.RPCHook(),
                  hooks.DBHook(),
                  hooks.ContextHook(pecan_config.app.acl_public_routes),
                  hooks.NoExceptionTracebackHook(),
@@ -57,7 +57,12 @@ def setup_app(pecan_config=None, extra_hooks=None):
 class VersionSelectorApplication(object):
     def __init__(self):
         pc = get_pecan_config()
-        self.v1 = setup_app(pecan_config=pc)
+        self.rpc_hook = hooks.RPCHook()
+        self.v1 = setup_app(pecan_config=pc, rpc_hook=self.rpc_hook)
 
     def __call__(self, environ, start_response):
         return self.v1(environ, start_response)
+
+    def stop(self):
+        """Release the rpc clients shared by the requests."""
+        self.rpc_hook.stop()
@@ -25,6 +25,7 @@ from wsme import types as wtypes
 
 from xcat3.api.controllers import base
 from xcat3.api.controllers import link
+from xcat3.api.controllers.v1 import job
 from xcat3.api.controllers.v1 import node
 from xcat3.api.controllers.v1 import network
 from xcat3.api.controllers.v1 import osimage
@@ -100,6 +101,7 @@ class Controller(rest.RestController):
     passwds = passwd.PasswdController()
     nics = nic.NicController()
     services = service.ServiceController()
+    jobs = job.JobsController()
 
     @expose.expose(V1)
     def get(self):
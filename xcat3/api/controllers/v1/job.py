@@ -0,0 +1,227 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Asynchronous jobs for the bulk node operations.
+
+Instead of holding the http request until every conductor replies, the
+node controllers can hand the rpc futures over to a job and return its
+uuid at once. A greenthread of the api worker collects the futures as
+they finish and saves the progressive result in the database, so any api
+worker can answer the polls and the event streams of the job.
+
+The results arrive per rpc call, that is per group of at most
+[api]per_group_count nodes sent to one conductor. A job still running long
+after [api]timeout lost the api worker running it, it is finished with an
+error when it is read.
+"""
+
+import datetime
+import time
+
+import eventlet
+from futurist import waiters
+from oslo_log import log
+from oslo_serialization import jsonutils
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
+import pecan
+from pecan import rest
+import six
+from six.moves import http_client
+import webob
+from wsme import types as wtypes
+
+from xcat3.api.controllers import base
+from xcat3.api.controllers import link
+from xcat3.api.controllers.v1 import types
+from xcat3.api.controllers.v1 import utils as api_utils
+from xcat3.api import expose
+from xcat3.common import exception
+from xcat3.common.i18n import _, _LE
+from xcat3.common import states
+import xcat3.conf
+
+CONF = xcat3.conf.CONF
+
+LOG = log.getLogger(__name__)
+
+dbapi = base.dbapi
+
+# Seconds a job may run after [api]timeout to finish and save its result.
+_STALE_GRACE = 60
+
+
+def _save(job_uuid, result, state=states.JOB_RUNNING):
+    try:
+        dbapi.update_job(job_uuid, {'state': state, 'result': result})
+    except Exception:
+        LOG.exception(_LE('Failed to save the result of job %(job)s'),
+                      {'job': job_uuid})
+
+
+def _run(job_uuid, futures, result, finish):
+    """Collect the rpc futures of the job until they finish or time out."""
+    pending = list(futures)
+    deadline = time.time() + CONF.api.timeout
+    interval = CONF.api.job_update_interval
+    saved = time.time()
+    changed = False
+    try:
+        while pending:
+            now = time.time()
+            timeout = deadline - now
+            if timeout <= 0:
+                break
+            if changed:
+                # Wake up in time to save what is already collected.
+                timeout = min(timeout, max(0, saved + interval - now))
+            waiters.wait_for_any(pending, timeout)
+            done = [f for f in pending if f.done()]
+            if done:
+                pending = [f for f in pending if not f.done()]
+                api_utils.fill_rpc_result(result, done)
+                changed = True
+            if changed and pending and time.time() >= saved + interval:
+                _save(job_uuid, result)
+                saved = time.time()
+                changed = False
+
+        api_utils.fill_rpc_timeout(result, pending)
+        if finish is not None:
+            finish(result)
+    except Exception as e:
+        LOG.exception(_LE('Unexpected exception in job %(job)s'),
+                      {'job': job_uuid})
+        result['error'] = six.text_type(e)
+    _save(job_uuid, result, states.JOB_DONE)
+
+
+def start_job(action, futures, names, result, finish=None):
+    """Collect the results of the rpc futures in a job.
+
+    :param action: the name of the node operation.
+    :param futures: the rpc future objects.
+    :param names: the node names the futures work on.
+    :param result: the result dict of the nodes already known to fail.
+    :param finish: optional callable run with the result dict once all the
+                   futures are collected, it may not use the pecan request.
+    :returns: json type result with the uuid of the job.
+    """
+    # Expired jobs are purged by the new ones, no periodic task is needed
+    # in the api service.
+    dbapi.destroy_jobs_before(timeutils.utcnow() - datetime.timedelta(
+        seconds=CONF.api.job_ttl))
+    job_uuid = uuidutils.generate_uuid()
+    total = len(names) + len(result['nodes'])
+    state = states.JOB_RUNNING if futures else states.JOB_DONE
+    dbapi.create_job({'uuid': job_uuid, 'action': action, 'state': state,
+                      'total': total, 'result': result})
+    if futures:
+        eventlet.spawn_n(_run, job_uuid, futures, result, finish)
+    pecan.response.location = link.build_url('jobs', job_uuid)
+    return types.JsonType.validate({'job': job_uuid, 'action': action,
+                                    'state': state, 'total': total})
+
+
+def _check_stale(job):
+    """Finish the job if the api worker running it is gone."""
+    if job.state != states.JOB_RUNNING or job.created_at is None:
+        return job
+    limit = job.created_at + datetime.timedelta(
+        seconds=CONF.api.timeout + _STALE_GRACE)
+    if timeutils.utcnow() < limit:
+        return job
+    result = dict(job.result or {})
+    result['error'] = _('The job was abandoned by the api worker running '
+                        'it, the nodes without result may still be in '
+                        'progress.')
+    _save(job.uuid, result, states.JOB_DONE)
+    job.state = states.JOB_DONE
+    job.result = result
+    return job
+
+
+def _isotime(value):
+    return value.isoformat() if value is not None else None
+
+
+def _format_job(job):
+    result = job.result or {}
+    ret = dict((k, v) for k, v in six.iteritems(result) if k != 'nodes')
+    ret.update({'job': job.uuid, 'action': job.action, 'state': job.state,
+                'total': job.total,
+                'completed': len(result.get('nodes', {})),
+                'created_at': _isotime(job.created_at),
+                'updated_at': _isotime(job.updated_at)})
+    return ret
+
+
+def _event(name, data):
+    return 'event: %s\ndata: %s\n\n' % (name, jsonutils.dumps(data))
+
+
+def _stream(job_uuid):
+    """Yield the server-sent events of the job.
+
+    A `nodes` event carries the results of the nodes finished since the
+    previous event, the last event is `done` with the summary of the job.
+    """
+    sent = set()
+    while True:
+        try:
+            job = _check_stale(dbapi.get_job_by_uuid(job_uuid))
+        except exception.JobNotFound:
+            return
+        nodes = (job.result or {}).get('nodes', {})
+        new = dict((k, v) for k, v in six.iteritems(nodes) if k not in sent)
+        if new:
+            sent.update(new)
+            yield _event('nodes', new)
+        if job.state == states.JOB_DONE:
+            yield _event('done', _format_job(job))
+            return
+        eventlet.sleep(CONF.api.job_poll_interval)
+
+
+class JobEventsController(rest.RestController):
+    """Stream the results of a job as server-sent events."""
+
+    @pecan.expose()
+    def get_one(self, job_uuid):
+        try:
+            dbapi.get_job_by_uuid(job_uuid)
+        except exception.JobNotFound as e:
+            pecan.abort(http_client.NOT_FOUND, six.text_type(e))
+        # A new response, so the body is streamed instead of buffered.
+        return webob.Response(app_iter=_stream(job_uuid),
+                              content_type='text/event-stream',
+                              cache_control='no-cache', charset=None)
+
+
+class JobsController(rest.RestController):
+    """REST controller for the asynchronous jobs."""
+
+    events = JobEventsController()
+
+    @expose.expose(types.jsontype, wtypes.text, types.boolean)
+    def get_one(self, job_uuid, nodes=True):
+        """Retrieve the progress and the results of a job.
+
+        :param job_uuid: the uuid of the job.
+        :param nodes: whether to return the result of each node, False to
+                      only poll the progress.
+        """
+        job = _check_stale(dbapi.get_job_by_uuid(job_uuid))
+        ret = _format_job(job)
+        if nodes:
+            ret['nodes'] = (job.result or {}).get('nodes', {})
+        return types.JsonType.validate(ret)
@@ -15,6 +15,7 @@
 #    under the License.
 
 import datetime
+import functools
 import pecan
 from oslo_log import log
 from pecan import rest
@@ -36,6 +37,7 @@ from xcat3.common.i18n import _, _LE, _LI, _LW
 from xcat3.api.controllers import base
 from xcat3.api.controllers import link
 from xcat3.api.controllers.v1 import collection
+from xcat3.api.controllers.v1 import job
 from xcat3.api.controllers.v1 import utils as api_utils
 from xcat3.common import states as xcat3_states
 from xcat3 import objects
@@ -69,29 +71,44 @@ def _wait_rpc_result(futures, names, result, json=True):
     """
     done, not_done = pecan.request.rpcapi.wait_workers(futures,
                                                        CONF.api.timeout)
-    for r in done:
-        nodes = getattr(r, 'nodes', None)
-        if r.exception():
-            LOG.exception(_LE('Error in wait_workers %(err)s'),
-                          {'err': six.text_type(r.exception())})
-            if nodes:
-                utils.fill_result(result['nodes'], nodes,
-                                  r.exception().message)
-            else:
-                result['error'] = r.exception().message
-            if hasattr(r.exception(), 'code'):
-                result['errorcode'] = r.exception().code
-        else:
-            # Manager should return a dict result
-            utils.fill_dict_result(result['nodes'], r.result())
+    api_utils.fill_rpc_result(result, done)
+    api_utils.fill_rpc_timeout(result, not_done)
+    return types.JsonType.validate(result) if json else result
 
-    msg = "Timeout after waiting %(timeout)d seconds" % {
-        "timeout": CONF.api.timeout}
-    for r in not_done:
-        nodes = getattr(r, 'nodes', None)
-        utils.fill_result(result['nodes'], nodes, msg)
 
-    return types.JsonType.validate(result) if json else result
+def _rpc_result(action, futures, names, result, wait, finish=None):
+    """Return the result from rpc call, or the job collecting it.
+
+    :param action: the name of the node operation.
+    :param futures: api worker objects
+    :param names: node list for rpc request
+    :param result: node dict for the result
+    :param wait: if False, return a job at once instead of waiting the
+                 result, see xcat3.api.controllers.v1.job.
+    :param finish: optional callable run with the result dict after all
+                   the rpc calls finish.
+    :return: json type result
+    """
+    if not wait:
+        return job.start_job(action, futures, names, result, finish=finish)
+    result = _wait_rpc_result(futures, names, result, False)
+    if finish is not None:
+        finish(result)
+    return types.JsonType.validate(result)
+
+
+def _enable_dhcp_option(network_api, context, subnet, names, result):
+    try:
+        # As rpc result from conductor nodes has came back, the async calls
+        # should be accepted by the network service node. Here, we build
+        # dhcp options for all the split parts together.
+        network_api.enable_dhcp_option(context, subnet)
+    except Exception as e:
+        LOG.exception(_LE(
+            'Unexpected exception while activating dhcp service '
+            '%(err)s'), {'err': six.text_type(traceback.format_exc())})
+        utils.fill_result(result['nodes'], names,
+                          base.EXCEPTION_MSG % e.message)
 
 
 def _filter_unavailable_nodes(names, share=False):
@@ -251,15 +268,17 @@ class NodeProvisionController(rest.RestController):
     }
 
     @expose.expose(types.jsontype, wtypes.text,
-                   wtypes.text, wtypes.text,
+                   wtypes.text, wtypes.text, types.boolean,
                    body=NodeCollection,
                    status_code=http_client.ACCEPTED)
-    def put(self, target, osimage=None, subnet=None, nodes=None):
+    def put(self, target, osimage=None, subnet=None, wait=True, nodes=None):
         """Set the provision state of the nodes.
 
         :param target: The desired state of the node.
         :param osimage: The osimage to deploy.
         :param subnet: the subnet used for deploying
+        :param wait: if False, return the uuid of the job collecting the
+                     results at once.
         :param nodes: the name of nodes.
         :raises: ClientSideError (HTTP 409) if a provision operation is
                  already in progress.
@@ -299,20 +318,11 @@ class NodeProvisionController(rest.RestController):
         else:
             futures = pecan.request.rpcapi.clean(context, result, names)
 
-        result = _wait_rpc_result(futures, names, result, False)
-        try:
-            # As rpc result from conductor nodes has came back, the async calls
-            # should be accepted by the network service node. Here, we build
-            # dhcp options for all the split parts together.
-            pecan.request.network_api.enable_dhcp_option(context, subnet)
-        except Exception as e:
-            LOG.exception(_LE(
-                'Unexpected exception while activating dhcp service '
-                '%(err)s'), {'err': six.text_type(traceback.format_exc())})
-            utils.fill_result(result['nodes'], names,
-                              base.EXCEPTION_MSG % e.message)
-
-        return types.JsonType.validate(result)
+        finish = functools.partial(_enable_dhcp_option,
+                                   pecan.request.network_api, context,
+                                   subnet, names)
+        return _rpc_result('provision', futures, names, result, wait,
+                           finish=finish)
 
     @expose.expose(types.jsontype, wtypes.text, body=types.jsontype)
     def callback(self, name, action=None):
@@ -338,15 +348,17 @@ class NodeProvisionController(rest.RestController):
 
 
 class BootDeviceController(rest.RestController):
-    @expose.expose(types.jsontype, wtypes.text, body=NodeCollection,
-                   status_code=http_client.ACCEPTED)
-    def put(self, target, nodes):
+    @expose.expose(types.jsontype, wtypes.text, types.boolean,
+                   body=NodeCollection, status_code=http_client.ACCEPTED)
+    def put(self, target, wait=True, nodes=None):
         """Set the boot device for nodes.
 
         Set the boot device to use on next reboot of the nodes.
 
         :param nodes: list of nodes
         :param boot_device: the boot device.
+        :param wait: if False, return the uuid of the job collecting the
+                     results at once.
         :returns: json format about the status of nodes
         """
         if target not in boot_device.BOOT_DEVS:
@@ -357,13 +369,14 @@ class BootDeviceController(rest.RestController):
         result, names = _filter_unavailable_nodes(names)
         futures = pecan.request.rpcapi.set_boot_device(
             pecan.request.context, names, target)
-        result = _wait_rpc_result(futures, names, result)
-        return result
+        return _rpc_result('set_boot_device', futures, names, result, wait)
 
-    @expose.expose(types.jsontype, body=NodeCollection)
-    def get(self, nodes):
+    @expose.expose(types.jsontype, types.boolean, body=NodeCollection)
+    def get(self, wait=True, nodes=None):
         """Get the current boot device for a node.
 
+        :param wait: if False, return the uuid of the job collecting the
+                     results at once.
         :param nodes: list of node to check
         :returns: json format about the status of nodes
         """
@@ -371,32 +384,34 @@ class BootDeviceController(rest.RestController):
         result, names = _filter_unavailable_nodes(names)
         futures = pecan.request.rpcapi.get_boot_device(
             pecan.request.context, names)
-        result = _wait_rpc_result(futures, names, result)
-        return result
+        return _rpc_result('get_boot_device', futures, names, result, wait)
 
 
 class NodePowerController(rest.RestController):
-    @expose.expose(types.jsontype, body=NodeCollection)
-    def get(self, nodes):
+    @expose.expose(types.jsontype, types.boolean, body=NodeCollection)
+    def get(self, wait=True, nodes=None):
         """List the states of the node.
 
+        :param wait: if False, return the uuid of the job collecting the
+                     results at once.
         :param node_name: The name of a node.
         """
         names = [node.name for node in nodes.nodes]
         result, names = _filter_unavailable_nodes(names)
         futures = pecan.request.rpcapi.get_power_state(
             pecan.request.context, names)
-        result = _wait_rpc_result(futures, names, result)
-        return result
+        return _rpc_result('get_power_state', futures, names, result, wait)
 
     @expose.expose(types.jsontype, wtypes.text,
-                   wtypes.text,
+                   types.boolean,
                    body=NodeCollection,
                    status_code=http_client.ACCEPTED)
-    def put(self, target, nodes):
+    def put(self, target, wait=True, nodes=None):
         """Set the power state of the node.
 
         :param target: The desired power state of the node.
+        :param wait: if False, return the uuid of the job collecting the
+                     results at once.
         :param nodes: the name of nodes.
         :raises: ClientSideError (HTTP 409) if a power operation is
                  already in progress.
@@ -411,9 +426,10 @@ class NodePowerController(rest.RestController):
         result, names = _filter_unavailable_nodes(names)
         futures = pecan.request.rpcapi.change_power_state(
             pecan.request.context, names, target=target)
-        result = _wait_rpc_result(futures, names, result)
-        url_args = '/'.join('states')
-        pecan.response.location = link.build_url('nodes', url_args)
+        result = _rpc_result('set_power_state', futures, names, result, wait)
+        if wait:
+            url_args = '/'.join('states')
+            pecan.response.location = link.build_url('nodes', url_args)
         return result
 
 
@@ -575,14 +591,16 @@ class NodesController(rest.RestController):
             result = bulk_create(nodes, result)
         return types.JsonType.validate(result)
 
-    @expose.expose(types.jsontype, body=NodeCollection,
+    @expose.expose(types.jsontype, types.boolean, body=NodeCollection,
                    status_code=http_client.ACCEPTED)
-    def delete(self, nodes):
+    def delete(self, wait=True, nodes=None):
         """Delete nodes
 
         Dispatch the request to multiple conductors to perform the delete
         action.
 
+        :param wait: if False, return the uuid of the job collecting the
+                     results at once.
         :param nodes: nodes to delete, api format
         :return: json fomat result
         """
@@ -595,9 +613,7 @@ class NodesController(rest.RestController):
         # delete nodes
         futures = pecan.request.rpcapi.destroy_nodes(
             pecan.request.context, names)
-
-        result = _wait_rpc_result(futures, names, result)
-        return types.JsonType.validate(result)
+        return _rpc_result('delete', futures, names, result, wait)
 
     @expose.expose(types.jsontype, body=types.jsontype)
     def patch(self, patch_dict):
@@ -17,23 +17,62 @@ import inspect
 
 import jsonpatch
 from oslo_config import cfg
+from oslo_log import log
 from oslo_utils import uuidutils
 import pecan
+import six
 import wsme
 
 from xcat3.api.controllers.v1 import versions
 from xcat3.common import exception
-from xcat3.common.i18n import _
+from xcat3.common.i18n import _, _LE
 from xcat3.common import utils
 from xcat3 import objects
 
 CONF = cfg.CONF
 
+LOG = log.getLogger(__name__)
+
 JSONPATCH_EXCEPTIONS = (jsonpatch.JsonPatchException,
                         jsonpatch.JsonPointerException,
                         KeyError)
 
 
+def fill_rpc_result(result, done):
+    """Fill the results of the finished rpc futures.
+
+    :param result: the result dict with the `nodes` dict to fill.
+    :param done: the finished future objects.
+    """
+    for r in done:
+        nodes = getattr(r, 'nodes', None)
+        if r.cancelled():
+            # Not started before the timeout
+            fill_rpc_timeout(result, [r])
+        elif r.exception():
+            LOG.exception(_LE('Error in wait_workers %(err)s'),
+                          {'err': six.text_type(r.exception())})
+            if nodes:
+                utils.fill_result(result['nodes'], nodes,
+                                  r.exception().message)
+            else:
+                result['error'] = r.exception().message
+            if hasattr(r.exception(), 'code'):
+                result['errorcode'] = r.exception().code
+        else:
+            # Manager should return a dict result
+            utils.fill_dict_result(result['nodes'], r.result())
+
+
+def fill_rpc_timeout(result, not_done):
+    """Fill the timeout message for the nodes of the unfinished futures."""
+    msg = "Timeout after waiting %(timeout)d seconds" % {
+        "timeout": CONF.api.timeout}
+    for r in not_done:
+        nodes = getattr(r, 'nodes', None)
+        utils.fill_result(result['nodes'], nodes, msg)
+
+
 def validate_limit(limit):
     if limit is None:
         return CONF.api.max_limit
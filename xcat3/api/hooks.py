@@ -64,11 +64,29 @@ class ContextHook(hooks.PecanHook):
 
 
 class RPCHook(hooks.PecanHook):
-    """Attach the rpcapi object to the request so controllers can get to it."""
+    """Attach the rpcapi object to the request so controllers can get to it.
+
+    The rpc clients and the worker pool of ConductorAPI are shared by all
+    the requests of the api worker process. They are created by the first
+    request, after the api worker process is forked, and released by stop().
+    """
+
+    def __init__(self):
+        self._rpcapi = None
+        self._network_api = None
 
     def before(self, state):
-        state.request.rpcapi = rpcapi.ConductorAPI()
-        state.request.network_api = network_api.NetworkAPI()
+        if self._rpcapi is None:
+            self._rpcapi = rpcapi.ConductorAPI()
+            self._network_api = network_api.NetworkAPI()
+        state.request.rpcapi = self._rpcapi
+        state.request.network_api = self._network_api
+
+    def stop(self):
+        if self._rpcapi is not None:
+            self._rpcapi.stop()
+        self._rpcapi = None
+        self._network_api = None
 
 
 class NoExceptionTracebackHook(hooks.PecanHook):
@@ -85,17 +103,18 @@ class NoExceptionTracebackHook(hooks.PecanHook):
     # catches and handles all the errors, so 'on_error' dedicated for unhandled
     # exceptions never fired.
     def after(self, state):
-        # Omit empty body. Some errors may not have body at this level yet.
-        if not state.response.body:
-            return
-
         # Do nothing if there is no error.
         # Status codes in the range 200 (OK) to 399 (400 = BAD_REQUEST) are not
-        # an error.
+        # an error. Checked first, reading the body of a streamed response
+        # would consume it.
         if (http_client.OK <= state.response.status_int <
                 http_client.BAD_REQUEST):
             return
 
+        # Omit empty body. Some errors may not have body at this level yet.
+        if not state.response.body:
+            return
+
         json_body = state.response.json
         # Do not remove traceback when traceback config is set
         if cfg.CONF.debug_tracebacks_in_api:
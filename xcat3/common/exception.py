@@ -193,6 +193,10 @@ class PasswdNotFound(NotFound):
     _msg_fmt = _("Passwd %(key)s could not be found")
 
 
+class JobNotFound(NotFound):
+    _msg_fmt = _("Job %(job)s could not be found")
+
+
 class NoValidHost(NotFound):
     _msg_fmt = _("No valid host was found. Reason: %(reason)s")
 
@@ -353,6 +357,14 @@ class IPMIFailure(XCAT3Exception):
     _msg_fmt = _("IPMI call failed: %(cmd)s.")
 
 
+class OpenBMCFailure(XCAT3Exception):
+    _msg_fmt = _("OpenBMC request failed: %(cmd)s.")
+
+
+class ProcessWorkerError(XCAT3Exception):
+    _msg_fmt = _("Worker process error: %(err)s")
+
+
 class PowerStateFailure(InvalidState):
     _msg_fmt = _("Failed to set node power state to %(pstate)s.")
 
@@ -0,0 +1,248 @@
+# coding=utf-8
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Write the files of a batch of nodes off the eventlet hub."""
+
+import collections
+import errno
+import os
+
+import eventlet
+from eventlet import tpool
+from oslo_log import log
+from oslo_utils import fileutils
+import six
+
+from xcat3.common import exception
+from xcat3.common import utils
+from xcat3.conf import CONF
+
+LOG = log.getLogger(__name__)
+
+_WRITE = 'write'
+_RENDER = 'render'
+_LINK = 'link'
+# Number of templates rendered between two yields to the other greenthreads
+# if there is no worker process.
+_RENDER_YIELD = 100
+
+
+def _render_chunk(jobs):
+    """Render the templates, a failed template does not fail the others.
+
+    :returns: the list of (True, rendered content) or (False, error message).
+    """
+    results = []
+    for template, params in jobs:
+        try:
+            results.append((True, utils.get_template(template).render(params)))
+        except Exception as e:
+            results.append((False, six.text_type(e)))
+    return results
+
+
+class FileBatch(object):
+    """Collect the files of a batch of nodes and write them at once.
+
+    The plugins record the files and the symbolic links of each node
+    instead of touching the file system from the greenthread of the node.
+    commit() renders the recorded templates, with the worker processes if
+    a process pool is given, creates the parent directories once, then
+    writes the files of the nodes in chunks with the native threads of
+    eventlet.tpool, so the blocking system calls do not stall the eventlet
+    hub.
+    """
+
+    def __init__(self):
+        # node name -> list of operations in order
+        self._ops = collections.OrderedDict()
+
+    def _add(self, name, op):
+        self._ops.setdefault(name, []).append(op)
+
+    def write(self, name, path, contents):
+        """Record a file to write for the node.
+
+        A symbolic link at the path is replaced by the file instead of
+        writing through it.
+
+        :param name: the node name.
+        :param path: the file path.
+        :param contents: the file contents.
+        """
+        self._add(name, (_WRITE, path, contents))
+
+    def render(self, name, path, template, params):
+        """Record a file to render from a Jinja2 template for the node.
+
+        :param name: the node name.
+        :param path: the file path.
+        :param template: full path to the Jinja2 template file.
+        :param params: dictionary with parameters to use when rendering,
+                       it is pickled if rendered in a worker process.
+        """
+        self._add(name, (_RENDER, path, (template, params)))
+
+    def symlink(self, name, source, link):
+        """Record a symbolic link to create for the node.
+
+        Whatever exists at the link path is replaced, so the link always
+        points to the source.
+
+        :param name: the node name.
+        :param source: the path the link points to.
+        :param link: the path of the link.
+        """
+        self._add(name, (_LINK, source, link))
+
+    def discard(self, name):
+        """Forget the files recorded for the node."""
+        self._ops.pop(name, None)
+
+    @staticmethod
+    def _target(op):
+        kind, path, arg = op
+        return arg if kind == _LINK else path
+
+    @staticmethod
+    def _ensure_dirs(dirs):
+        errors = {}
+        for path in dirs:
+            try:
+                fileutils.ensure_tree(path)
+            except OSError as e:
+                errors[path] = e
+        return errors
+
+    @staticmethod
+    def _write(path, contents):
+        if os.path.islink(path):
+            os.unlink(path)
+        utils.write_to_file(path, contents)
+
+    @staticmethod
+    def _symlink(source, link):
+        # Create the link aside and rename it over the old path, so the
+        # path is never missing for the tftp server.
+        tmp = '%s.tmp' % link
+        try:
+            os.unlink(tmp)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+        os.symlink(source, tmp)
+        os.rename(tmp, link)
+
+    @classmethod
+    def _apply(cls, chunk):
+        """Run the operations of a chunk of nodes in a native thread.
+
+        Nothing here may log or take a green lock, as it does not run in
+        a greenthread.
+
+        :returns: a dict of node name to the error of the failed nodes.
+        """
+        errors = {}
+        for name, ops in chunk:
+            try:
+                for kind, path, arg in ops:
+                    if kind == _WRITE:
+                        cls._write(path, arg)
+                    else:
+                        cls._symlink(path, arg)
+            except (IOError, OSError) as e:
+                errors[name] = e
+        return errors
+
+    def _render(self, cpu_pool, failures):
+        """Replace the render operations with the rendered contents."""
+        refs = []
+        jobs = []
+        for name, ops in six.iteritems(self._ops):
+            for i, (kind, path, arg) in enumerate(ops):
+                if kind == _RENDER:
+                    refs.append((name, i, path))
+                    jobs.append(arg)
+        if not jobs:
+            return
+
+        if cpu_pool is not None:
+            def _call(chunk):
+                try:
+                    return cpu_pool.call(_render_chunk, chunk)
+                except exception.ProcessWorkerError as e:
+                    return [(False, six.text_type(e))] * len(chunk)
+
+            size = max(1, (len(jobs) + cpu_pool.size - 1) // cpu_pool.size)
+            chunks = [jobs[i:i + size] for i in range(0, len(jobs), size)]
+            results = []
+            for contents in eventlet.GreenPool(cpu_pool.size).imap(_call,
+                                                                   chunks):
+                results.extend(contents)
+        else:
+            results = []
+            for i in range(0, len(jobs), _RENDER_YIELD):
+                results.extend(_render_chunk(jobs[i:i + _RENDER_YIELD]))
+                eventlet.sleep(0)
+
+        for (name, i, path), (ok, content) in zip(refs, results):
+            if not ok:
+                failures[name] = content
+            elif name not in failures:
+                self._ops[name][i] = (_WRITE, path, content)
+        for name in failures:
+            self._ops.pop(name, None)
+
+    def commit(self, cpu_pool=None):
+        """Write the recorded files of all the nodes.
+
+        :param cpu_pool: the ProcessPool to render the templates with.
+        :returns: a dict of node name to the error message of the nodes
+                  whose files could not be written.
+        """
+        if not self._ops:
+            return {}
+        failures = {}
+        self._render(cpu_pool, failures)
+        node_dirs = dict((name, set(os.path.dirname(self._target(op))
+                                    for op in ops))
+                         for name, ops in six.iteritems(self._ops))
+        dirs = set()
+        for paths in six.itervalues(node_dirs):
+            dirs.update(paths)
+        # Every directory is created once for the whole batch.
+        dir_errors = tpool.execute(self._ensure_dirs, sorted(dirs))
+
+        items = []
+        for name, ops in six.iteritems(self._ops):
+            failed = node_dirs[name].intersection(dir_errors)
+            if failed:
+                failures[name] = six.text_type(dir_errors[failed.pop()])
+            else:
+                items.append((name, ops))
+
+        workers = CONF.conductor.file_writer_workers
+        size = max(1, (len(items) + workers - 1) // workers)
+        chunks = [items[i:i + size] for i in range(0, len(items), size)]
+        pool = eventlet.GreenPool(workers)
+        for errors in pool.imap(lambda c: tpool.execute(self._apply, c),
+                                chunks):
+            for name, error in six.iteritems(errors):
+                failures[name] = six.text_type(error)
+        self._ops.clear()
+        if failures:
+            LOG.warning('Failed to write the files of %(count)d nodes: '
+                        '%(failures)s', {'count': len(failures),
+                                         'failures': failures})
+        return failures
@@ -0,0 +1,80 @@
+# coding=utf-8
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Consistent hash ring mapping the node names to the hosts."""
+
+import bisect
+import hashlib
+import struct
+
+import six
+
+from xcat3.common import exception
+from xcat3.common.i18n import _
+
+_KEY = struct.Struct('>Q')
+
+
+def _hash(key):
+    if isinstance(key, six.text_type):
+        key = key.encode('utf-8')
+    return _KEY.unpack_from(hashlib.md5(key).digest())[0]
+
+
+class HashRing(object):
+    """Map the keys to the hosts with consistent hashing.
+
+    Each host owns weight * vnodes points of the ring, a key belongs to the
+    host owning the first point after the hash of the key. The same key
+    maps to the same host in every process, and a host joining or leaving
+    only moves the keys of its own points.
+
+    :param hosts: a dict of host name to its weight.
+    :param vnodes: the number of points per weight unit.
+    """
+
+    def __init__(self, hosts, vnodes):
+        if not hosts:
+            raise exception.InvalidParameterValue(
+                _('Can not build a hash ring without host.'))
+        ring = []
+        for host, weight in six.iteritems(hosts):
+            for i in range(max(1, weight) * vnodes):
+                ring.append((_hash('%s-%d' % (host, i)), host))
+        ring.sort()
+        self._hashes = [h for h, host in ring]
+        self._hosts = [host for h, host in ring]
+        self._count = len(hosts)
+
+    def get_host(self, key):
+        """Return the host the key is mapped to."""
+        i = bisect.bisect(self._hashes, _hash(key))
+        return self._hosts[i % len(self._hosts)]
+
+    def iter_hosts(self, key):
+        """Yield every host once, in ring order from the key.
+
+        The first host is the one the key is mapped to, the next ones are
+        where the key goes if the previous hosts can not take it.
+        """
+        size = len(self._hosts)
+        start = bisect.bisect(self._hashes, _hash(key))
+        seen = set()
+        for i in range(start, start + size):
+            host = self._hosts[i % size]
+            if host not in seen:
+                seen.add(host)
+                yield host
+                if len(seen) == self._count:
+                    return
@@ -1,8 +1,14 @@
 """Utilities and helper functions for crypt password"""
+import collections
 import crypt
+import hashlib
+import os
 import random
 import string
 
+from eventlet import patcher
+import six
+
 MD5_PREFIX = '$1$'
 SHA256_PREFIX = '$5$'
 SHA512_PREFIX = '$6$'
@@ -10,11 +16,24 @@ CRYPT_METHOD_PREFIX = (MD5_PREFIX, SHA256_PREFIX, SHA512_PREFIX)
 CRYPT_DICT = {'md5': MD5_PREFIX, 'sha256': SHA256_PREFIX,
               'sha512': SHA512_PREFIX}
 CRYPT_METHODS = ('md5', 'sha256', 'sha512')
+# 64 characters, so that a random byte maps to a character evenly
+SALT_CHARS = './' + string.digits + string.ascii_letters
+# digest of (password, method) -> hashed password, the plain text
+# passwords are not kept in memory.
+_HASH_CACHE_SIZE = 64
+_hash_cache = collections.OrderedDict()
+# A native lock, as the cache is also used from the tpool native threads.
+# It is only held for the dict operations, never for the hashing.
+_hash_cache_lock = patcher.original('threading').Lock()
+
+
+def is_crypted(password):
+    return password[0:3] in CRYPT_METHOD_PREFIX
 
 
 def crypt_passwd(password, method=None, salt=None):
     # already encrypted
-    if password[0:3] in CRYPT_METHOD_PREFIX:
+    if is_crypted(password):
         return password
 
     if salt is None:
@@ -25,3 +44,53 @@ def crypt_passwd(password, method=None, salt=None):
     # if not set use sha256 by default
     prefix = CRYPT_DICT.get(method, SHA256_PREFIX)
     return crypt.crypt(password, prefix + salt)
+
+
+def gen_salts(count, length=8):
+    """Generate count random salts with a single read of os.urandom."""
+    data = bytearray(os.urandom(count * length))
+    chars = [SALT_CHARS[b & 63] for b in data]
+    return [''.join(chars[i:i + length])
+            for i in range(0, count * length, length)]
+
+
+def crypt_passwds(password, method, count):
+    """Return count hashes of password, each with a different salt."""
+    if is_crypted(password):
+        return [password] * count
+    return [crypt_passwd(password, method, salt) for salt in
+            gen_salts(count)]
+
+
+def _encode(value):
+    if isinstance(value, six.text_type):
+        return value.encode('utf-8')
+    return value
+
+
+def _cache_key(password, method):
+    digest = hashlib.sha256()
+    digest.update(_encode(method or ''))
+    digest.update(b'\0')
+    digest.update(_encode(password))
+    return digest.digest()
+
+
+def cached_crypt_passwd(password, method=None):
+    """Return the hash of password, computed once per password and method.
+
+    It can be called from a native thread. The worst case of a race is to
+    compute the same hash twice. The least recently added hash is evicted
+    when the cache is full.
+    """
+    key = _cache_key(password, method)
+    with _hash_cache_lock:
+        hashed = _hash_cache.get(key)
+    if hashed is None:
+        hashed = crypt_passwd(password, method)
+        with _hash_cache_lock:
+            if key not in _hash_cache and (len(_hash_cache) >=
+                                           _HASH_CACHE_SIZE):
+                _hash_cache.popitem(last=False)
+            _hash_cache[key] = hashed
+    return hashed
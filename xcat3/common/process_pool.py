@@ -0,0 +1,183 @@
+# coding=utf-8
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Run CPU bound functions in worker processes.
+
+multiprocessing and concurrent.futures wait on their pipes from helper
+threads, which block the whole process once the threading module is
+monkey patched by eventlet. The workers here are plain child processes
+talking over their stdin and stdout with green pipes, so a greenthread
+waiting for a result only blocks itself.
+
+The functions must be importable module level functions, their arguments
+and results are pickled.
+"""
+
+import os
+import struct
+import sys
+
+import eventlet
+from eventlet.green import subprocess
+from eventlet import queue
+from oslo_log import log
+import six
+from six.moves import cPickle as pickle
+
+from xcat3.common import exception
+from xcat3.common.i18n import _, _LW
+from xcat3.conf import CONF
+
+LOG = log.getLogger(__name__)
+
+_HEADER = struct.Struct('!I')
+
+
+def _read_exactly(f, size):
+    data = b''
+    while len(data) < size:
+        chunk = f.read(size - len(data))
+        if not chunk:
+            raise EOFError()
+        data += chunk
+    return data
+
+
+def _recv(f):
+    size = _HEADER.unpack(_read_exactly(f, _HEADER.size))[0]
+    return pickle.loads(_read_exactly(f, size))
+
+
+def _send(f, obj):
+    data = pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+    f.write(_HEADER.pack(len(data)) + data)
+    f.flush()
+
+
+class _Worker(object):
+    def __init__(self):
+        args = [sys.executable, '-m', __name__]
+        for path in CONF.config_file:
+            args.extend(['--config-file', path])
+        if CONF.config_dir:
+            args.extend(['--config-dir', CONF.config_dir])
+        # oslo.service points EVENTLET_HUB to itself, which can not be
+        # loaded before oslo.service is imported in the new process.
+        env = dict(os.environ)
+        env.pop('EVENTLET_HUB', None)
+        self.proc = subprocess.Popen(args, stdin=subprocess.PIPE,
+                                     stdout=subprocess.PIPE, close_fds=True,
+                                     env=env)
+
+    def call(self, func, args):
+        _send(self.proc.stdin, (func.__module__, func.__name__, args))
+        ok, value = _recv(self.proc.stdout)
+        if not ok:
+            raise value
+        return value
+
+    def stop(self):
+        try:
+            self.proc.stdin.close()
+            self.proc.wait()
+        except (IOError, OSError) as e:
+            LOG.debug('Failed to stop worker process %(pid)s: %(err)s',
+                      {'pid': self.proc.pid, 'err': e})
+
+
+class ProcessPool(object):
+    """A pool of worker processes for the CPU bound functions.
+
+    :param workers: the number of worker processes.
+    """
+
+    def __init__(self, workers):
+        self.size = workers
+        self._idle = queue.LightQueue()
+        self._workers = []
+        for i in range(workers):
+            self._add_worker()
+
+    def _add_worker(self):
+        worker = _Worker()
+        self._workers.append(worker)
+        self._idle.put(worker)
+
+    def call(self, func, *args):
+        """Run func(*args) in an idle worker process and return the result.
+
+        The calling greenthread waits until a worker is idle.
+
+        :raises: the exception raised by func, ProcessWorkerError if the
+                 worker process fails.
+        """
+        worker = self._idle.get()
+        try:
+            result = worker.call(func, args)
+        except (EOFError, IOError, OSError, pickle.PickleError) as e:
+            # The worker is in an unknown state, replace it.
+            LOG.warning(_LW('Worker process %(pid)s failed: %(err)s'),
+                        {'pid': worker.proc.pid, 'err': e})
+            self._workers.remove(worker)
+            worker.proc.kill()
+            worker.stop()
+            self._add_worker()
+            raise exception.ProcessWorkerError(
+                err=_('%(func)s failed in worker process: %(err)s') %
+                {'func': func.__name__, 'err': e})
+        self._idle.put(worker)
+        return result
+
+    def map(self, func, args_list):
+        """Run func(*args) for each args of args_list concurrently.
+
+        :returns: the list of the results in the order of args_list.
+        """
+        pool = eventlet.GreenPool(self.size)
+        return list(pool.starmap(lambda *args: self.call(func, *args),
+                                 args_list))
+
+    def stop(self):
+        for worker in self._workers:
+            worker.stop()
+        self._workers = []
+
+
+def _main():
+    # Keep the stdout for the results only, anything printed goes to
+    # stderr.
+    stdin = os.fdopen(os.dup(0), 'rb')
+    stdout = os.fdopen(os.dup(1), 'wb')
+    os.dup2(2, 1)
+    CONF(sys.argv[1:], project='xcat3')
+    while True:
+        try:
+            module, name, args = _recv(stdin)
+        except EOFError:
+            return
+        try:
+            __import__(module)
+            func = getattr(sys.modules[module], name)
+            reply = (True, func(*args))
+        except Exception as e:
+            reply = (False, e)
+        try:
+            _send(stdout, reply)
+        except (pickle.PickleError, TypeError) as e:
+            _send(stdout, (False, exception.ProcessWorkerError(
+                err=six.text_type(e))))
+
+
+if __name__ == '__main__':
+    _main()
@@ -54,6 +54,18 @@ FAIL = 'failed'
 SUCCESS = 'ok'
 DELETED = 'deleted'
 UPDATED = 'updated'
+LOCKED = 'locked'
+NOT_FOUND = 'not found'
+
+############
+# Job states
+############
+
+JOB_RUNNING = 'running'
+""" The conductors are still working on the nodes of the job. """
+
+JOB_DONE = 'done'
+""" All the nodes of the job have their result. """
 
 ################
 # Power command
@@ -39,6 +39,8 @@ import grp
 
 from oslo_concurrency import processutils
 from oslo_log import log as logging
+from oslo_utils import excutils
+from oslo_utils import fileutils
 from oslo_utils import netutils
 from oslo_utils import timeutils
 from oslo_service import loopingcall
@@ -52,6 +54,10 @@ LOG = logging.getLogger(__name__)
 warn_deprecated_extra_vif_port_id = False
 DEVNULL = open(os.devnull, 'r+')
 
+# template directory -> jinja2.Environment shared by the process
+_template_envs = {}
+_template_envs_lock = threading.Lock()
+
 
 def _get_root_helper():
     # NOTE(jlvillal): This function has been moved to xcat3-lib. And is
@@ -286,6 +292,43 @@ def write_to_file(path, contents):
         f.write(contents)
 
 
+@contextlib.contextmanager
+def atomic_write(path):
+    """Context manager to replace a file atomically.
+
+    The content is written to a temporary file in the same directory which
+    is synced and renamed over path on success, so the readers see either
+    the old or the new file, never a partially written one. The temporary
+    file is removed if an exception is raised.
+
+    :param path: the file to replace.
+    :returns: the file object to write to.
+    """
+    dirname = os.path.dirname(os.path.abspath(path))
+    f = tempfile.NamedTemporaryFile(mode='w', dir=dirname, delete=False,
+                                    prefix='.%s.' % os.path.basename(path))
+    try:
+        with f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            st = os.stat(path)
+            os.chmod(f.name, st.st_mode & 0o7777)
+        else:
+            os.chmod(f.name, 0o644)
+        os.rename(f.name, path)
+    except Exception:
+        with excutils.save_and_reraise_exception():
+            unlink_without_raise(f.name)
+    # Persist the rename as well.
+    fd = os.open(dirname, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
 def create_link_without_raise(source, link):
     try:
         os.symlink(source, link)
@@ -384,6 +427,36 @@ def unix_file_modification_datetime(file_name):
     )
 
 
+def _template_env(tmpl_path):
+    with _template_envs_lock:
+        env = _template_envs.get(tmpl_path)
+        if env is None:
+            bcc = None
+            if CONF.template_cache_dir:
+                fileutils.ensure_tree(CONF.template_cache_dir)
+                bcc = jinja2.FileSystemBytecodeCache(CONF.template_cache_dir)
+            # auto_reload compiles the template again if the file is
+            # modified, the compiled templates are never evicted.
+            env = jinja2.Environment(
+                loader=jinja2.FileSystemLoader(tmpl_path), cache_size=-1,
+                auto_reload=True, bytecode_cache=bcc)
+            _template_envs[tmpl_path] = env
+        return env
+
+
+def get_template(template):
+    """Return the compiled Jinja2 template of the file.
+
+    The templates are compiled once per process and shared by all of the
+    callers, a template is compiled again only if the file is modified.
+
+    :param template: full path to the Jinja2 template file
+    :returns: the jinja2.Template object
+    """
+    tmpl_path, tmpl_name = os.path.split(template)
+    return _template_env(tmpl_path).get_template(tmpl_name)
+
+
 def render_template(template, params, is_file=True):
     """Renders Jinja2 template file with given parameters.
 
@@ -393,11 +466,9 @@ def render_template(template, params, is_file=True):
     :returns: the rendered template as a string
     """
     if is_file:
-        tmpl_path, tmpl_name = os.path.split(template)
-        loader = jinja2.FileSystemLoader(tmpl_path)
-    else:
-        tmpl_name = 'template'
-        loader = jinja2.DictLoader({tmpl_name: template})
+        return get_template(template).render(params)
+    tmpl_name = 'template'
+    loader = jinja2.DictLoader({tmpl_name: template})
     env = jinja2.Environment(loader=loader)
     tmpl = env.get_template(tmpl_name)
     return tmpl.render(params)
@@ -635,4 +706,17 @@ def fill_dict_result(result, dict_ret):
     :param dict_ret: dict contains node and message
     """
     for k, v in six.iteritems(dict_ret):
-        result[k] = v
\ No newline at end of file
+        result[k] = v
+
+
+def moving_average(average, value, weight=0.2):
+    """Update an exponentially weighted moving average with a sample.
+
+    :param average: the current average, None if there is no sample yet.
+    :param value: the new sample.
+    :param weight: the weight of the new sample.
+    :returns: the new average.
+    """
+    if average is None:
+        return value
+    return average + weight * (value - average)
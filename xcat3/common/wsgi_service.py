@@ -62,6 +62,7 @@ class WSGIService(service.ServiceBase):
         :returns: None
         """
         self.server.stop()
+        self.app.stop()
 
     def wait(self):
         """Wait for the service to stop serving this API.
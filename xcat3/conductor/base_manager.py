@@ -13,8 +13,11 @@
 
 """Base conductor manager functionality."""
 
+import functools
 import inspect
+import os
 import threading
+import time
 
 import futurist
 from futurist import periodics
@@ -25,7 +28,9 @@ from oslo_utils import excutils
 
 from xcat3.common import exception
 from xcat3.common.i18n import _, _LC, _LE, _LI, _LW
+from xcat3.common import process_pool
 from xcat3.common import rpc
+from xcat3.common import utils
 from xcat3.conf import CONF
 from xcat3.db import api as dbapi
 from xcat3.network import rpcapi as network_api
@@ -33,6 +38,27 @@ from xcat3 import objects
 
 LOG = log.getLogger(__name__)
 
+def track_load(func):
+    """Count the nodes of the rpc call in the load of the conductor.
+
+    The decorated rpc methods take the node names as `names`. The nodes of
+    a call run concurrently, so the duration is kept per call, as a moving
+    average per rpc method.
+    """
+    @functools.wraps(func)
+    def wrapper(self, context, *args, **kwargs):
+        names = kwargs.get('names', args[0] if args else None) or ()
+        self._in_flight += len(names)
+        start = time.time()
+        try:
+            return func(self, context, *args, **kwargs)
+        finally:
+            self._in_flight -= len(names)
+            if names:
+                self._latency[func.__name__] = utils.moving_average(
+                    self._latency.get(func.__name__), time.time() - start)
+    return wrapper
+
 
 class BaseConductorManager(object):
     def __init__(self, host, topic):
@@ -45,6 +71,10 @@ class BaseConductorManager(object):
         self._started = False
         self.type = 'conductor'
         self.network_api = network_api.NetworkAPI()
+        # nodes of the rpc calls in progress
+        self._in_flight = 0
+        # rpc method -> moving average of the seconds per call
+        self._latency = {}
 
     def init_host(self, admin_context=None):
         """Initialize the conductor host.
@@ -65,6 +95,10 @@ class BaseConductorManager(object):
         self._executor = futurist.GreenThreadPoolExecutor(
             max_workers=CONF.conductor.workers_pool_size,
             check_and_reject=rejection_func)
+        self._cpu_pool = None
+        if CONF.conductor.cpu_workers:
+            self._cpu_pool = process_pool.ProcessPool(
+                CONF.conductor.cpu_workers)
 
         self._periodic_task_callables = []
         self._collect_periodic_tasks(self, (admin_context,))
@@ -140,6 +174,8 @@ class BaseConductorManager(object):
         self._periodic_tasks.stop()
         self._periodic_tasks.wait()
         self._executor.shutdown(wait=True)
+        if self._cpu_pool is not None:
+            self._cpu_pool.stop()
         self._started = False
 
     def _collect_periodic_tasks(self, obj, args):
@@ -181,10 +217,27 @@ class BaseConductorManager(object):
         except futurist.RejectedSubmission:
             raise exception.NoFreeServiceWorker()
 
+    def _queued(self):
+        """Return the number of tasks waiting for a free worker."""
+        # futurist has no public accessor of the backlog, it is the queue
+        # the rejection functions are given the size of.
+        backlog = getattr(self._executor, '_delayed_work', None)
+        return backlog.qsize() if backlog is not None else 0
+
+    def _load_metrics(self):
+        """Return the load of this conductor process for the heartbeat."""
+        capacity = CONF.conductor.workers_pool_size
+        return {str(os.getpid()): {
+            'in_flight': self._in_flight,
+            'queued': self._queued(),
+            'capacity': capacity,
+            'latency': self._latency,
+            'time': time.time()}}
+
     def _service_record_keepalive(self):
         while not self._keepalive_evt.is_set():
             try:
-                self.service.touch()
+                self.service.touch(load=self._load_metrics())
             except db_exception.DBConnectionError:
                 LOG.warning(_LW('Conductor could not connect to database '
                                 'while heartbeating.'))
@@ -21,15 +21,19 @@
 """
 import os
 import six
+import time
 import traceback
 from oslo_log import log
 import oslo_messaging as messaging
+from eventlet import tpool
 from futurist import waiters
 
 from xcat3.common import exception
+from xcat3.common import file_batch
 from xcat3.common import password_utils
 from xcat3.common import utils
 from xcat3.conductor import base_manager
+from xcat3.conductor import node_cache
 from xcat3.conductor import task_manager
 from xcat3.conf import CONF
 from xcat3.copycd import cache as cd_cache
@@ -55,6 +59,9 @@ class ConductorManager(base_manager.BaseConductorManager):
     def __init__(self, host, topic):
         super(ConductorManager, self).__init__(host, topic)
         self.plugins = mapping.PluginMap()
+        self.node_cache = None
+        if CONF.conductor.node_cache:
+            self.node_cache = node_cache.NodeCache()
 
     def _filter_result(self, result, nodes):
         """Retrun node names, and node objects in the correct state
@@ -105,9 +112,49 @@ class ConductorManager(base_manager.BaseConductorManager):
             result[node.name] = msg
         return result
 
+    def _sweep_power_state(self, nodes, result):
+        """Query the power state with the sweep engine of control plugins.
+
+        Results are filled into the result dict as they arrive.
+        :param nodes: node objects
+        :param result: a result dict contains the return status for each node
+        :returns: the nodes whose control plugin does not support sweep
+        """
+        groups = dict()
+        for node in nodes:
+            groups.setdefault(node.mgt, []).append(node)
+
+        rest = []
+        deadline = time.time() + CONF.conductor.timeout
+        for mgt, group in six.iteritems(groups):
+            plugin = self.plugins.control_map.get(mgt)
+            sweep = None
+            if plugin is not None:
+                sweep = plugin.sweep_power_state(
+                    group, self._spawn_worker, max(deadline - time.time(), 0))
+            if sweep is None:
+                rest.extend(group)
+                continue
+            for node, ok, value in sweep:
+                if ok:
+                    result[node.name] = value or xcat3_states.SUCCESS
+                else:
+                    LOG.error(_LE('Error in _sweep_power_state for node '
+                                  '%(node)s: %(err)s'),
+                              {'node': node.name,
+                               'err': six.text_type(value)})
+                    result[node.name] = six.text_type(value)
+
+            msg = "Timeout after waiting %(timeout)d seconds" % {
+                "timeout": CONF.conductor.timeout}
+            utils.fill_result(result, [node.name for node in group if
+                                       node.name not in result], msg)
+        return rest
+
     @messaging.expected_exceptions(exception.InvalidParameterValue,
                                    exception.NoFreeServiceWorker,
                                    exception.NodeLocked)
+    @base_manager.track_load
     def change_power_state(self, context, names, target):
         """RPC method to encapsulate changes to a node's state.
 
@@ -130,15 +177,20 @@ class ConductorManager(base_manager.BaseConductorManager):
             control_plugin.set_power_state(node, target)
 
         with task_manager.acquire(context, names, obj_info=['nics', ],
-                                  purpose='change power state') as task:
+                                  purpose='change power state',
+                                  partial=True) as task:
             result = self._process_nodes_worker(_change_power_state,
                                                 nodes=task.nodes,
                                                 target=target)
+            utils.fill_result(result, task.locked_names, xcat3_states.LOCKED)
+            utils.fill_result(result, task.missing_names,
+                              xcat3_states.NOT_FOUND)
             return result
 
     @messaging.expected_exceptions(exception.InvalidParameterValue,
                                    exception.NoFreeServiceWorker,
                                    exception.NodeLocked)
+    @base_manager.track_load
     def get_power_state(self, context, names):
         """RPC method to get a node's power state.
 
@@ -160,14 +212,19 @@ class ConductorManager(base_manager.BaseConductorManager):
 
         with task_manager.acquire(context, names, shared=True,
                                   obj_info=['nics', ],
-                                  purpose='get power state') as task:
-            result = self._process_nodes_worker(_get_power_state,
-                                                nodes=task.nodes)
+                                  purpose='get power state',
+                                  cache=self.node_cache) as task:
+            result = dict()
+            nodes = self._sweep_power_state(task.nodes, result)
+            if nodes:
+                result.update(self._process_nodes_worker(_get_power_state,
+                                                         nodes=nodes))
             return result
 
     @messaging.expected_exceptions(exception.InvalidParameterValue,
                                    exception.NoFreeServiceWorker,
                                    exception.NodeLocked)
+    @base_manager.track_load
     def destroy_nodes(self, context, names):
         """RPC method to destroy nodes.
 
@@ -181,22 +238,28 @@ class ConductorManager(base_manager.BaseConductorManager):
         """
         LOG.info("RPC destroy_nodes called for nodes %(nodes)s. ",
                  {'nodes': str(names)})
-        with task_manager.acquire(context, names,
-                                  purpose='nodes deletion') as task:
+        with task_manager.acquire(context, names, purpose='nodes deletion',
+                                  partial=True) as task:
             nodes = task.nodes
             msg = _("Can not delete node in %(state)s state" % {
                 'state': xcat3_states.DEPLOY_NODESET})
             # NOTE: If node is deploying, destroying is not allowed.
             result = dict((node.name, msg) for node in nodes if
                           node.state == xcat3_states.DEPLOY_NODESET)
+            utils.fill_result(result, task.locked_names, xcat3_states.LOCKED)
+            utils.fill_result(result, task.missing_names,
+                              xcat3_states.NOT_FOUND)
             nodes = [node for node in nodes if
                      node.state != xcat3_states.DEPLOY_NODESET]
             if len(nodes) == 0:
                 return result
+            names = [node.name for node in nodes]
             # remove record about dhcp in database if exist, but do not disable
             # the dhcp service immediately.
             dhcp.ISCDHCPService.update_opts(context, 'remove', names, None)
             objects.Node.destroy_nodes(nodes)
+            if self.node_cache is not None:
+                self.node_cache.invalidate([node.id for node in nodes])
             LOG.info(_LI('Successfully deleted nodes %(nodes)s.'),
                      {'nodes': names})
             for node in nodes:
@@ -206,6 +269,7 @@ class ConductorManager(base_manager.BaseConductorManager):
     @messaging.expected_exceptions(exception.InvalidParameterValue,
                                    exception.NoFreeServiceWorker,
                                    exception.NodeLocked)
+    @base_manager.track_load
     def provision(self, context, names, target, osimage, passwd, subnet):
         """RPC method to provision node into target state
 
@@ -254,7 +318,35 @@ class ConductorManager(base_manager.BaseConductorManager):
                     cd_cache.ensure_osimage(url, CONF.deploy.install_dir,
                                             img.orig_name)
 
-        def _provision(node, target, osimage, dhcp_opts, passwd, subnet):
+        def _hash_passwords(nodes):
+            """Return a dict of node name to the hashed password."""
+            if target == xcat3_states.DEPLOY_DHCP or not nodes:
+                return {}
+            if CONF.deploy.password_hash == 'passwd':
+                password = tpool.execute(password_utils.cached_crypt_passwd,
+                                         passwd.password, passwd.crypt_method)
+                return dict((node.name, password) for node in nodes)
+            if self._cpu_pool is not None:
+                # Split the hashes among the worker processes.
+                size = self._cpu_pool.size
+                counts = [len(nodes) // size + (1 if i < len(nodes) % size
+                                                else 0) for i in range(size)]
+                passwords = []
+                for chunk in self._cpu_pool.map(
+                        password_utils.crypt_passwds,
+                        [(passwd.password, passwd.crypt_method, count)
+                         for count in counts if count]):
+                    passwords.extend(chunk)
+            else:
+                # Hash the passwords of all the nodes in a native thread
+                # rather than one by one in the greenthreads.
+                passwords = tpool.execute(password_utils.crypt_passwds,
+                                          passwd.password,
+                                          passwd.crypt_method, len(nodes))
+            return dict(zip([node.name for node in nodes], passwords))
+
+        def _provision(node, target, osimage, dhcp_opts, passwords, subnet,
+                       files):
             """provision step for each node
 
             This subroutie is running in greenthread. Every node has its
@@ -264,8 +356,10 @@ class ConductorManager(base_manager.BaseConductorManager):
             :param osimage: rpc osimage object
             :param dhcp_opts: An empty dict used to fill the dhcp options then
                               return to the caller.
+            :param passwords: a dict of node name to the hashed password.
             :param subnet: network object.
-
+            :param files: the FileBatch to record the files of the node in,
+                          they are written for all the nodes at once.
             """
             boot_plugin = self.plugins.get_boot_plugin(node)
             boot_plugin.validate(node)
@@ -280,11 +374,10 @@ class ConductorManager(base_manager.BaseConductorManager):
             os_boot_str = os_plugin.build_os_boot_str(node, osimage)
             # if password is encrypted, all of the nodes are deployed with the
             # same hashed password, if unhashed password is given, the hashed
-            # password are generated with different salt.
-            password = password_utils.crypt_passwd(passwd.password,
-                                                   passwd.crypt_method)
-            os_plugin.build_template(node, osimage, password)
-            boot_plugin.build_boot_conf(node, os_boot_str, osimage)
+            # password is computed as [deploy]password_hash configures.
+            os_plugin.build_template(node, osimage, passwords[node.name],
+                                     files)
+            boot_plugin.build_boot_conf(node, os_boot_str, osimage, files)
             # update the node status into node object
             node.state = xcat3_states.DEPLOY_NODESET
             node.conductor_affinity = self.service.id
@@ -295,7 +388,9 @@ class ConductorManager(base_manager.BaseConductorManager):
                      "The desired new state is %(target)s."),
                  {'nodes': str(names), 'target': target})
         with task_manager.acquire(context, names, obj_info=['nics', ],
-                                  purpose='nodes provision') as task:
+                                  purpose='nodes provision',
+                                  partial=True) as task:
+            names = task.node_names
             dhcp_opts = dict((name, {}) for name in names)
             nodes = task.nodes
 
@@ -308,15 +403,25 @@ class ConductorManager(base_manager.BaseConductorManager):
                                              image_set)
 
             _ensure_osimage(image_set)
+            passwords = _hash_passwords(nodes)
+            files = file_batch.FileBatch()
             result = self._process_nodes_worker(_provision,
                                                 nodes=nodes,
                                                 target=target,
                                                 osimage=osimage,
                                                 dhcp_opts=dhcp_opts,
-                                                passwd=passwd,
-                                                subnet=subnet)
+                                                passwords=passwords,
+                                                subnet=subnet,
+                                                files=files)
+            for name, val in six.iteritems(result):
+                if val != xcat3_states.SUCCESS:
+                    files.discard(name)
+            result.update(files.commit(self._cpu_pool))
             if os_filter_result:
                 result.update(os_filter_result)
+            utils.fill_result(result, task.locked_names, xcat3_states.LOCKED)
+            utils.fill_result(result, task.missing_names,
+                              xcat3_states.NOT_FOUND)
             names, nodes = self._filter_result(result, nodes)
             try:
                 dhcp.ISCDHCPService.update_opts(context, 'add', names,
@@ -334,6 +439,7 @@ class ConductorManager(base_manager.BaseConductorManager):
     @messaging.expected_exceptions(exception.InvalidParameterValue,
                                    exception.NoFreeServiceWorker,
                                    exception.NodeLocked)
+    @base_manager.track_load
     def clean(self, context, names):
         """RPC method to clean up the provision state.
 
@@ -356,19 +462,24 @@ class ConductorManager(base_manager.BaseConductorManager):
         LOG.info(_LI("RPC clean called for nodes %(nodes)s. "),
                  {'nodes': str(names)})
         with task_manager.acquire(context, names, obj_info=['nics', ],
-                                  purpose='nodes provision') as task:
+                                  purpose='nodes provision',
+                                  partial=True) as task:
             nodes = task.nodes
             try:
                 result = self._process_nodes_worker(_clean, nodes=nodes)
                 objects.Node.save_nodes(nodes)
             except Exception as e:
                 result = dict()
-                utils.fill_result(result, names, e.message)
+                utils.fill_result(result, task.node_names, e.message)
+            utils.fill_result(result, task.locked_names, xcat3_states.LOCKED)
+            utils.fill_result(result, task.missing_names,
+                              xcat3_states.NOT_FOUND)
             return result
 
     @messaging.expected_exceptions(exception.InvalidParameterValue,
                                    exception.NoFreeServiceWorker,
                                    exception.NodeLocked)
+    @base_manager.track_load
     def get_boot_device(self, context, names):
         """RPC method to get the boot device of nodes.
 
@@ -390,7 +501,8 @@ class ConductorManager(base_manager.BaseConductorManager):
 
         with task_manager.acquire(context, names, shared=True,
                                   obj_info=['nics', ],
-                                  purpose='get_boot_device') as task:
+                                  purpose='get_boot_device',
+                                  cache=self.node_cache) as task:
             result = self._process_nodes_worker(_get_boot_device,
                                                 nodes=task.nodes)
             return result
@@ -398,6 +510,7 @@ class ConductorManager(base_manager.BaseConductorManager):
     @messaging.expected_exceptions(exception.InvalidParameterValue,
                                    exception.NoFreeServiceWorker,
                                    exception.NodeLocked)
+    @base_manager.track_load
     def set_boot_device(self, context, names, boot_device):
         """RPC method to get the boot device of nodes.
 
@@ -420,10 +533,14 @@ class ConductorManager(base_manager.BaseConductorManager):
             return control_plugin.set_boot_device(node, boot_device)
 
         with task_manager.acquire(context, names, obj_info=['nics', ],
-                                  purpose='set boot device') as task:
+                                  purpose='set boot device',
+                                  partial=True) as task:
             result = self._process_nodes_worker(_set_boot_device,
                                                 nodes=task.nodes,
                                                 boot_device=boot_device)
+            utils.fill_result(result, task.locked_names, xcat3_states.LOCKED)
+            utils.fill_result(result, task.missing_names,
+                              xcat3_states.NOT_FOUND)
             return result
 
     @messaging.expected_exceptions(exception.InvalidParameterValue,
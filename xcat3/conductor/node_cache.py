@@ -0,0 +1,74 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""In-memory cache of node objects for the conductor service."""
+
+import copy
+
+from oslo_log import log
+
+from xcat3 import objects
+
+LOG = log.getLogger(__name__)
+
+
+class NodeCache(object):
+    """Cache node objects (with nics info) keyed by node id.
+
+    Every entry is stored with the change version of the node row, the
+    caller is expected to compare it with the version loaded from the
+    database with a cheap query before using the cached data. Write paths
+    bump the version in the database, so a stale entry is never returned.
+    """
+
+    def __init__(self):
+        # node_id -> (version, node dict, with_nics)
+        self._entries = {}
+
+    def get(self, context, node_id, version, with_nics=False):
+        """Return a node object if the cached entry is still valid.
+
+        :param context: request context.
+        :param node_id: the id of the node.
+        :param version: the current version of the node in the database.
+        :param with_nics: whether the nics info is required.
+        :returns: a :class:`Node` object or None.
+        """
+        entry = self._entries.get(node_id)
+        if entry is None or entry[0] != version:
+            return None
+        if with_nics and not entry[2]:
+            return None
+        node = objects.Node(context, **copy.deepcopy(entry[1]))
+        node.obj_reset_changes()
+        return node
+
+    def set(self, node, version, with_nics=False):
+        """Put a copy of the node object into the cache.
+
+        :param node: the :class:`Node` object loaded from the database.
+        :param version: the version of the node the object was loaded with.
+        :param with_nics: whether the nics info is loaded.
+        """
+        self._entries[node.id] = (version, copy.deepcopy(node.as_dict()),
+                                  with_nics)
+
+    def invalidate(self, node_ids=None):
+        """Drop the cached entries.
+
+        :param node_ids: the ids of nodes, if None, drop all the entries.
+        """
+        if node_ids is None:
+            self._entries.clear()
+            return
+        for node_id in node_ids:
+            self._entries.pop(node_id, None)
@@ -19,16 +19,22 @@
 Client side of the conductor RPC API.
 """
 
+import collections
+import functools
+import math
+import time
+
 import futurist
-from futurist import rejection
 from futurist import waiters
 from oslo_log import log
 import oslo_messaging as messaging
 import six
 
 from xcat3.common import exception
+from xcat3.common import hash_ring
 from xcat3.common import rpc
 from xcat3.common.i18n import _, _LE, _LI, _LW
+from xcat3.common import utils
 from xcat3.conf import CONF
 from xcat3.db import api as dbapi
 from xcat3.objects import base as objects_base
@@ -36,6 +42,147 @@ from xcat3.objects import base as objects_base
 LOG = log.getLogger(__name__)
 MANAGER_TOPIC = 'xcat3.conductor_manager'
 
+# weight is the number of rpc worker processes of the conductor, capacity,
+# in_flight, queued and latency come from the load its processes report,
+# see BaseConductorManager._load_metrics. latency is a dict of rpc method
+# to the seconds per call.
+_Conductor = collections.namedtuple('_Conductor', [
+    'id', 'hostname', 'workers', 'weight', 'topic', 'capacity', 'in_flight',
+    'queued', 'latency'])
+
+
+def _operation(func):
+    # The functions given to spawn_worker are named after the rpc method
+    # they call, with a leading underscore.
+    return func.__name__.lstrip('_')
+
+
+def _make_conductor(service, topic):
+    weight = service.workers + 1 if service.workers > 1 else 1
+    limit = time.time() - CONF.heartbeat_timeout
+    reports = [r for r in six.itervalues(service.load or {})
+               if r.get('time', 0) > limit]
+    if not reports:
+        # Nothing reported yet, take it as idle.
+        return _Conductor(service.id, service.hostname, service.workers,
+                          weight, topic,
+                          weight * CONF.conductor.workers_pool_size, 0, 0,
+                          {})
+    latencies = collections.defaultdict(list)
+    for r in reports:
+        latency = r.get('latency')
+        if isinstance(latency, dict):
+            for method, seconds in six.iteritems(latency):
+                if seconds is not None:
+                    latencies[method].append(seconds)
+    return _Conductor(service.id, service.hostname, service.workers, weight,
+                      topic, sum(r.get('capacity', 0) for r in reports),
+                      sum(r.get('in_flight', 0) for r in reports),
+                      sum(r.get('queued', 0) for r in reports),
+                      dict((method, sum(v) / len(v))
+                           for method, v in six.iteritems(latencies)))
+
+
+class _Conductors(object):
+    """Cache of the alive conductor services used to route the rpc calls.
+
+    The services table is read again after [DEFAULT]heartbeat_interval
+    seconds, the period the conductors update it at, or after an rpc call
+    failed to reach a conductor. The hash ring of the conductors is only
+    rebuilt when they change.
+
+    The nodes sent to a conductor since its load was read are counted as
+    busy, until the next read.
+    """
+
+    def __init__(self, dbapi, topic):
+        self._dbapi = dbapi
+        self._topic = topic
+        self._conductors = []
+        self._expires = 0
+        self._ring = None
+        self._ring_hosts = None
+        self._dispatched = collections.Counter()
+        # (topic, operation) -> moving average of the seconds per rpc call
+        self._durations = {}
+
+    def get(self):
+        """Return the list of the alive conductors."""
+        now = time.time()
+        if now >= self._expires:
+            services = self._dbapi.get_services(type='conductor')
+            self._conductors = [
+                _make_conductor(s, '%s.%s' % (self._topic,
+                                              s.hostname.encode('utf-8')))
+                for s in services]
+            self._dispatched.clear()
+            # Nothing is cached until a conductor registers.
+            self._expires = (now + CONF.heartbeat_interval
+                             if self._conductors else 0)
+        return self._conductors
+
+    def invalidate(self):
+        self._expires = 0
+
+    def get_ring(self, conductors):
+        """Return the hash ring of the topics of the conductors."""
+        hosts = dict((c.topic, c.weight) for c in conductors)
+        if hosts != self._ring_hosts:
+            self._ring = hash_ring.HashRing(hosts,
+                                            CONF.api.hash_ring_vnodes)
+            self._ring_hosts = hosts
+        return self._ring
+
+    def get_quotas(self, conductors, count, operation=None):
+        """Return the most nodes of a request each conductor may take.
+
+        The shares are proportional to the spare capacity of the
+        conductors, stretched by [api]load_balance_factor so most nodes
+        still go to their conductor on the hash ring. The spare capacity
+        of a conductor whose calls of the operation are slower than the
+        average is reduced in proportion, its workers free up less often.
+
+        :param conductors: the alive conductors.
+        :param count: the number of nodes of the request.
+        :param operation: the rpc method of the request.
+        :returns: a dict of topic to the number of nodes.
+        """
+        latencies = dict((c.topic, c.latency.get(operation))
+                         for c in conductors)
+        known = [l for l in six.itervalues(latencies) if l]
+        average = sum(known) / len(known) if known else None
+        spare = {}
+        for c in conductors:
+            # in_flight counts the nodes of the calls in progress, queued
+            # the tasks waiting for a free worker, among them the nodes of
+            # those calls over the capacity.
+            busy = max(c.in_flight, min(c.in_flight, c.capacity) + c.queued)
+            s = max(1, c.capacity - busy - self._dispatched[c.topic])
+            if average and latencies[c.topic]:
+                s *= average / latencies[c.topic]
+            spare[c.topic] = s
+        total = float(sum(six.itervalues(spare)))
+        return dict((topic, int(math.ceil(
+            count * s / total * CONF.api.load_balance_factor)))
+            for topic, s in six.iteritems(spare))
+
+    def dispatched(self, topic, count):
+        self._dispatched[topic] += count
+
+    def observe(self, topic, operation, duration):
+        """Record the duration of a rpc call of the operation."""
+        key = (topic, operation)
+        self._durations[key] = utils.moving_average(
+            self._durations.get(key), duration)
+
+    def get_duration(self, topic, operation):
+        """Return the seconds a rpc call of the operation lasts.
+
+        :returns: the duration or None if no call returned yet.
+        """
+        return self._durations.get((topic, operation))
+
+
 class ConductorAPI(object):
     """Client side of the conductor RPC API.
     """
@@ -54,53 +201,112 @@ class ConductorAPI(object):
         self.client = rpc.get_client(target,
                                      version_cap=self.RPC_API_VERSION,
                                      serializer=serializer)
-        rejection_func = rejection.reject_when_reached(
-            CONF.api.workers_pool_size)
+        # Shared by the requests and the jobs of the api worker, a call
+        # waits for a free greenthread instead of failing the request.
         self._executor = futurist.GreenThreadPoolExecutor(
-            max_workers=CONF.api.workers_pool_size,
-            check_and_reject=rejection_func)
+            max_workers=CONF.api.workers_pool_size)
+        self._conductors = _Conductors(self.dbapi, self.topic)
+
+    def stop(self):
+        """Stop accepting new workers, the running ones still finish."""
+        self._executor.shutdown(wait=False)
+
+    def _call_conductor(self, func, *args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except (messaging.MessagingTimeout, messaging.MessageDeliveryFailure):
+            # The conductor may be gone, read the services again next time.
+            self._conductors.invalidate()
+            raise
+
+    def _group_size(self, topic, operation, count, workers):
+        """Return the number of nodes to send to the conductor per call.
+
+        The nodes of a call run concurrently on the conductor, so a call
+        lasts about as long as its slowest node whatever the size of the
+        group. A request of at most [api]per_group_count nodes is sent in
+        one call, unless the calls of the operation are known to last more
+        than [api]group_target_duration, then it is spread over the rpc
+        workers of the conductor. Larger requests are split into at least
+        one group per rpc worker, with at most per_group_count nodes per
+        group.
+        """
+        duration = self._conductors.get_duration(topic, operation)
+        if count <= CONF.api.per_group_count and (
+                duration is None or
+                duration <= CONF.api.group_target_duration):
+            return count
+        return max(1, min(CONF.api.per_group_count,
+                          int(math.ceil(count / float(workers)))))
 
     def spawn_worker(self, func, *args, **kwargs):
-        """Create a greenthread to run func(*args, **kwargs).
-
-        Spawns a greenthread if there are free slots in pool, otherwise raises
-        exception. Execution control returns immediately to the caller.
+        """Create greenthreads to run func(*args, **kwargs) for the nodes.
+
+        The nodes in kwargs['names'] are split into groups, one call of
+        func per group, see _group_size. At most [api]max_calls_per_worker
+        calls per rpc worker of the conductor are submitted to the pool at
+        once, the next groups are submitted as the previous calls return,
+        so a slow group does not hold the others back. The pool is shared
+        by all the requests, the groups not started within [api]timeout
+        seconds are cancelled.
+        Execution control returns immediately to the caller.
         :param func: the function should be called within green thread
-        :returns: Future list.
-        :raises: NoFreeServiceWorker if worker pool is currently full.
+        :returns: Future list, one future per group with the names of its
+                  nodes in the `nodes` attribute.
 
         """
-
-        def _worker(futures, func, *args, **kwargs):
-            try:
-                future = self._executor.submit(func, *args, **kwargs)
-                if kwargs.get('names'):
-                    setattr(future, 'nodes', kwargs['names'])
-                futures.append(future)
-            except futurist.RejectedSubmission:
-                raise exception.NoFreeAPIWorker()
+        workers = max(1, kwargs.pop('workers') or 1)
+        topic = kwargs.pop('topic', None)
+        names = kwargs.pop('names')
+        if not names:
+            return []
+        operation = _operation(func)
+        size = self._group_size(topic, operation, len(names), workers)
+        deadline = time.time() + CONF.api.timeout
 
         futures = []
-        local_workers = kwargs.pop('workers')
-        if local_workers > 1 and kwargs.get('names') and len(
-                kwargs.get('names')) < CONF.api.per_group_count:
-            local_workers = 1
-
-        if local_workers > 1:
-            names = kwargs.pop('names')
-            groups = [[] for i in range(local_workers)]
-            per_group = len(names) / local_workers
-            for i in range(local_workers - 1):
-                groups[i].extend(names[i * per_group:(i + 1) * per_group])
-            groups[local_workers - 1].extend(
-                names[(local_workers - 1) * per_group:])
-            for i in range(local_workers):
-                kwargs['names'] = groups[i]
-                if not kwargs['names']:
+        for i in range(0, len(names), size):
+            future = futurist.Future()
+            setattr(future, 'nodes', names[i:i + size])
+            futures.append(future)
+        queued = collections.deque(futures)
+
+        def _call(future):
+            if (time.time() >= deadline or
+                    not future.set_running_or_notify_cancel()):
+                # Waited for a free greenthread past the timeout, reported
+                # as timed out, the nodes are never sent.
+                future.cancel()
+                return
+            start = time.time()
+            result = self._call_conductor(func, names=future.nodes, *args,
+                                          **kwargs)
+            self._conductors.observe(topic, operation, time.time() - start)
+            return result
+
+        def _submit_next():
+            while queued:
+                future = queued.popleft()
+                if time.time() >= deadline:
+                    # Reported as timed out, the nodes are never sent.
+                    future.cancel()
                     continue
-                _worker(futures, func, *args, **kwargs)
-        elif kwargs['names']:
-            _worker(futures, func, *args, **kwargs)
+                call = self._executor.submit(_call, future)
+                call.add_done_callback(functools.partial(_done, future))
+                return
+
+        def _done(future, call):
+            # Runs in the greenthread of the call which just returned.
+            if not future.cancelled():
+                error = call.exception()
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(call.result())
+            _submit_next()
+
+        for i in range(workers * CONF.api.max_calls_per_worker):
+            _submit_next()
         return futures
 
     def wait_workers(self, futures, timeout):
@@ -114,43 +320,42 @@ class ConductorAPI(object):
         """
         return waiters.wait_for_all(futures, timeout)
 
-    def get_topic_for(self, nodes):
+    def get_topic_for(self, nodes, operation=None):
         """Get the RPC topic for the conductor service the nodes are mapped to.
 
-        This function is for rpc calls for multiple nodes.
+        This function is for rpc calls for multiple nodes. The nodes are
+        mapped with a consistent hash ring weighted by the rpc workers of
+        the conductors, so a node goes to the same conductor whatever the
+        other nodes of the request, and a conductor joining or leaving only
+        moves its share of the nodes. A busy conductor only takes a share
+        of the request proportional to its spare capacity, the nodes over
+        it go to the next conductors on the ring.
 
         :param nodes: the names of nodes
-        :returns: an RPC topic string.
+        :param operation: the rpc method the nodes are sent to.
+        :returns: a dict of RPC topic to the nodes and the rpc workers of
+                  the conductor.
         :raises: NoValidHost
 
         """
-        conductors = self.dbapi.get_services(type='conductor')
+        conductors = self._conductors.get()
         if not conductors:
             reason = (_('No conductor service registered'))
             raise exception.NoValidHost(reason=reason)
 
-        topic_dict = dict()
-        workers = 0
-        for cond in conductors:
-            # rpc workers is the number of child processes
-            cond.workers = cond.workers + 1 if cond.workers > 1 else 1
-            workers += cond.workers
-
-        per_worker = len(nodes) / workers
-        j = 0
-        for i in range(len(conductors) - 1):
-            cond = conductors[i]
-            topic = '%s.%s' % (self.topic, cond.hostname.encode('utf-8'))
-            t = dict()
-            t['nodes'] = nodes[j: cond.workers * per_worker]
-            t['workers'] = cond.workers
-            topic_dict[topic] = t
-            j += cond.workers * per_worker
-
-        cond = conductors[len(conductors) - 1]
-        topic = '%s.%s' % (self.topic, cond.hostname.encode('utf-8'))
-        t = {'nodes': nodes[j:], 'workers': cond.workers}
-        topic_dict[topic] = t
+        ring = self._conductors.get_ring(conductors)
+        quotas = self._conductors.get_quotas(conductors, len(nodes),
+                                             operation)
+        topic_dict = dict((c.topic, {'nodes': [], 'workers': c.weight})
+                          for c in conductors)
+        for name in nodes:
+            for topic in ring.iter_hosts(name):
+                names = topic_dict[topic]['nodes']
+                if len(names) < quotas[topic]:
+                    break
+            names.append(name)
+        for topic, t in six.iteritems(topic_dict):
+            self._conductors.dispatched(topic, len(t['nodes']))
         return topic_dict
 
     def get_topic_for_callback(self, conductor_id):
@@ -158,6 +363,11 @@ class ConductorAPI(object):
 
         :param node: the callback node
         """
+        for cond in self._conductors.get():
+            if cond.id == conductor_id:
+                return cond.topic
+        # The conductor may be down, or registered after the cache.
+        self._conductors.invalidate()
         conductor = self.dbapi.get_service_from_id(id=conductor_id)
         if not conductor:
             reason = (_('Conductor %(id)s is not registered') % conductor_id)
@@ -167,17 +377,14 @@ class ConductorAPI(object):
     def get_topic_for_affinity(self, names, result):
         # nodes [('<node_name>', affinity_id),]
         nodes = self.dbapi.get_node_affinity_in(names)
-        conductors = self.dbapi.get_services(type='conductor')
+        conductors = self._conductors.get()
         if not conductors:
             reason = (_('No conductor service registered'))
             raise exception.NoValidHost(reason=reason)
-        cond_dict = dict((c.id, '%s.%s' % (self.topic,
-            c.hostname.encode('utf-8'))) for c in conductors)
-        topic_dict = dict(('%s.%s' % (self.topic, c.hostname.encode('utf-8')),
-                           {'nodes': [], 'workers': c.workers}) for c in
-                          conductors)
-        default_topic = '%s.%s' % (self.topic,
-                                   conductors[0].hostname.encode('utf-8'))
+        cond_dict = dict((c.id, c.topic) for c in conductors)
+        topic_dict = dict((c.topic, {'nodes': [], 'workers': c.weight})
+                          for c in conductors)
+        default_topic = conductors[0].topic
         for node in nodes:
             if node[1]:
                 if cond_dict.has_key(node[1]):
@@ -204,7 +411,8 @@ class ConductorAPI(object):
             raise exception.InvalidParameterValue(
                 _("Invalid parameter kwargs %(kwargs)s") % {
                     'kwargs': str(kwargs)})
-        topic_dict = self.get_topic_for(kwargs.pop('names'))
+        topic_dict = self.get_topic_for(kwargs.pop('names'),
+                                        _operation(func))
 
         futures = []
         for topic, node_info in topic_dict.items():
@@ -213,7 +421,7 @@ class ConductorAPI(object):
             cctxt = self.client.prepare(topic=topic or self.topic,
                                         version='1.0')
             temp = self.spawn_worker(func, cctxt, workers=workers, names=nodes,
-                                     *args, **kwargs)
+                                     topic=topic, *args, **kwargs)
             futures.extend(temp)
 
         return futures
@@ -240,7 +448,7 @@ class ConductorAPI(object):
             cctxt = self.client.prepare(topic=topic or self.topic,
                                         version='1.0')
             temp = self.spawn_worker(func, cctxt, workers=workers, names=nodes,
-                                     *args, **kwargs)
+                                     topic=topic, *args, **kwargs)
             futures.extend(temp)
 
         return futures
@@ -252,11 +460,8 @@ class ConductorAPI(object):
         :param func_name: function name running on the manager hosts
 
         """
-        services = self.dbapi.get_services(type='conductor')
-        for s in services:
-            topic = '%s.%s' % (self.topic, s.hostname.encode('utf-8'))
-            cctxt = self.client.prepare(topic=topic or self.topic,
-                                        version='1.0')
+        for cond in self._conductors.get():
+            cctxt = self.client.prepare(topic=cond.topic, version='1.0')
             cctxt.cast(context, 'destroy_osimage', osimage=osimage)
 
     def change_power_state(self, context, names, target):
@@ -49,6 +49,8 @@ attributes that you may access:
         'shared' kwarg arg of TaskManager())
     task.nodes
         The Node object
+    task.locked_names
+        The names of nodes held by others (only with partial=True)
 Example usage:
 
 ::
@@ -90,6 +92,7 @@ raised in the background thread.):
 """
 
 import copy
+import time
 
 import futurist
 from oslo_config import cfg
@@ -137,7 +140,7 @@ def require_exclusive_lock(f):
 
 
 def acquire(context, node_names, shared=False, obj_info=None,
-            purpose='unspecified action'):
+            purpose='unspecified action', partial=False, cache=None):
     """Shortcut for acquiring a lock on a Node.
 
     :param context: Request context.
@@ -145,13 +148,17 @@ def acquire(context, node_names, shared=False, obj_info=None,
     :param shared: Boolean indicating whether to take a shared or exclusive
                    lock. Default: False.
     :param purpose: human-readable purpose to put to debug logs.
+    :param partial: Boolean indicating whether to go ahead with the nodes
+                    which could be locked. The nodes held by others are
+                    exposed as task.locked_names. Default: False.
+    :param cache: NodeCache used to load the nodes of a shared task.
     :returns: An instance of :class:`TaskManager`.
 
     """
     # NOTE(lintan): This is a workaround to set the context of periodic tasks.
     context.ensure_thread_contain_context()
     return TaskManager(context, node_names, shared=shared, obj_info=obj_info,
-                       purpose=purpose)
+                       purpose=purpose, partial=partial, cache=cache)
 
 
 class TaskManager(object):
@@ -163,7 +170,7 @@ class TaskManager(object):
     """
 
     def __init__(self, context, node_names, shared=False, obj_info=None,
-                 purpose='unspecified action'):
+                 purpose='unspecified action', partial=False, cache=None):
         """Create a new TaskManager.
 
         Acquire a lock on nodes. The lock can be either shared or
@@ -176,6 +183,12 @@ class TaskManager(object):
         :param shared: Boolean indicating whether to take a shared or exclusive
                        lock. Default: False.
         :param purpose: human-readable purpose to put to debug logs.
+        :param partial: Boolean indicating whether to go ahead with the
+                        nodes which could be locked instead of failing the
+                        whole batch. Default: False.
+        :param cache: NodeCache used to load the nodes of a shared task,
+                      only the nodes changed since cached are read from
+                      the database.
         :raises: NodeNotFound
         :raises: NodeLocked
 
@@ -190,6 +203,11 @@ class TaskManager(object):
         self._purpose = purpose
         self._debug_timer = timeutils.StopWatch()
         self.obj_info = obj_info
+        self.partial = partial
+        # names of the nodes reserved by others in partial mode
+        self.locked_names = []
+        # names of the nodes which do not exist in partial mode
+        self.missing_names = []
 
         try:
             LOG.debug("Attempting to get %(type)s lock on nodes %(names)s (for"
@@ -202,7 +220,8 @@ class TaskManager(object):
                 self._debug_timer.restart()
                 self.nodes = objects.Node.list_in(context, node_names,
                                                   filters=['reservation'],
-                                                  obj_info=obj_info)
+                                                  obj_info=obj_info,
+                                                  cache=cache)
 
         except Exception:
             with excutils.save_and_reraise_exception():
@@ -218,6 +237,9 @@ class TaskManager(object):
 
     def _lock(self):
         self._debug_timer.restart()
+        if self.partial:
+            self._lock_partial()
+            return
 
         # NodeLocked exceptions can be annoying. Let's try to alleviate
         # some of that pain by retrying our lock attempts. The retrying
@@ -238,6 +260,53 @@ class TaskManager(object):
 
         reserve_nodes()
 
+    def _lock_partial(self):
+        """Reserve the free nodes, retry only on the nodes held by others.
+
+        Every attempt reserves all of the free nodes within one statement,
+        the following attempts only touch the nodes which were found to be
+        locked. The reserved nodes are recorded as soon as they are
+        reserved, so they are released if a later attempt fails. The names
+        of the nodes still locked after the last attempt are kept in
+        self.locked_names, the names of the nodes which do not exist or were
+        deleted during the retry interval in self.missing_names.
+        """
+        pending = self.node_names
+        self.nodes = []
+        self.node_names = []
+        attempts = CONF.conductor.node_locked_retry_attempts
+        for attempt in range(attempts):
+            try:
+                reserved, locked = objects.Node.reserve_nodes(
+                    self.context, CONF.host, pending, self.obj_info,
+                    partial=True)
+            except exception.NodeLocked:
+                reserved, locked = [], pending
+            except exception.NodeNotFound:
+                if attempt == 0:
+                    raise
+                # the rest of nodes were deleted during the retry interval
+                reserved, locked = [], []
+            self.nodes.extend(reserved)
+            self.node_names.extend(node.name for node in reserved)
+            found = set(locked)
+            found.update(node.name for node in reserved)
+            self.missing_names.extend(n for n in pending if n not in found)
+            pending = locked
+            if not pending or attempt == attempts - 1:
+                break
+            time.sleep(CONF.conductor.node_locked_retry_interval)
+
+        self.locked_names = pending
+        LOG.debug("Node %(names)s successfully reserved for %(purpose)s, "
+                  "%(locked)s locked by others, %(missing)s not found "
+                  "(took %(time).2f seconds)",
+                  {'names': self.node_names, 'purpose': self._purpose,
+                   'locked': self.locked_names,
+                   'missing': self.missing_names,
+                   'time': self._debug_timer.elapsed()})
+        self._debug_timer.restart()
+
     def upgrade_lock(self, purpose=None):
         """Upgrade a shared lock to an exclusive lock.
 
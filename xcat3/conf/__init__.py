@@ -21,7 +21,10 @@ from xcat3.conf import conductor
 from xcat3.conf import database
 from xcat3.conf import default
 from xcat3.conf import deploy
+from xcat3.conf import ipmi
 from xcat3.conf import network
+from xcat3.conf import openbmc
+from xcat3.conf import ssh
 
 CONF = cfg.CONF
 
@@ -30,4 +33,7 @@ conductor.register_opts(CONF)
 database.register_opts(CONF)
 default.register_opts(CONF)
 deploy.register_opts(CONF)
-network.register_opts(CONF)
\ No newline at end of file
+ipmi.register_opts(CONF)
+network.register_opts(CONF)
+openbmc.register_opts(CONF)
+ssh.register_opts(CONF)
\ No newline at end of file
@@ -55,11 +55,58 @@ opts = [
                        "SSL termination URL with 'public_endpoint' option.")),
     cfg.IntOpt('workers_pool_size',
                default=1000, min=10,
-               help=_('The size of the workers greenthread pool. ')),
+               help=_('The size of the greenthread pool running the rpc '
+                      'calls to the conductors. The pool is shared by all '
+                      'the requests and the asynchronous jobs of an api '
+                      'worker process, a call waits for a free greenthread '
+                      'and the calls not started within [api]timeout are '
+                      'reported as timed out. Each request has at most '
+                      'max_calls_per_worker calls per rpc worker of a '
+                      'conductor in the pool at once.')),
     cfg.IntOpt('per_group_count',
                default=200, min=1,
                help=_('The max amount of nodes to sumbit to the conductor '
-                      'service each time'))
+                      'service each time')),
+    cfg.IntOpt('job_ttl',
+               default=86400, min=60,
+               help=_('Seconds to keep the results of the asynchronous jobs '
+                      'after they are created.')),
+    cfg.FloatOpt('job_update_interval',
+                 default=2.0, min=0,
+                 help=_('The minimum interval in seconds between two saves '
+                        'of the progressive results of a running '
+                        'asynchronous job.')),
+    cfg.FloatOpt('job_poll_interval',
+                 default=1.0, min=0.1,
+                 help=_('Seconds between two checks of a running job when '
+                        'streaming its results to the client.')),
+    cfg.IntOpt('hash_ring_vnodes',
+               default=64, min=1,
+               help=_('The number of points each rpc worker of a conductor '
+                      'owns on the consistent hash ring mapping the nodes '
+                      'to the conductors. More points spread the nodes '
+                      'more evenly.')),
+    cfg.FloatOpt('load_balance_factor',
+                 default=1.25, min=1.0,
+                 help=_('How much a conductor may exceed its share of the '
+                        'nodes of a request, the share being proportional '
+                        'to the spare capacity the conductor reports with '
+                        'its heartbeat. The nodes over it go to the next '
+                        'conductor on the hash ring. A higher value keeps '
+                        'more nodes on the same conductor, a lower one '
+                        'follows the load more closely.')),
+    cfg.FloatOpt('group_target_duration',
+                 default=20.0, min=1.0,
+                 help=_('The seconds over which the rpc calls of an '
+                        'operation are considered slow. The nodes of a '
+                        'request for a slow operation are spread over the '
+                        'rpc workers of the conductor even if they fit in '
+                        'one group of per_group_count nodes.')),
+    cfg.IntOpt('max_calls_per_worker',
+               default=4, min=1,
+               help=_('The most rpc calls of a request in progress at once '
+                      'per rpc worker of a conductor. The next groups of '
+                      'nodes are sent as the previous calls return.')),
 ]
 
 opt_group = cfg.OptGroup(name='api',
@@ -47,7 +47,26 @@ opts = [
                help=_('The IP address on which xcat3-api listens.')),
     cfg.IntOpt('workers',
                 help='Number of workers for xCAT3 Conductor service. '
-                     'The default will be the number of CPUs available.')
+                     'The default will be the number of CPUs available.'),
+    cfg.BoolOpt('node_cache',
+                default=True,
+                help=_('Cache node objects in the conductor process. Read '
+                       'only tasks only reload the nodes whose version has '
+                       'changed in the database.')),
+    cfg.IntOpt('file_writer_workers',
+               default=8, min=1,
+               help=_('Number of chunks the files generated for the nodes '
+                      'of a provision request are split into, each chunk '
+                      'is written by a native thread of the eventlet '
+                      'thread pool, whose size is set with the '
+                      'EVENTLET_THREADPOOL_SIZE environment variable.')),
+    cfg.IntOpt('cpu_workers',
+               default=0, min=0,
+               help=_('Number of worker processes started by each conductor '
+                      'process to render the provisioning templates and '
+                      'hash the passwords, so that a large provision '
+                      'request uses more than one CPU core. The work is '
+                      'done within the conductor process if 0.')),
 ]
 
 
@@ -21,7 +21,16 @@ from xcat3.common.i18n import _
 opts = [
     cfg.StrOpt('mysql_engine',
                default='InnoDB',
-               help=_('MySQL engine to use.'))
+               help=_('MySQL engine to use.')),
+    cfg.IntOpt('max_in_clause_size',
+               default=500, min=1,
+               help=_('The maximum number of values placed into a single '
+                      'IN clause. Larger lists are split into batches '
+                      'which are executed within the same transaction.')),
+    cfg.IntOpt('yield_per',
+               default=1000, min=1,
+               help=_('Number of rows fetched at a time when a large table '
+                      'is streamed instead of loaded at once.')),
 ]
 
 
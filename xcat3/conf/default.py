@@ -82,6 +82,11 @@ utils_opts = [
     cfg.IntOpt('heartbeat_interval',
                default=10,
                help=_('Seconds between service heart beats.')),
+    cfg.StrOpt('template_cache_dir',
+               help=_('Directory to store the compiled Jinja2 templates in, '
+                      'so that the templates are not compiled again after '
+                      'the service restarts. The compiled templates are '
+                      'only kept in memory if not set.')),
 ]
 
 
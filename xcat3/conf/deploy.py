@@ -29,6 +29,25 @@ opts = [
                default=1800,
                help = (_('Maxinum time (in seconds) to wait for the completion'
                          ' of copycd process'))),
+    cfg.BoolOpt('pxe_shared_images',
+                default=False,
+                help=_('Reference the kernel and initrd of the osimage in '
+                       'the tftp directory from the PXE configuration '
+                       'directly, and write the configuration of each node '
+                       'as a single file named after its MAC address. If '
+                       'False, a directory with links to the kernel and '
+                       'initrd is created for each node. Clean the '
+                       'provisioned nodes before changing this option.')),
+    cfg.StrOpt('password_hash',
+               default='node',
+               choices=['node', 'passwd'],
+               help=_('How the unhashed passwords are hashed for the '
+                      'provisioned nodes. "node" hashes the password with '
+                      'a different salt for each node, the hashes of a '
+                      'provision request are computed together in a native '
+                      'thread. "passwd" computes one hash per password and '
+                      'crypt method and reuses it for all of the nodes '
+                      'until the password changes.')),
 ]
 
 
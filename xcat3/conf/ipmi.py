@@ -0,0 +1,77 @@
+# Updated 2017 for xcat test purpose
+# Copyright 2016 Intel Corporation
+# Copyright 2014 International Business Machines Corporation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo_config import cfg
+
+from xcat3.common.i18n import _
+
+opts = [
+    cfg.BoolOpt('session_pool',
+                default=True,
+                help=_('Keep the authenticated IPMI sessions and reuse them '
+                       'for the following operations on the same BMC '
+                       'instead of logging out after every operation.')),
+    cfg.IntOpt('session_idle_timeout',
+               default=30, min=0,
+               help=_('Seconds an unused IPMI session is kept in the pool '
+                      'before it is logged out. Keep it below the session '
+                      'timeout of the BMCs, commonly 60 seconds, after '
+                      'which they drop the idle sessions.')),
+    cfg.IntOpt('max_sessions_per_bmc',
+               default=1, min=1,
+               help=_('Maximum number of concurrent IPMI sessions opened '
+                      'to one BMC. Further operations on the same BMC wait '
+                      'for a free session.')),
+    cfg.BoolOpt('sweep',
+                default=True,
+                help=_('Query the power state of IPMI nodes with the sweep '
+                       'engine, which bounds the number of in-flight BMC '
+                       'requests, instead of starting one worker per node '
+                       'at once.')),
+    cfg.IntOpt('sweep_window',
+               default=64, min=1,
+               help=_('Initial number of in-flight IPMI requests of a power '
+                      'state sweep.')),
+    cfg.IntOpt('sweep_max_window',
+               default=512, min=1,
+               help=_('Upper bound of in-flight IPMI requests of a power '
+                      'state sweep. The window grows by one for every '
+                      'window worth of successful replies and is halved '
+                      'when a BMC times out.')),
+    cfg.FloatOpt('sweep_backoff',
+                 default=0.5, min=0,
+                 help=_('Seconds to pause the dispatching of new requests '
+                        'after a BMC timeout. The pause doubles on '
+                        'consecutive timeouts up to sweep_max_backoff.')),
+    cfg.FloatOpt('sweep_max_backoff',
+                 default=8.0, min=0,
+                 help=_('Maximum seconds to pause the dispatching of new '
+                        'requests after consecutive BMC timeouts.')),
+    cfg.IntOpt('sweep_subnet_prefix',
+               default=24, min=0, max=32,
+               help=_('Prefix length used to group BMC addresses into '
+                      'subnets for rate limiting.')),
+    cfg.FloatOpt('sweep_subnet_rate',
+                 default=200.0, min=0,
+                 help=_('Maximum number of new IPMI requests per second '
+                        'sent to one BMC subnet during a sweep. 0 means '
+                        'no limit.')),
+]
+
+
+def register_opts(conf):
+    conf.register_opts(opts, group='ipmi')
@@ -28,6 +28,32 @@ opts = [
                default=3660,
                help=_('Maximum time (in seconds) to process task in a worker'
                       'thread.')),
+    cfg.FloatOpt('dhcp_rebuild_window',
+                 default=2.0, min=0,
+                 help=_('Seconds to wait for more dhcp update requests '
+                        'after the last one, the requests arriving within '
+                        'the window are applied with one dhcp rebuild.')),
+    cfg.FloatOpt('dhcp_rebuild_max_delay',
+                 default=10.0, min=0,
+                 help=_('Maximum seconds a dhcp update request waits for '
+                        'more requests before the rebuild starts.')),
+    cfg.BoolOpt('dhcp_incremental',
+                default=True,
+                help=_('Push the added, changed and removed host entries to '
+                       'the running dhcpd through OMAPI instead of '
+                       'rewriting the configuration and restarting dhcpd. '
+                       'The configuration is still rebuilt when the subnets '
+                       'change or the OMAPI update fails.')),
+    cfg.PortOpt('omapi_port',
+                default=7911,
+                help=_('Port dhcpd listens on for OMAPI connections.')),
+    cfg.StrOpt('omapi_key_name',
+               help=_('Name of the HMAC-MD5 key used to authenticate the '
+                      'OMAPI connection. If not set, the OMAPI connection '
+                      'is not authenticated.')),
+    cfg.StrOpt('omapi_key_secret',
+               secret=True,
+               help=_('Base64 encoded secret of omapi_key_name.')),
 ]
 
 
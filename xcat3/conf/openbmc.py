@@ -0,0 +1,45 @@
+# Updated 2017 for xcat test purpose
+# Copyright 2016 Intel Corporation
+# Copyright 2014 International Business Machines Corporation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo_config import cfg
+
+from xcat3.common.i18n import _
+
+opts = [
+    cfg.BoolOpt('insecure',
+                default=False,
+                help=_('Do not verify the TLS certificate of the BMC.')),
+    cfg.IntOpt('max_connections_per_host',
+               default=2, min=1,
+               help=_('Maximum number of concurrent HTTPS connections '
+                      'opened to one BMC. Further requests to the same BMC '
+                      'wait for a free connection.')),
+    cfg.IntOpt('session_idle_timeout',
+               default=300, min=0,
+               help=_('Seconds an unused authenticated session to a BMC is '
+                      'kept before it is logged out. A session expired on '
+                      'the BMC side earlier is renewed on the next '
+                      '401 response.')),
+    cfg.IntOpt('request_timeout',
+               default=30, min=1,
+               help=_('Seconds to wait for the response of a REST request '
+                      'to the BMC.')),
+]
+
+
+def register_opts(conf):
+    conf.register_opts(opts, group='openbmc')
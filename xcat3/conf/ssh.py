@@ -0,0 +1,43 @@
+# Updated 2017 for xcat test purpose
+# Copyright 2016 Intel Corporation
+# Copyright 2014 International Business Machines Corporation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo_config import cfg
+
+from xcat3.common.i18n import _
+
+opts = [
+    cfg.BoolOpt('connection_pool',
+                default=True,
+                help=_('Keep one SSH connection per hypervisor and share it '
+                       'between the operations on the virtual machines of '
+                       'that hypervisor.')),
+    cfg.IntOpt('connection_idle_timeout',
+               default=300, min=0,
+               help=_('Seconds an unused SSH connection is kept in the pool '
+                      'before it is closed.')),
+    cfg.IntOpt('domain_index_ttl',
+               default=600, min=0,
+               help=_('Seconds the MAC address to VM name index of a '
+                      'hypervisor is kept before it is rebuilt. The index '
+                      'is also rebuilt when a node is not found in it or '
+                      'a command on the VM fails. 0 rebuilds the index for '
+                      'every operation.')),
+]
+
+
+def register_opts(conf):
+    conf.register_opts(opts, group='ssh')
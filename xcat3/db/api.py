@@ -71,12 +71,33 @@ class Connection(object):
         """
 
     @abc.abstractmethod
-    def reserve_nodes(self, tag, node_names):
+    def get_node_versions_in(self, node_names, filters=None):
+        """Get the change versions of nodes within names
+
+        :param node_names: the nodes names to select
+        :param filters: Filters to apply. Defaults to None.
+        :return: a list of (id, version, created_at, reservation) tuples
+        """
+
+    @abc.abstractmethod
+    def get_node_in_ids(self, node_ids):
+        """Get nodes collection within ids
+
+        :param node_ids: the nodes ids to select
+        :return: a list of nodes
+        """
+
+    @abc.abstractmethod
+    def reserve_nodes(self, tag, node_names, partial=False):
         """Reserve nodes.
 
         :param tag: A string uniquely identifying the reservation holder.
         :param node_names: The name of nodes.
-        :return object of nodes
+        :param partial: If True, reserve every free node and report the
+                        nodes already reserved instead of failing the whole
+                        batch.
+        :return object of nodes, or a (nodes, locked_names) pair in partial
+                mode.
         :raises: NodeNotFound if the node is not found.
         :raises: NodeLocked if the node is already reserved.
         """
@@ -222,9 +243,30 @@ class Connection(object):
     def get_dhcp_list(self):
         """List dhcp options"""
 
+    @abc.abstractmethod
+    def iter_dhcp_contents(self):
+        """Iterate (name, content) of the dhcp hosts ordered by name.
+
+        The rows are fetched in batches of [database]yield_per, the whole
+        table is never loaded into memory.
+        """
+
+    @abc.abstractmethod
+    def get_dhcp_opts_in(self, names):
+        """Return the dhcp options of the hosts.
+
+        :param names: list of the host names.
+        :returns: a dict of host name to options.
+        """
+
     @abc.abstractmethod
     def save_or_update_dhcp(self, names, dhcp_opts):
-        """Update dhcp options"""
+        """Update dhcp options
+
+        :param names: list of the host names.
+        :param dhcp_opts: a dict of host name to a dict with `opts` and the
+                          rendered `content`.
+        """
 
     @abc.abstractmethod
     def destroy_dhcp(self, names):
@@ -301,3 +343,37 @@ class Connection(object):
     @abc.abstractmethod
     def update_passwd(self, pwsswd_id, values):
         """Update attribute for Passwd object"""
+
+    @abc.abstractmethod
+    def create_job(self, values):
+        """Create a new job.
+
+        :param values: A dict containing the uuid, action, state, total
+                       and the initial result of the job.
+        :returns: A job.
+        """
+
+    @abc.abstractmethod
+    def get_job_by_uuid(self, job_uuid):
+        """Return a job.
+
+        :param job_uuid: The uuid of the job.
+        :raises: JobNotFound
+        """
+
+    @abc.abstractmethod
+    def update_job(self, job_uuid, values):
+        """Update the state and the result of a job.
+
+        :param job_uuid: The uuid of the job.
+        :param values: Dict of the values to update.
+        :raises: JobNotFound
+        """
+
+    @abc.abstractmethod
+    def destroy_jobs_before(self, timestamp):
+        """Delete the jobs created before the timestamp.
+
+        :param timestamp: a datetime.
+        :returns: the number of deleted jobs.
+        """
@@ -0,0 +1,30 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""add service load
+
+Revision ID: 2e8b5f0c7d14
+Revises: 9c4d1e6b2a58
+Create Date: 2026-10-17 20:41:53.620197
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '2e8b5f0c7d14'
+down_revision = '9c4d1e6b2a58'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('services', sa.Column('load', sa.Text(), nullable=True))
@@ -0,0 +1,34 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""add node reservation indexes
+
+Revision ID: 3d6f4a2c1b7e
+Revises: None
+Create Date: 2026-10-17 10:12:31.274853
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3d6f4a2c1b7e'
+down_revision = None
+
+from alembic import op
+
+
+def upgrade():
+    # (reservation, name) covers the `name IN (...)` lookups combined with
+    # `reservation IS NULL/IS NOT NULL` used while locking nodes.
+    op.create_index('nodes_reservation_name_idx', 'nodes',
+                    ['reservation', 'name'], unique=False)
+    op.create_index('nodes_conductor_affinity_idx', 'nodes',
+                    ['conductor_affinity'], unique=False)
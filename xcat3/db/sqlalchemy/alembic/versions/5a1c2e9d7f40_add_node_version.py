@@ -0,0 +1,31 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""add node version
+
+Revision ID: 5a1c2e9d7f40
+Revises: 3d6f4a2c1b7e
+Create Date: 2026-10-17 14:40:06.519204
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '5a1c2e9d7f40'
+down_revision = '3d6f4a2c1b7e'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('nodes', sa.Column('version', sa.Integer(), nullable=False,
+                                     server_default='0'))
@@ -0,0 +1,46 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""add dhcp content
+
+Revision ID: 7b2e4f1a9c63
+Revises: 5a1c2e9d7f40
+Create Date: 2026-10-17 16:02:31.204518
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '7b2e4f1a9c63'
+down_revision = '5a1c2e9d7f40'
+
+from alembic import op
+from oslo_serialization import jsonutils
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('dhcp', sa.Column('content', sa.Text(), nullable=True))
+
+    # Move the rendered content out of the json encoded options.
+    dhcp = sa.table('dhcp',
+                    sa.column('name', sa.String(255)),
+                    sa.column('opts', sa.Text()),
+                    sa.column('content', sa.Text()))
+    conn = op.get_bind()
+    rows = conn.execute(sa.select([dhcp.c.name, dhcp.c.opts])).fetchall()
+    for name, opts in rows:
+        if not opts:
+            continue
+        opts = jsonutils.loads(opts)
+        content = opts.pop('content', None)
+        conn.execute(dhcp.update().where(dhcp.c.name == name).values(
+            opts=jsonutils.dumps(opts), content=content))
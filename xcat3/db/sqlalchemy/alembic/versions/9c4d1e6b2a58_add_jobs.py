@@ -0,0 +1,47 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""add jobs
+
+Revision ID: 9c4d1e6b2a58
+Revises: 7b2e4f1a9c63
+Create Date: 2026-10-17 18:24:07.513962
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '9c4d1e6b2a58'
+down_revision = '7b2e4f1a9c63'
+
+from alembic import op
+from oslo_db.sqlalchemy import types as db_types
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'jobs',
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('uuid', sa.String(length=36), nullable=False),
+        sa.Column('action', sa.String(length=36), nullable=True),
+        sa.Column('state', sa.String(length=16), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('result', db_types.JsonEncodedDict(mysql_as_long=True),
+                  nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('uuid', name='uniq_jobs0uuid'),
+        mysql_charset='utf8',
+        mysql_engine='InnoDB')
+    op.create_index('jobs_created_at_idx', 'jobs', ['created_at'],
+                    unique=False)
@@ -20,6 +20,7 @@
 import datetime
 import six
 import threading
+import time
 
 from oslo_db import exception as db_exc
 from oslo_db.sqlalchemy import engines
@@ -102,6 +103,63 @@ def add_nic_filter(query, value):
         return add_identity_filter(query, value)
 
 
+def _in_chunks(values):
+    """Split values into batches bounded by [database]max_in_clause_size.
+
+    :param values: the values used for the IN clause.
+    :returns: a generator of value lists.
+    """
+    values = list(values)
+    size = CONF.database.max_in_clause_size
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _query_in(query, column, values):
+    """Run query with a chunked `column IN values` filter.
+
+    Callers are expected to run within a session context, so that all of
+    the batches are executed within the same transaction.
+
+    :returns: the merged result of all the batches.
+    """
+    result = []
+    for chunk in _in_chunks(values):
+        result.extend(query.filter(column.in_(chunk)).all())
+    return result
+
+
+def _update_in(query, column, values, updates):
+    """Update the rows matching a chunked `column IN values` filter.
+
+    :returns: the total count of updated rows.
+    """
+    count = 0
+    for chunk in _in_chunks(values):
+        count += query.filter(column.in_(chunk)).update(
+            updates, synchronize_session=False)
+    return count
+
+
+def _delete_in(query, column, values):
+    """Delete the rows matching a chunked `column IN values` filter.
+
+    :returns: the total count of deleted rows.
+    """
+    count = 0
+    for chunk in _in_chunks(values):
+        count += query.filter(column.in_(chunk)).delete(
+            synchronize_session=False)
+    return count
+
+
+def _bump_node_version(node_ids):
+    """Mark nodes as changed so that cached node objects get reloaded."""
+    node_ids = [node_id for node_id in node_ids if node_id is not None]
+    _update_in(model_query(models.Node), models.Node.id, node_ids,
+               {'version': models.Node.version + 1})
+
+
 def _paginate_query(model, sort_key=None, sort_dir=None, query=None):
     if not query:
         query = model_query(model)
@@ -158,11 +216,9 @@ class Connection(api.Connection):
             session.bulk_insert_mappings(models.Node, values)
             session.flush()
 
-        query = model_query(models.Node)
-        query = query.with_entities(models.Node.name,
-                                    models.Node.id).filter(
-            models.Node.name.in_(node_dict.keys()))
-        ids = query.all()
+        with _session_for_read():
+            query = model_query(models.Node.name, models.Node.id)
+            ids = _query_in(query, models.Node.name, node_dict.keys())
         id_dict = dict((id[0], id[1]) for id in ids)
         nic_values= []
         for node, nics in six.iteritems(node_dict):
@@ -204,16 +260,14 @@ class Connection(api.Connection):
 
     def destroy_nodes(self, node_ids):
         with _session_for_write():
-            query = model_query(models.Node).filter(
-                models.Node.id.in_(node_ids))
-            nodes = query.all()
+            query = model_query(models.Node.id)
+            nodes = _query_in(query, models.Node.id, node_ids)
             if not nodes:
                 raise exception.NodeNotFound(node=node_ids)
             # delete the nics related to the nodes
-            nics_query = model_query(models.Nics).filter(
-                models.Nics.node_id.in_(node_ids))
-            nics_query.delete(synchronize_session=False)
-            query.delete(synchronize_session=False)
+            _delete_in(model_query(models.Nics), models.Nics.node_id,
+                       node_ids)
+            _delete_in(model_query(models.Node), models.Node.id, node_ids)
 
     def get_node_list(self, filters=None, sort_key=None, sort_dir=None,
                       fields=None):
@@ -237,50 +291,93 @@ class Connection(api.Connection):
         if fields is None:
             fields = []
 
-        if len(fields) == 1 and 'name' in fields and \
-                        'not_reservation' in filters:
-            query = model_query(models.Node.name).filter(models.Node.name.in_(
-                node_names)).filter(models.Node.reservation.isnot(None))
-        elif len(fields) == 1 and 'name' in fields:
-            query = model_query(models.Node.name).filter(models.Node.name.in_(
-                node_names))
-        else:
-            query = model_query(models.Node).filter(models.Node.name.in_(
-                node_names))
-        if 'reservation' in filters:
-            query = query.filter_by(reservation=None)
-        return query.all()
+        with _session_for_read():
+            if len(fields) == 1 and 'name' in fields and \
+                            'not_reservation' in filters:
+                query = model_query(models.Node.name).filter(
+                    models.Node.reservation.isnot(None))
+            elif len(fields) == 1 and 'name' in fields:
+                query = model_query(models.Node.name)
+            else:
+                query = model_query(models.Node)
+            if 'reservation' in filters:
+                query = query.filter_by(reservation=None)
+            return _query_in(query, models.Node.name, node_names)
+
+    def get_node_versions_in(self, node_names, filters=None):
+        if filters is None:
+            filters = []
+
+        with _session_for_read():
+            query = model_query(models.Node.id, models.Node.version,
+                                models.Node.created_at,
+                                models.Node.reservation)
+            if 'reservation' in filters:
+                query = query.filter(models.Node.reservation.is_(None))
+            return _query_in(query, models.Node.name, node_names)
+
+    def get_node_in_ids(self, node_ids):
+        with _session_for_read():
+            query = model_query(models.Node)
+            return _query_in(query, models.Node.id, node_ids)
 
     def get_node_affinity_in(self, node_names):
-        query = model_query(models.Node)
-        query = query.with_entities(models.Node.name,
-                                    models.Node.conductor_affinity).filter(
-            models.Node.name.in_(node_names))
-        return query.all()
+        with _session_for_read():
+            query = model_query(models.Node.name,
+                                models.Node.conductor_affinity)
+            return _query_in(query, models.Node.name, node_names)
+
+    def reserve_nodes(self, tag, node_names, partial=False):
+        if partial:
+            return self._reserve_nodes_partial(tag, node_names)
 
-    def reserve_nodes(self, tag, node_names):
         with _session_for_write():
-            query = model_query(models.Node).filter(
-                models.Node.name.in_(node_names))
-            count = query.filter_by(reservation=None).update(
-                {'reservation': tag}, synchronize_session=False)
+            query = model_query(models.Node)
+            count = _update_in(query.filter_by(reservation=None),
+                               models.Node.name, node_names,
+                               {'reservation': tag})
 
-            nodes = query.all()
+            nodes = _query_in(query, models.Node.name, node_names)
             if not nodes:
                 raise exception.NodeNotFound(nodes=node_names)
             if count != len(node_names):
                 raise exception.NodeLocked(nodes=node_names)
             return nodes
 
+    def _reserve_nodes_partial(self, tag, node_names):
+        with _session_for_write():
+            # Lock the candidate rows so that the set of free nodes can not
+            # change between the check and the update below.
+            query = model_query(models.Node.id, models.Node.name,
+                                models.Node.reservation)
+            rows = _query_in(query.with_lockmode('update'), models.Node.name,
+                             node_names)
+            if not rows:
+                raise exception.NodeNotFound(node=node_names)
+
+            free_ids = [row[0] for row in rows if row[2] is None]
+            locked_names = [row[1] for row in rows if row[2] is not None]
+            if not free_ids:
+                return [], locked_names
+
+            query = model_query(models.Node)
+            count = _update_in(query.filter_by(reservation=None),
+                               models.Node.id, free_ids, {'reservation': tag})
+            if count != len(free_ids):
+                # Another writer raced us on a backend without row locks,
+                # let the caller retry the whole batch.
+                raise exception.NodeLocked(nodes=node_names)
+            return _query_in(query, models.Node.id, free_ids), locked_names
+
     def release_nodes(self, tag, node_names):
         with _session_for_write():
-            query = model_query(models.Node).filter(
-                models.Node.name.in_(node_names))
-            count = query.filter_by(reservation=tag).update(
-                {'reservation': None}, synchronize_session=False)
+            query = model_query(models.Node)
+            count = _update_in(query.filter_by(reservation=tag),
+                               models.Node.name, node_names,
+                               {'reservation': None})
 
             if count != len(node_names):
-                nodes = query.all()
+                nodes = _query_in(query, models.Node.name, node_names)
                 if not nodes:
                     raise exception.NodeNotFound(node_names)
                 for node in nodes:
@@ -329,17 +426,18 @@ class Connection(api.Connection):
         mapping = [v for v in updates_dict.values()]
         with _session_for_write() as session:
             session.bulk_update_mappings(models.Node, mapping)
+            _bump_node_version(updates_dict.keys())
 
     def save_nodes(self, node_ids, updates_dict):
         with _session_for_write() as session:
-            query = model_query(models.Node).filter(models.Node.id.in_(
-                node_ids))
-            nodes = query.with_lockmode('update').all()
+            query = model_query(models.Node).with_lockmode('update')
+            nodes = _query_in(query, models.Node.id, node_ids)
             if not nodes:
                 raise exception.NodeNotFound(node=','.join(node_ids))
             node_models = []
             for node in nodes:
                 node.update(updates_dict[node.id])
+                node.version = models.Node.version + 1
                 node_models.append(node)
 
             session.add_all(node_models)
@@ -360,6 +458,7 @@ class Connection(api.Connection):
                 if 'mac' in exc.columns:
                     raise exception.MACAlreadyExists(mac=values['mac'])
                 raise exception.NicAlreadyExists(uuid=values['uuid'])
+            _bump_node_version([nics.node_id])
             return nics
 
     def get_nic_by_id(self, id):
@@ -395,9 +494,9 @@ class Connection(api.Connection):
         return query.all()
 
     def get_nics_in_node_ids(self, node_ids):
-        query = model_query(models.Nics).filter(models.Nics.node_id.in_(
-            node_ids))
-        return query.all()
+        with _session_for_read():
+            query = model_query(models.Nics)
+            return _query_in(query, models.Nics.node_id, node_ids)
 
     def update_nic(self, nic_id, values):
         # NOTE(dtantsur): this can lead to very strange errors
@@ -410,8 +509,11 @@ class Connection(api.Connection):
                 query = model_query(models.Nics)
                 query = add_nic_filter(query, nic_id)
                 ref = query.one()
+                node_ids = [ref.node_id]
                 ref.update(values)
                 session.flush()
+                node_ids.append(ref.node_id)
+                _bump_node_version(set(node_ids))
         except NoResultFound:
             raise exception.NicNotFound(nic=nic_id)
         except db_exc.DBDuplicateEntry:
@@ -422,9 +524,12 @@ class Connection(api.Connection):
         with _session_for_write():
             query = model_query(models.Nics)
             query = add_nic_filter(query, nic_id)
-            count = query.delete()
-            if count == 0:
+            nic = query.first()
+            if nic is None:
                 raise exception.NicNotFound(nic=nic_id)
+            node_id = nic.node_id
+            query.delete()
+            _bump_node_version([node_id])
 
     def get_network_by_id(self, id):
         query = model_query(models.Networks)
@@ -481,29 +586,47 @@ class Connection(api.Connection):
         query = model_query(models.DHCP)
         return query.all()
 
+    def iter_dhcp_contents(self):
+        with _session_for_read() as session:
+            # yield_per streams the result with a server side cursor where
+            # the driver supports it.
+            query = (session.query(models.DHCP.name, models.DHCP.content)
+                     .order_by(models.DHCP.name)
+                     .yield_per(CONF.database.yield_per))
+            for name, content in query:
+                yield name, content
+
+    def get_dhcp_opts_in(self, names):
+        with _session_for_read():
+            query = model_query(models.DHCP.name, models.DHCP.opts)
+            return dict(_query_in(query, models.DHCP.name, names))
+
     def save_or_update_dhcp(self, names, dhcp_opts):
         # As there is already lock for each node, consistency is ignored here.
         with _session_for_write() as session:
-            query = model_query(models.DHCP.name).filter(models.DHCP.name.in_(names))
-            nodes = query.all()
+            query = model_query(models.DHCP.name)
+            nodes = _query_in(query, models.DHCP.name, names)
             if nodes:
                 mapping = []
                 for node in nodes:
+                    values = dhcp_opts.pop(node.name)
                     node_opt = {'name': node[0],
-                                'opts': dhcp_opts[node[0]]}
-                    dhcp_opts.pop(node.name)
+                                'opts': values['opts'],
+                                'content': values['content']}
                     mapping.append(node_opt)
                 session.bulk_update_mappings(models.DHCP, mapping)
 
-        mapping = [{'name':k, 'opts': v} for k, v in six.iteritems(dhcp_opts)]
+        mapping = [{'name': k, 'opts': v['opts'], 'content': v['content']}
+                   for k, v in six.iteritems(dhcp_opts)]
         with _session_for_write() as session:
             session.bulk_insert_mappings(models.DHCP, mapping)
 
     def destroy_dhcp(self, names):
         with _session_for_write() as session:
-            stmt = models.DHCP.__table__.delete().where(
-                models.DHCP.name.in_(names))
-            session.execute(stmt)
+            for chunk in _in_chunks(names):
+                stmt = models.DHCP.__table__.delete().where(
+                    models.DHCP.name.in_(chunk))
+                session.execute(stmt)
 
     def get_services(self, type='conductor', check_limit=True):
         interval = CONF.heartbeat_timeout
@@ -560,16 +683,30 @@ class Connection(api.Connection):
             if count == 0:
                 raise exception.ServiceNotFound(service=hostname)
 
-    def touch_service(self, hostname, type):
+    def touch_service(self, hostname, type, load=None):
         with _session_for_write():
             query = (model_query(models.Service)
                      .filter_by(hostname=hostname, type=type))
             # since we're not changing any other field, manually set updated_at
             # and since we're heartbeating, make sure that online=True
-            count = query.update({'updated_at': timeutils.utcnow(),
-                                  'online': True})
-            if count == 0:
+            values = {'updated_at': timeutils.utcnow(), 'online': True}
+            if load is None:
+                count = query.update(values)
+                if count == 0:
+                    raise exception.ServiceNotFound(service=hostname)
+                return
+
+            # The processes of the service report their load in the same
+            # record, merge under the row lock and drop the stale reports.
+            ref = query.with_lockmode('update').first()
+            if ref is None:
                 raise exception.ServiceNotFound(service=hostname)
+            limit = time.time() - CONF.heartbeat_timeout
+            merged = dict((k, v) for k, v in six.iteritems(ref.load or {})
+                          if v.get('time', 0) > limit)
+            merged.update(load)
+            values['load'] = merged
+            ref.update(values)
 
     def _do_update_network(self, network_id, values):
         with _session_for_write():
@@ -713,3 +850,31 @@ class Connection(api.Connection):
                 raise exception.DuplicateName(net=values['key'])
             else:
                 raise
+
+    def create_job(self, values):
+        job = models.Job()
+        job.update(values)
+        with _session_for_write() as session:
+            session.add(job)
+            session.flush()
+            return job
+
+    def get_job_by_uuid(self, job_uuid):
+        query = model_query(models.Job).filter_by(uuid=job_uuid)
+        try:
+            return query.one()
+        except NoResultFound:
+            raise exception.JobNotFound(job=job_uuid)
+
+    def update_job(self, job_uuid, values):
+        with _session_for_write():
+            query = model_query(models.Job).filter_by(uuid=job_uuid)
+            count = query.update(values, synchronize_session=False)
+            if count != 1:
+                raise exception.JobNotFound(job=job_uuid)
+
+    def destroy_jobs_before(self, timestamp):
+        with _session_for_write():
+            query = model_query(models.Job).filter(
+                models.Job.created_at < timestamp)
+            return query.delete(synchronize_session=False)
@@ -73,6 +73,8 @@ class Service(Base):
     type = Column(String(255), default='conductor')
     workers = Column(Integer)
     online = Column(Boolean, default=True)
+    # process id -> load metrics reported by the heartbeat of the process
+    load = Column(db_types.JsonEncodedDict, nullable=True)
 
 
 class Node(Base):
@@ -81,6 +83,8 @@ class Node(Base):
     __tablename__ = 'nodes'
     __table_args__ = (
         schema.UniqueConstraint('name', name='uniq_nodes0name'),
+        Index('nodes_reservation_name_idx', 'reservation', 'name'),
+        Index('nodes_conductor_affinity_idx', 'conductor_affinity'),
         table_args())
     id = Column(Integer, primary_key=True)
     name = Column(String(255), nullable=False)
@@ -97,6 +101,9 @@ class Node(Base):
     console_info = Column(db_types.JsonEncodedDict, nullable=True)
     nics_config = Column(db_types.JsonEncodedDict, nullable=True)
     reservation = Column(String(255), nullable=True)
+    # bumped on every change of the node or its nics, used by the conductor
+    # to validate the cached node objects.
+    version = Column(Integer, nullable=False, default=0, server_default='0')
     conductor_affinity = Column(Integer,
                                 ForeignKey('services.id',
                                            name='nodes_conductor_affinity_fk'),
@@ -151,7 +158,10 @@ class DHCP(Base):
     """Represents the dhcp configuration for each host"""
     __tablename__ = 'dhcp'
     name = Column(String(255), primary_key=True)
+    # ip, mac, hostname and statements of the host
     opts = Column(db_types.JsonEncodedDict, nullable=True)
+    # the rendered host declaration of dhcpd.conf
+    content = Column(Text, nullable=True)
 
 
 class OSImage(Base):
@@ -185,6 +195,23 @@ class Passwd(Base):
     crypt_method = Column(String(16), nullable=True)
 
 
+class Job(Base):
+    """Represents an asynchronous bulk operation on the nodes."""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        schema.UniqueConstraint('uuid', name='uniq_jobs0uuid'),
+        Index('jobs_created_at_idx', 'created_at'),
+        table_args())
+    id = Column(Integer, primary_key=True)
+    uuid = Column(String(36), nullable=False)
+    action = Column(String(36), nullable=True)
+    state = Column(String(16), nullable=False)
+    total = Column(Integer, nullable=False, default=0)
+    # The per node results of 10k nodes overflow a mysql TEXT column.
+    result = Column(db_types.JsonEncodedDict(mysql_as_long=True),
+                    nullable=True)
+
+
 class Script(Base):
     """Represents scripts after os deployment"""
     __tablename__ = 'scripts'
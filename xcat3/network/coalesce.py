@@ -0,0 +1,94 @@
+# coding=utf-8
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Coalesce concurrent requests for the same expensive operation."""
+
+import threading
+import time
+
+
+class _Batch(object):
+    def __init__(self, now):
+        self.first = now
+        self.last = now
+        self.waiters = 0
+        self.error = None
+        self.done = threading.Event()
+
+
+class Coalescer(object):
+    """Run func once for all of the requests arriving close together.
+
+    The first request of a batch becomes its leader, it waits until no new
+    request arrives for `window` seconds, at most `max_delay` seconds after
+    the first one, then runs func once for the whole batch. The requests
+    arriving meanwhile run func in the next batch. Every request returns
+    after the func run covering it completes, or raises its exception.
+
+    :param func: the function to run, takes no argument.
+    :param window: callable returns the debounce window in seconds.
+    :param max_delay: callable returns the maximum delay in seconds.
+    """
+
+    def __init__(self, func, window, max_delay):
+        self._func = func
+        self._window = window
+        self._max_delay = max_delay
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._batch = None
+
+    def _debounce(self, batch):
+        while True:
+            with self._lock:
+                deadline = min(batch.last + self._window(),
+                               batch.first + self._max_delay())
+            delay = deadline - time.time()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def request(self):
+        """Request a run of func and wait for it.
+
+        :returns: the number of requests covered by the run.
+        :raises: the exception raised by func.
+        """
+        with self._lock:
+            now = time.time()
+            leader = self._batch is None
+            if leader:
+                self._batch = _Batch(now)
+            batch = self._batch
+            batch.last = now
+            batch.waiters += 1
+
+        if not leader:
+            batch.done.wait()
+        else:
+            self._debounce(batch)
+            with self._lock:
+                # The following requests start a new batch.
+                self._batch = None
+            with self._run_lock:
+                try:
+                    self._func()
+                except Exception as e:
+                    batch.error = e
+                finally:
+                    batch.done.set()
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.waiters
@@ -1,8 +1,8 @@
 import abc
-import jinja2
+import collections
+import hashlib
 import os
 import platform
-import weakref
 import subprocess
 import six
 
@@ -13,10 +13,16 @@ from xcat3.common import exception
 from xcat3.common.i18n import _, _LE, _LI, _LW
 from xcat3.common import utils
 from xcat3.conf import CONF
+from xcat3.network import omapi
 
 LOG = logging.getLogger(__name__)
 BASEDIR = os.path.abspath(os.path.dirname(__file__))
 OS_DISTRO = platform.dist()[0]
+# The per host fields of dhcp_node.template
+_HOST_FIELDS = ('hostname', 'mac', 'ip')
+# The dhcp options which are different for each node
+_HOST_OPTS = ('12', '15', '209')
+_PLACEHOLDER = '\x00%s\x00'
 
 @six.add_metaclass(abc.ABCMeta)
 class DhcpBase(object):
@@ -51,6 +57,10 @@ class DhcpBase(object):
     def build_conf(self):
         """build configuration file for dhcp"""
 
+    @abc.abstractmethod
+    def update_hosts(self):
+        """Apply the changed host options to the running dhcp server"""
+
 
 class ISCDHCPService(DhcpBase):
     CONF_PATH = '/etc/xcat3/dhcpd.conf'
@@ -60,13 +70,18 @@ class ISCDHCPService(DhcpBase):
                  '12': 'host-name', '15': 'server.ddns-hostname',
                  '209': 'conf-file'}
     dbapi = db_api.get_instance()
-    tmpl = None
 
     def __init__(self):
         super(ISCDHCPService, self).__init__()
         self.subnet_opts = list()
         self.dhcp_pobj = None
         self.request_map = dict()
+        # The digests of the host contents and the subnets the running
+        # dhcpd is serving, used to compute the changes pushed through
+        # OMAPI.
+        self.applied_hosts = None
+        self.applied_subnets = None
+        self.omapi = omapi.OMAPIClient()
         utils.ensure_file(self.LEASE_PATH)
 
     def start(self):
@@ -139,7 +154,7 @@ class ISCDHCPService(DhcpBase):
                 pid = int(f.read())
             except ValueError:
                 return False
-        if pid == self.dhcp_pobj.pid:
+        if self.dhcp_pobj is not None and pid == self.dhcp_pobj.pid:
             return True
 
         return False
@@ -182,31 +197,66 @@ class ISCDHCPService(DhcpBase):
 
         return '\n'.join(statements)
 
+    @staticmethod
+    def _opts_key(opts):
+        """Return a hashable key of the dhcp options other than the host."""
+        return tuple(sorted(
+            (k, tuple(sorted(six.iteritems(v))) if isinstance(v, dict)
+             else v) for k, v in six.iteritems(opts)))
+
+    @staticmethod
+    def _format(content, fields):
+        """Turn the placeholders of the fields into format conversions."""
+        content = content.replace('%', '%%')
+        for k in fields:
+            content = content.replace(_PLACEHOLDER % k, '%%(%s)s' % k)
+        return content
+
+    @classmethod
+    def _render_hosts(cls, tmpl, names, dhcp_opts):
+        """Render the host declarations of the nodes.
+
+        Most of the nodes provisioned together share the same boot options,
+        so the nodes are grouped by their options without the per host
+        values, the supersede statements and the template are rendered once
+        per group and only the per host values are filled in per node.
+
+        :returns: a dict of node name to the options and rendered content.
+        """
+        groups = collections.defaultdict(list)
+        for name in names:
+            opts = dhcp_opts[name]
+            host = dict((k, opts.pop(k)) for k in _HOST_FIELDS)
+            for k in _HOST_OPTS:
+                if k in opts:
+                    host[k] = opts[k]
+                    opts[k] = _PLACEHOLDER % k
+            groups[cls._opts_key(opts)].append((name, host, opts))
+
+        node_opts = {}
+        for hosts in six.itervalues(groups):
+            opts = hosts[0][2]
+            fields = _HOST_FIELDS + tuple(k for k in _HOST_OPTS if k in opts)
+            statements = cls._build_supersede(dict(opts))
+            params = dict((k, _PLACEHOLDER % k) for k in _HOST_FIELDS)
+            params['statements'] = statements
+            content = cls._format(tmpl.render(params), fields)
+            statements = cls._format(statements, fields)
+            for name, host, opts in hosts:
+                config = dict((k, host[k]) for k in _HOST_FIELDS)
+                config['statements'] = statements % host
+                node_opts[name] = {'opts': config, 'content': content % host}
+        return node_opts
+
     @classmethod
     def update_opts(cls, context, op, names, dhcp_opts):
         """Store the configuration options node_opts as dict"""
         node_opts = {}
         if op == 'add':
-            if cls.tmpl is None or cls.tmpl() is None:
-                template = os.path.join(BASEDIR, 'dhcp_node.template')
-                tmpl_path, tmpl_name = os.path.split(template)
-                loader = jinja2.FileSystemLoader(tmpl_path)
-                env = jinja2.Environment(loader=loader)
-                cls.tmpl = weakref.ref(env.get_template(tmpl_name))
-            tmpl = cls.tmpl()
-
-            for name in names:
-                opts = dhcp_opts[name]
-                config = {}
-                config['ip'] = opts.pop('ip')
-                config['mac'] = opts.pop('mac')
-                config['hostname'] = opts.pop('hostname')
-                config['statements'] = cls._build_supersede(opts)
-                # for the performance consideration
-                # `utils.render_template(template, config)` is not used
-                # directly
-                config['content'] = tmpl.render(config)
-                node_opts[name] = config
+            tmpl = utils.get_template(
+                os.path.join(BASEDIR, 'dhcp_node.template'))
+
+            node_opts = cls._render_hosts(tmpl, names, dhcp_opts)
             cls.dbapi.save_or_update_dhcp(names, node_opts)
         elif op == 'remove':
             cls.dbapi.destroy_dhcp(names)
@@ -227,21 +277,86 @@ class ISCDHCPService(DhcpBase):
 
     def _global_cfg(self):
         template = os.path.join(BASEDIR, 'dhcp_global.template')
-        with open(template, 'r') as f:
-            return f.read()
+        params = {}
+        if CONF.network.dhcp_incremental:
+            params['omapi_port'] = CONF.network.omapi_port
+            if (CONF.network.omapi_key_name and
+                    CONF.network.omapi_key_secret):
+                params['omapi_key_name'] = CONF.network.omapi_key_name
+                params['omapi_key_secret'] = CONF.network.omapi_key_secret
+        # jinja2 drops the trailing newline of the template
+        return utils.render_template(template, params) + '\n'
+
+    @staticmethod
+    def _digest(content):
+        return hashlib.sha1(content.encode('utf-8')).digest()
+
+    def update_hosts(self):
+        """Push the host changes since the last build through OMAPI.
+
+        :returns: True if the running dhcpd is up to date, False if the
+                  configuration should be rebuilt.
+        """
+        if (self.applied_hosts is None or not self.status() or
+                self.applied_subnets != self.subnet_opts):
+            return False
+
+        # Only the changed hosts are kept, the others are compared by the
+        # digest of their content as they are streamed from the database.
+        applied_hosts = dict()
+        changed = []
+        removed = []
+        for name, content in self.dbapi.iter_dhcp_contents():
+            digest = self._digest(content)
+            applied_hosts[name] = digest
+            old = self.applied_hosts.get(name)
+            if old != digest:
+                changed.append(name)
+                if old is not None:
+                    removed.append(name)
+        removed.extend(name for name in self.applied_hosts if
+                       name not in applied_hosts)
+        added = []
+        if changed:
+            added = list(six.itervalues(self.dbapi.get_dhcp_opts_in(changed)))
+        try:
+            self.omapi.update_hosts(added, removed)
+        except exception.DHCPProcessError as e:
+            LOG.warning(_LW('Failed to update dhcp hosts incrementally, '
+                            'rebuild the configuration: %s'), e)
+            self.applied_hosts = None
+            return False
+        self.applied_hosts = applied_hosts
+        LOG.info(_LI('Updated dhcp hosts incrementally, %(add)d added or '
+                     'changed, %(remove)d removed'),
+                 {'add': len(added), 'remove': len(removed)})
+        return True
 
     def build_conf(self):
-        node_cfgs = []
-        node_opts = self.dbapi.get_dhcp_list()
-        for opt in node_opts:
-            content = opt['opts']['content']
-            node_cfgs.append(content)
-        cfg = '%(global_cfg)s%(subnet_cfg)s\n%(node_cfg)s' % {
-            'global_cfg': self._global_cfg(),
-            'subnet_cfg': self._build_subnet_cfg(),
-            'node_cfg': '\n'.join(node_cfgs)}
-        utils.write_to_file(self.CONF_PATH, cfg)
+        """Write the dhcpd configuration file.
+
+        The host entries are streamed from the database into a temporary
+        file which replaces the configuration file once complete, so the
+        memory usage does not grow with the number of nodes and dhcpd never
+        reads a partially written file.
+        """
+        applied_hosts = dict()
+        with utils.atomic_write(self.CONF_PATH) as f:
+            f.write(self._global_cfg())
+            f.write(self._build_subnet_cfg())
+            f.write('\n')
+            first = True
+            for name, content in self.dbapi.iter_dhcp_contents():
+                if not first:
+                    f.write('\n')
+                f.write(content)
+                first = False
+                applied_hosts[name] = self._digest(content)
         # clean up the lease file, as restart dhcp will generate it again.
+        # This also drops the host entries dhcpd recorded for the OMAPI
+        # updates, they are all in the configuration file now.
         with open(self.LEASE_PATH, 'w') as f:
             f.truncate()
         os.chown(self.LEASE_PATH, 0, 0)
+        self.applied_hosts = applied_hosts
+        self.applied_subnets = list(self.subnet_opts)
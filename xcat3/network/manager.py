@@ -20,6 +20,8 @@
 
 """
 
+import threading
+
 from oslo_log import log
 import oslo_messaging as messaging
 from oslo_utils import fileutils
@@ -29,6 +31,8 @@ from xcat3.network import base_manager
 from xcat3 import objects
 from xcat3.common import ip_lib
 from xcat3.common.i18n import _, _LE, _LI, _LW
+from xcat3.conf import CONF
+from xcat3.network import coalesce
 from xcat3.network import dhcp
 
 MANAGER_TOPIC = 'xcat3.network_manager'
@@ -48,9 +52,29 @@ class NetworkManager(base_manager.BaseServiceManager):
         super(NetworkManager, self).__init__(host, topic)
         fileutils.ensure_tree(XCAT3_RUN_PATH)
         self.dhcp_service = dhcp.ISCDHCPService()
+        # Serialize the changes of dhcp configuration and process.
+        self._dhcp_lock = threading.Lock()
+        self._dhcp_coalescer = coalesce.Coalescer(
+            self._apply_dhcp_option,
+            lambda: CONF.network.dhcp_rebuild_window,
+            lambda: CONF.network.dhcp_rebuild_max_delay)
         self._restart_dhcp()
 
+    def _apply_dhcp_option(self):
+        with self._dhcp_lock:
+            # The subnets only change through restart_dhcp, which always
+            # rebuilds, here the changed hosts can be pushed to dhcpd alone.
+            if (CONF.network.dhcp_incremental and
+                    self.dhcp_service.update_hosts()):
+                return
+            self.dhcp_service.build_conf()
+            self.dhcp_service.restart()
+
     def _restart_dhcp(self):
+        with self._dhcp_lock:
+            self._rebuild_dhcp()
+
+    def _rebuild_dhcp(self):
         networks = objects.Network.list(context=None)
         ip_wappter = ip_lib.IPWrapper()
         self.dhcp_service.clear_subnet()
@@ -143,5 +167,9 @@ class NetworkManager(base_manager.BaseServiceManager):
         """
         LOG.info(_LI('Enable dhcp service for request '
                      '%s' % context.request_id))
-        self.dhcp_service.build_conf()
-        self.dhcp_service.restart()
+        # Concurrent provision requests are applied with one rebuild, this
+        # returns after the rebuild covering this request is applied.
+        count = self._dhcp_coalescer.request()
+        LOG.info(_LI('Dhcp service enabled for request %(request)s, '
+                     '%(count)d requests coalesced'),
+                 {'request': context.request_id, 'count': count})
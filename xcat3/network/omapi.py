@@ -0,0 +1,123 @@
+# coding=utf-8
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Update the host entries of a running ISC dhcpd through OMAPI."""
+
+from oslo_concurrency import processutils
+from oslo_log import log as logging
+
+from xcat3.common import exception
+from xcat3.common.i18n import _
+from xcat3.common import utils
+from xcat3.conf import CONF
+
+LOG = logging.getLogger(__name__)
+
+# omshell reports the failures in the output with exit code 0, on lines
+# starting with one of these, like "can't open object: not found". The
+# other lines echo the objects, which may contain any word.
+_FAILURES = ("can't ", 'not connected', 'dhcpctl_', 'you must')
+
+
+def _quote(value):
+    return '"%s"' % value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _failure_status(line):
+    """Return the status of an omshell failure line, None if not one."""
+    # omshell prompts with '>' when reading the commands from stdin
+    line = line.strip().lstrip('> ')
+    if not line.lower().startswith(_FAILURES):
+        return None
+    return line.rsplit(':', 1)[-1].strip().lower()
+
+
+class OMAPIClient(object):
+    """Run a batch of OMAPI host operations with one omshell process."""
+
+    def __init__(self, server='127.0.0.1'):
+        self.server = server
+
+    def _header(self):
+        lines = ['server %s' % self.server,
+                 'port %d' % CONF.network.omapi_port]
+        if CONF.network.omapi_key_name and CONF.network.omapi_key_secret:
+            lines.append('key %s %s' % (CONF.network.omapi_key_name,
+                                        CONF.network.omapi_key_secret))
+        lines.append('connect')
+        return lines
+
+    @staticmethod
+    def _remove(name):
+        return ['new host', 'set name = %s' % _quote(name), 'open', 'remove']
+
+    @staticmethod
+    def _create(opts):
+        lines = ['new host',
+                 'set name = %s' % _quote(opts['hostname']),
+                 'set hardware-address = %s' % opts['mac'],
+                 'set hardware-type = 1',
+                 'set ip-address = %s' % opts['ip']]
+        statements = ' '.join(opts.get('statements', '').split())
+        if statements:
+            lines.append('set statements = %s' % _quote(statements))
+        lines.append('create')
+        return lines
+
+    def _run(self, lines, ignore=()):
+        """Run the omshell commands.
+
+        :param lines: the omshell commands after the connection.
+        :param ignore: the statuses of the failures to ignore.
+        :raises: DHCPProcessError if omshell fails or reports a failure.
+        """
+        script = self._header() + lines + ['']
+        try:
+            out, err = utils.execute('omshell',
+                                     process_input='\n'.join(script))
+        except (OSError, processutils.ProcessExecutionError) as e:
+            raise exception.DHCPProcessError(
+                err=_('omshell failed: %s') % e)
+        failures = []
+        for line in out.splitlines():
+            status = _failure_status(line)
+            if status is not None and status not in ignore:
+                failures.append(line.strip())
+        if failures:
+            raise exception.DHCPProcessError(
+                err=_('OMAPI update failed: %s') % '; '.join(failures))
+
+    def update_hosts(self, added, removed):
+        """Remove and add host entries on the dhcp server.
+
+        :param added: list of the dhcp options of the hosts to add, the
+                      changed hosts should be in both added and removed.
+        :param removed: list of the host names to remove.
+        :raises: DHCPProcessError if omshell fails or dhcpd rejects any of
+                 the operations.
+        """
+        if removed:
+            lines = []
+            for name in removed:
+                lines.extend(self._remove(name))
+            # The host may be unknown to dhcpd already, that is fine.
+            self._run(lines, ignore=('not found',))
+        if added:
+            lines = []
+            for opts in added:
+                lines.extend(self._create(opts))
+            self._run(lines)
+        LOG.debug('Updated %(add)d and removed %(remove)d dhcp host entries '
+                  'through OMAPI', {'add': len(added),
+                                    'remove': len(removed)})
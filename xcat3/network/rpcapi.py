@@ -18,8 +18,6 @@
 Client side of the conductor RPC API.
 """
 
-import futurist
-from futurist import rejection
 import retrying
 import oslo_messaging as messaging
 from oslo_log import log
@@ -28,7 +26,6 @@ from xcat3.common import exception
 from xcat3.common import rpc
 from xcat3.common.i18n import _, _LE, _LI, _LW
 from xcat3.network import manager
-from xcat3.conf import CONF
 from xcat3.db import api as dbapi
 from xcat3.objects import base as objects_base
 
@@ -53,11 +50,6 @@ class NetworkAPI(object):
         self.client = rpc.get_client(target,
                                      version_cap=self.RPC_API_VERSION,
                                      serializer=serializer)
-        rejection_func = rejection.reject_when_reached(
-            CONF.network.workers_pool_size)
-        self._executor = futurist.GreenThreadPoolExecutor(
-            max_workers=CONF.network.workers_pool_size,
-            check_and_reject=rejection_func)
 
     def broadcast(self, context):
         """If network information is changed, notify the network worker"""
@@ -109,11 +109,18 @@ class Node(base.XCAT3Object, object_base.VersionedObjectDictCompat):
         return nodes
 
     @classmethod
-    def list_in(cls, context, names, filters=None, obj_info=None):
+    def list_in(cls, context, names, filters=None, obj_info=None,
+                cache=None):
         """Return a list of Node objects within the names
 
+        :param cache: optional NodeCache, if given, only the nodes changed
+                      since they were cached are loaded from the database.
         :returns: a list of :class:`Node` object with nics info
         """
+        if cache is not None:
+            return cls._list_in_cached(context, names, cache, filters,
+                                       obj_info)
+
         db_nodes = cls.dbapi.get_node_in(names, filters)
         nodes = cls._from_db_object_list(context, db_nodes)
 
@@ -122,12 +129,59 @@ class Node(base.XCAT3Object, object_base.VersionedObjectDictCompat):
         return nodes
 
     @classmethod
-    def reserve_nodes(cls, context, tag, node_names, obj_info=None):
-        db_nodes = cls.dbapi.reserve_nodes(tag, node_names)
+    def _list_in_cached(cls, context, names, cache, filters=None,
+                        obj_info=None):
+        with_nics = bool(obj_info and 'nics' in obj_info)
+        nodes = []
+        stale = {}
+        # NOTE: created_at is a part of the version to detect the
+        # node re-created with a recycled id.
+        for node_id, version, created_at, reservation in \
+                cls.dbapi.get_node_versions_in(names, filters):
+            node = cache.get(context, node_id, (version, created_at),
+                             with_nics)
+            if node is None:
+                stale[node_id] = (version, created_at)
+                continue
+            node.reservation = reservation
+            node.obj_reset_changes(['reservation'])
+            nodes.append(node)
+
+        if not stale:
+            return nodes
+
+        db_nodes = cls.dbapi.get_node_in_ids(stale.keys())
+        new_nodes = cls._from_db_object_list(context, db_nodes)
+        if with_nics:
+            nic_object.Nic.to_node_objs_with_nics_info(new_nodes)
+        for node in new_nodes:
+            cache.set(node, stale[node.id], with_nics)
+        nodes.extend(new_nodes)
+        return nodes
+
+    @classmethod
+    def reserve_nodes(cls, context, tag, node_names, obj_info=None,
+                      partial=False):
+        """Reserve nodes for the tag holder.
+
+        :param partial: if True, reserve the free nodes only and return a
+                        (nodes, locked_names) pair instead of raising
+                        NodeLocked for the whole batch.
+        :returns: a list of :class:`Node` object, or a (nodes, locked_names)
+                  pair in partial mode.
+        """
+        locked_names = []
+        if partial:
+            db_nodes, locked_names = cls.dbapi.reserve_nodes(tag, node_names,
+                                                             partial=True)
+        else:
+            db_nodes = cls.dbapi.reserve_nodes(tag, node_names)
         nodes = cls._from_db_object_list(context, db_nodes)
 
-        if obj_info and 'nics' in obj_info:
+        if nodes and obj_info and 'nics' in obj_info:
             nic_object.Nic.to_node_objs_with_nics_info(nodes)
+        if partial:
+            return nodes, locked_names
         return nodes
 
     @classmethod
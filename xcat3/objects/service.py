@@ -59,9 +59,13 @@ class Service(base.XCAT3Object, object_base.VersionedObjectDictCompat):
         raise NotImplementedError(
             _('Cannot update a service record directly.'))
 
-    def touch(self, context=None):
-        """Touch this conductor's DB record, marking it as up-to-date."""
-        self.dbapi.touch_service(self.hostname, self.type)
+    def touch(self, context=None, load=None):
+        """Touch this conductor's DB record, marking it as up-to-date.
+
+        :param load: optional dict of process id to the load metrics of
+                     the process to report.
+        """
+        self.dbapi.touch_service(self.hostname, self.type, load=load)
 
     @classmethod
     def register(cls, context, hostname, type='conductor',
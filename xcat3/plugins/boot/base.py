@@ -50,12 +50,13 @@ class BootInterface(base.BaseInterface):
         """
 
     @abc.abstractmethod
-    def build_boot_conf(self, node, os_boot_str, osimage):
+    def build_boot_conf(self, node, os_boot_str, osimage, files):
         """Build the configuration file and prepare kernal and initrd
 
         :param node: the node to act on.
         :param os_boot_str: the boot parameters from os plugin.
         :param osimage: the os info create by copycds.
+        :param files: the FileBatch to record the files of the node in.
         :raises: MissingParameterValue if a required parameter is missing.
         """
 
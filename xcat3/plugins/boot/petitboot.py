@@ -1,8 +1,6 @@
 # coding=utf-8
 
-import jinja2
 import os
-import weakref
 from oslo_utils import fileutils
 from oslo_config import cfg
 
@@ -22,7 +20,6 @@ class Petitboot(base.BootInterface):
 
     def __init__(self):
         fileutils.ensure_tree(self.CONFIG_DIR)
-        self.tmpl = None
 
     def _get_config_path(self, node):
         return os.path.join(self.CONFIG_DIR, node.name)
@@ -31,18 +28,10 @@ class Petitboot(base.BootInterface):
         return "http://%(ip)s/install/boot/%(node)s" % {
             'ip': CONF.conductor.host_ip, 'node': node.name}
 
-    def _create_config(self, node, opts):
-        if self.tmpl is None or self.tmpl() is None:
-            template = os.path.join(self.BASEDIR, 'petitboot.template')
-            tmpl_path, tmpl_name = os.path.split(template)
-            loader = jinja2.FileSystemLoader(tmpl_path)
-            env = jinja2.Environment(loader=loader)
-            self.tmpl = weakref.ref(env.get_template(tmpl_name))
-
-        tmpl = self.tmpl()
-        cfg = tmpl.render(opts)
+    def _create_config(self, node, opts, files):
+        template = os.path.join(self.BASEDIR, 'petitboot.template')
         cfg_file = self._get_config_path(node)
-        utils.write_to_file(cfg_file, cfg)
+        files.render(node.name, cfg_file, template, opts)
 
     def clean(self, node):
         utils.unlink_without_raise(self._get_config_path(node))
@@ -63,12 +52,13 @@ class Petitboot(base.BootInterface):
             '12': node.name, '15': node.name}
         return dhcp_opts
 
-    def build_boot_conf(self, node, os_boot_str, osimage):
+    def build_boot_conf(self, node, os_boot_str, osimage, files):
         """Build the configuration file and prepare kernal and initrd
 
         :param node: the node to act on.
         :param os_boot_str: the boot parameters from os plugin.
         :param osimage: the os image object create by copycds.
+        :param files: the FileBatch to record the files of the node in.
         :raises: MissingParameterValue if a required parameter is missing.
         """
         osimage_path = plugin_utils.get_http_root_for_osimage(osimage)
@@ -87,7 +77,7 @@ class Petitboot(base.BootInterface):
                 'host_ip': CONF.conductor.host_ip,
                 'node': node.name,
                 'os_boot_str': os_boot_str}
-        self._create_config(node, opts)
+        self._create_config(node, opts, files)
 
     def continue_deploy(self, node, plugin_map):
         """Continue deploy as callback request received
@@ -20,19 +20,17 @@ class PXEBoot(base.BootInterface):
     def __init__(self):
         fileutils.ensure_tree(self.CONFIG_DIR)
 
-    def _create_config(self, node, opts):
+    def _create_config(self, node, opts, files):
         template = os.path.join(self.BASEDIR, 'pxe_boot.template')
-        cfg = utils.render_template(template, opts)
-        cfg_file = self._get_config_path(node)
-        fileutils.ensure_tree(os.path.dirname(cfg_file))
-        utils.write_to_file(cfg_file, cfg)
+        files.render(node.name, self._get_config_path(node), template, opts)
 
     def clean(self, node):
         mac_path = self._get_mac_path(node)
         utils.unlink_without_raise(mac_path)
+        # The node directories only exist if the node was provisioned
+        # without pxe_shared_images.
         utils.rmtree_without_raise(plugin_utils.get_tftp_root_for_node(node))
-        utils.rmtree_without_raise(
-            os.path.dirname(self._get_config_path(node)))
+        utils.rmtree_without_raise(os.path.join(self.CONFIG_DIR, node.name))
 
     def gen_dhcp_opts(self, node):
         """Generate dhcp option dict for pxe configuration
@@ -52,6 +50,8 @@ class PXEBoot(base.BootInterface):
         return dhcp_opts
 
     def _get_config_path(self, node):
+        if CONF.deploy.pxe_shared_images:
+            return self._get_mac_path(node)
         return os.path.join(self.CONFIG_DIR, node.name, 'config')
 
     def _get_mac_path(self, node, delimiter='-'):
@@ -66,28 +66,28 @@ class PXEBoot(base.BootInterface):
         mac_file_name = '01-' + mac_file_name
         return os.path.join(self.CONFIG_DIR, mac_file_name)
 
-    def _link_mac_configs(self, node):
+    def _link_mac_configs(self, node, files):
         """Link each MAC address with the PXE configuration file.
 
         :param node: the node to act on
+        :param files: the FileBatch to record the link in.
         """
         config_path = self._get_config_path(node)
         mac_path = self._get_mac_path(node)
         relative_source_path = os.path.relpath(config_path,
                                                os.path.dirname(mac_path))
-        utils.create_link_without_raise(relative_source_path, mac_path)
+        files.symlink(node.name, relative_source_path, mac_path)
 
-    def build_boot_conf(self, node, os_boot_str, osimage):
+    def build_boot_conf(self, node, os_boot_str, osimage, files):
         """Build the configuration file and prepare kernal and initrd
 
         :param node: the node to act on.
         :param os_boot_str: the boot parameters from os plugin.
         :param osimage: the os image object create by copycds.
+        :param files: the FileBatch to record the files of the node in.
         :raises: MissingParameterValue if a required parameter is missing.
         """
-        node_path = plugin_utils.get_tftp_root_for_node(node)
         osimage_path = plugin_utils.get_tftp_root_for_osimage(osimage)
-        fileutils.ensure_tree(node_path)
         kernel = os.path.join(osimage_path, 'vmlinuz')
         if not os.path.exists(kernel):
             raise exception.FileNotFound(file=kernel)
@@ -96,23 +96,30 @@ class PXEBoot(base.BootInterface):
         if not os.path.exists(initrd):
             raise exception.FileNotFound(file=initrd)
 
-        link_kernel = os.path.join(node_path, 'vmlinuz')
-        link_initrd = os.path.join(node_path, 'initrd.img')
-
-        # create link for tftp transfer
-        relative_source_path = os.path.relpath(kernel,
-                                               os.path.dirname(link_kernel))
-        utils.create_link_without_raise(relative_source_path, link_kernel)
-        relative_source_path = os.path.relpath(initrd,
-                                               os.path.dirname(link_initrd))
-        utils.create_link_without_raise(relative_source_path, link_initrd)
-
-        opts = {'kernel': link_kernel, 'initrd': link_initrd,
+        shared = CONF.deploy.pxe_shared_images
+        if not shared:
+            node_path = plugin_utils.get_tftp_root_for_node(node)
+            link_kernel = os.path.join(node_path, 'vmlinuz')
+            link_initrd = os.path.join(node_path, 'initrd.img')
+
+            # create link for tftp transfer
+            relative_source_path = os.path.relpath(
+                kernel, os.path.dirname(link_kernel))
+            files.symlink(node.name, relative_source_path, link_kernel)
+            relative_source_path = os.path.relpath(
+                initrd, os.path.dirname(link_initrd))
+            files.symlink(node.name, relative_source_path, link_initrd)
+            kernel, initrd = link_kernel, link_initrd
+
+        opts = {'kernel': kernel, 'initrd': initrd,
                 'host_ip': CONF.conductor.host_ip,
                 'node': node.name,
                 'os_boot_str': os_boot_str}
-        self._create_config(node, opts)
-        self._link_mac_configs(node)
+        # With the shared images, the configuration file named after the
+        # MAC address is the only file of the node.
+        self._create_config(node, opts, files)
+        if not shared:
+            self._link_mac_configs(node, files)
 
     def continue_deploy(self, node, plugin_map):
         """Continue deploy as callback request received
@@ -52,6 +52,18 @@ class ControlInterface(base.BaseInterface):
         :raises: MissingParameterValue if a required parameter is missing.
         """
 
+    def sweep_power_state(self, nodes, spawn, timeout):
+        """Query the power state of many nodes in batch
+
+        :param nodes: the nodes to act on.
+        :param spawn: callable to start a function in a conductor worker.
+        :param timeout: seconds to wait for the whole query.
+        :returns: None if the plugin does not support sweep, otherwise an
+                  iterator of (node, ok, state_or_exception) tuples in the
+                  order the results arrive.
+        """
+        return None
+
     def get_inventory(self, node):
         """Get the inventory information from control module
 
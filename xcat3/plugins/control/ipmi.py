@@ -18,12 +18,14 @@
 
 from oslo_log import log
 from pyghmi import exceptions as pyghmi_exception
-from pyghmi.ipmi import command as ipmi_command
 from xcat3.plugins.control import base
+from xcat3.plugins.control import ipmi_session
+from xcat3.plugins.control import ipmi_sweep
 from xcat3.common import exception
 from xcat3.common.i18n import _, _LE, _LI, _LW
 from xcat3.common import states
 from xcat3.common import boot_device
+from xcat3.conf import CONF
 
 LOG = log.getLogger(__name__)
 
@@ -35,6 +37,10 @@ class IPMIPlugin(base.ControlInterface):
         boot_device.CDROM: 'cdrom',
     }
 
+    def __init__(self):
+        super(IPMIPlugin, self).__init__()
+        self._sessions = ipmi_session.SessionPool()
+
     def validate(self, node):
         """check the ipmi specific attributes"""
         if not node.control_info.has_key('bmc_address'):
@@ -55,11 +61,8 @@ class IPMIPlugin(base.ControlInterface):
         username = node.control_info.get('bmc_username')
         password = node.control_info.get('bmc_password')
         try:
-            ipmicmd = ipmi_command.Command(bmc=address,
-                                           userid=username,
-                                           password=password)
-            ret = ipmicmd.get_power()
-            ipmicmd.ipmi_session.logout()
+            ret = self._sessions.run(address, username, password,
+                                     lambda ipmicmd: ipmicmd.get_power())
         except pyghmi_exception.IpmiException as e:
             msg = (_("IPMI get power state failed for node %(node)s "
                      "with the following error: %(error)s") %
@@ -82,6 +85,27 @@ class IPMIPlugin(base.ControlInterface):
                 {'node': node.name, 'detail': ret})
             return states.ERROR
 
+    def sweep_power_state(self, nodes, spawn, timeout):
+        """Query the power state of nodes with bounded in-flight requests
+
+        :param nodes: the nodes to act on.
+        :param spawn: callable to start a function in a conductor worker.
+        :param timeout: seconds to wait for the whole query.
+        :returns: None if [ipmi]sweep is disabled, otherwise an iterator of
+                  (node, ok, state_or_exception) tuples.
+        """
+        if not CONF.ipmi.sweep:
+            return None
+
+        def _get_power_state(node):
+            self.validate(node)
+            return self.get_power_state(node)
+
+        sweep = ipmi_sweep.PowerSweep(spawn, ipmi_sweep.is_timeout)
+        return sweep.run(_get_power_state, nodes,
+                         lambda node: node.control_info.get('bmc_address'),
+                         timeout)
+
     def _power_on(self, node, address, username, password=None):
         """Turn the power on for this node.
 
@@ -97,13 +121,12 @@ class IPMIPlugin(base.ControlInterface):
         msg = _("IPMI power on failed for node %(node)s with the "
                 "following error: %(error)s")
         try:
-            ipmicmd = ipmi_command.Command(bmc=address,
-                                           userid=username,
-                                           password=password)
-            # NOTE(chenglch): Do not return directly as the BMC for OpenPOWER
-            # servers is very fragile, we always get timeout error from BMC.
-            ret = ipmicmd.set_power('on', False)
-            ipmicmd.ipmi_session.logout()
+            # NOTE(chenglch): Do not return directly as the BMC for
+            # OpenPOWER servers is very fragile, we always get timeout
+            # error from BMC.
+            ret = self._sessions.run(
+                address, username, password,
+                lambda ipmicmd: ipmicmd.set_power('on', False))
         except pyghmi_exception.IpmiException as e:
             error = msg % {'node': node.name, 'error': e}
             LOG.error(error)
@@ -132,13 +155,12 @@ class IPMIPlugin(base.ControlInterface):
         msg = _("IPMI power off failed for node %(node)s with the "
                 "following error: %(error)s")
         try:
-            ipmicmd = ipmi_command.Command(bmc=address,
-                                           userid=username,
-                                           password=password)
-            #NOTE(chenglch): Do not return directly as the BMC for OpenPOWER
-            # servers is very fragile, we always get timeout error from BMC.
-            ret = ipmicmd.set_power('off', False)
-            ipmicmd.ipmi_session.logout()
+            # NOTE(chenglch): Do not return directly as the BMC for
+            # OpenPOWER servers is very fragile, we always get timeout
+            # error from BMC.
+            ret = self._sessions.run(
+                address, username, password,
+                lambda ipmicmd: ipmicmd.set_power('off', False))
         except pyghmi_exception.IpmiException as e:
             error = msg % {'node': node.name, 'error': e}
             LOG.error(error)
@@ -169,13 +191,12 @@ class IPMIPlugin(base.ControlInterface):
         msg = _("IPMI power reboot failed for node %(node)s with the "
                 "following error: %(error)s")
         try:
-            ipmicmd = ipmi_command.Command(bmc=address,
-                                           userid=username,
-                                           password=password)
-            # NOTE(chenglch): Do not return directly as the BMC for OpenPOWER
-            # servers is very fragile, we always get timeout error from BMC.
-            ret = ipmicmd.set_power('boot', False)
-            ipmicmd.ipmi_session.logout()
+            # NOTE(chenglch): Do not return directly as the BMC for
+            # OpenPOWER servers is very fragile, we always get timeout
+            # error from BMC.
+            ret = self._sessions.run(
+                address, username, password,
+                lambda ipmicmd: ipmicmd.set_power('boot', False))
         except pyghmi_exception.IpmiException as e:
             error = msg % {'node': node.name, 'error': e}
             LOG.error(error)
@@ -223,11 +244,8 @@ class IPMIPlugin(base.ControlInterface):
         username = node.control_info.get('bmc_username')
         password = node.control_info.get('bmc_password')
         try:
-            ipmicmd = ipmi_command.Command(bmc=address,
-                                           userid=username,
-                                           password=password)
-            ret = ipmicmd.get_bootdev()
-            ipmicmd.ipmi_session.logout()
+            ret = self._sessions.run(address, username, password,
+                                     lambda ipmicmd: ipmicmd.get_bootdev())
             if 'error' in ret:
                 raise pyghmi_exception.IpmiException(ret['error'])
         except pyghmi_exception.IpmiException as e:
@@ -264,12 +282,9 @@ class IPMIPlugin(base.ControlInterface):
         username = node.control_info.get('bmc_username')
         password = node.control_info.get('bmc_password')
         try:
-            ipmicmd = ipmi_command.Command(bmc=address,
-                                           userid=username,
-                                           password=password)
             bootdev = self._BOOT_DEVICES_MAP[boot_device]
-            ipmicmd.set_bootdev(bootdev)
-            ipmicmd.ipmi_session.logout()
+            self._sessions.run(address, username, password,
+                               lambda ipmicmd: ipmicmd.set_bootdev(bootdev))
         except pyghmi_exception.IpmiException as e:
             LOG.error(_LE("IPMI set boot device failed for node %(node)s "
                           "with the following error: %(error)s"),
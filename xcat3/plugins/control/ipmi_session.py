@@ -0,0 +1,114 @@
+# coding=utf-8
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Pool of authenticated IPMI sessions for the IPMI plugin."""
+
+import threading
+
+from oslo_log import log
+from pyghmi import exceptions as pyghmi_exception
+from pyghmi.ipmi import command as ipmi_command
+
+from xcat3.conf import CONF
+from xcat3.plugins.control import pool
+
+LOG = log.getLogger(__name__)
+
+
+class SessionPool(pool.IdlePool):
+    """Keep authenticated pyghmi commands keyed by (bmc_address, username).
+
+    A session is returned to the pool after a successful operation and
+    reused by the next operation on the same BMC, sessions idle longer than
+    [ipmi]session_idle_timeout are logged out. The BMC may still drop a
+    session before, so an operation failing on a reused session is retried
+    once on a new one. The number of concurrent sessions to one BMC is
+    limited by [ipmi]max_sessions_per_bmc.
+    """
+
+    def __init__(self):
+        super(SessionPool, self).__init__()
+        self._semaphores = {}
+
+    @property
+    def idle_timeout(self):
+        return CONF.ipmi.session_idle_timeout
+
+    def _semaphore(self, key):
+        with self._lock:
+            sem = self._semaphores.get(key)
+            if sem is None:
+                sem = threading.Semaphore(CONF.ipmi.max_sessions_per_bmc)
+                self._semaphores[key] = sem
+            return sem
+
+    def _is_healthy(self, ipmicmd):
+        session = getattr(ipmicmd, 'ipmi_session', None)
+        if session is None or getattr(session, 'broken', False):
+            return False
+        return bool(getattr(session, 'logged', True))
+
+    def _connect(self, key, password):
+        return ipmi_command.Command(bmc=key[0], userid=key[1],
+                                    password=password)
+
+    def _close(self, key, ipmicmd):
+        try:
+            ipmicmd.ipmi_session.logout()
+        except Exception as e:
+            # The session may be broken already, nothing else to do.
+            LOG.debug('Failed to logout IPMI session: %s', e)
+
+    def run(self, address, username, password, func):
+        """Call func with an authenticated pyghmi command.
+
+        :param address: the bmc address.
+        :param username: the bmc username.
+        :param password: the bmc password.
+        :param func: callable taking the pyghmi command.
+        :returns: the return value of func.
+        :raises: IpmiException if the session can not be established.
+        """
+        key = (address, username)
+        with self._semaphore(key):
+            if not CONF.ipmi.session_pool:
+                ipmicmd = self._connect(key, password)
+                try:
+                    return func(ipmicmd)
+                finally:
+                    self._close(key, ipmicmd)
+
+            entry, reused = self._acquire(key, password, password)
+            try:
+                try:
+                    ret = func(entry.session)
+                except pyghmi_exception.IpmiException as e:
+                    if not reused:
+                        raise
+                    LOG.debug('IPMI operation failed on a reused session of '
+                              '%(bmc)s, retry on a new session: %(err)s',
+                              {'bmc': address, 'err': e})
+                    self._release(key, entry, broken=True)
+                    entry = None
+                    entry, reused = self._acquire(key, password, password,
+                                                  fresh=True)
+                    ret = func(entry.session)
+            except Exception:
+                # The session state is unknown after a failure, do not
+                # give it to others.
+                if entry is not None:
+                    self._release(key, entry, broken=True)
+                raise
+            self._release(key, entry)
+        return ret
@@ -0,0 +1,231 @@
+# coding=utf-8
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Sweep engine to run an IPMI request against a large number of BMCs.
+
+Instead of starting one worker for every node at once, the sweep keeps a
+window of in-flight requests. The window grows slowly while the BMCs reply
+and is halved with a pause when they time out. New requests to one BMC
+subnet are limited by a token bucket, so a sweep does not flood a single
+management network segment. Results are yielded as they arrive.
+"""
+
+import collections
+import time
+
+import netaddr
+from oslo_log import log
+import six
+from six.moves import queue
+
+from xcat3.common import exception
+from xcat3.common.i18n import _LW
+from xcat3.conf import CONF
+
+LOG = log.getLogger(__name__)
+
+# Bucket for the BMC addresses which are not IPv4 addresses
+_UNKNOWN_SUBNET = 'unknown'
+
+
+def subnet_of(address, prefix=None):
+    """Return the subnet key used for rate limiting of a BMC address.
+
+    :param address: the bmc address.
+    :param prefix: prefix length of subnet, default to
+                   [ipmi]sweep_subnet_prefix.
+    """
+    if prefix is None:
+        prefix = CONF.ipmi.sweep_subnet_prefix
+    try:
+        net = netaddr.IPNetwork('%s/%d' % (address, prefix), version=4)
+    except (netaddr.AddrFormatError, TypeError, ValueError):
+        return _UNKNOWN_SUBNET
+    return str(net.cidr)
+
+
+class _TokenBucket(object):
+    def __init__(self, rate):
+        self.rate = rate
+        # Allow one second worth of requests as a burst
+        self.capacity = max(rate, 1.0)
+        self.tokens = self.capacity
+        self.stamp = time.time()
+
+    def wait_time(self, now):
+        """Return seconds to wait before a token is available."""
+        if self.rate <= 0:
+            return 0
+        self.tokens = min(self.capacity,
+                          self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        if self.rate > 0:
+            self.tokens -= 1
+
+
+class PowerSweep(object):
+    """Run func(node) for nodes with bounded and adaptive concurrency.
+
+    :param spawn: callable spawn(func, *args) which starts func in a worker
+                  and raises NoFreeServiceWorker if the pool is full.
+    :param is_timeout: callable is_timeout(exc) which returns True if exc
+                       means the BMC did not answer in time.
+    """
+
+    def __init__(self, spawn, is_timeout):
+        self._spawn = spawn
+        self._is_timeout = is_timeout
+        self.window = min(CONF.ipmi.sweep_window, CONF.ipmi.sweep_max_window)
+        self._credit = 0
+        self._backoff = 0
+        self._paused_until = 0
+        self._buckets = {}
+
+    def _run(self, func, node, results):
+        try:
+            results.put((node, True, func(node)))
+        except Exception as e:
+            results.put((node, False, e))
+
+    def _on_success(self):
+        self._backoff = 0
+        self._credit += 1
+        if self._credit >= self.window:
+            self._credit = 0
+            self.window = min(self.window + 1, CONF.ipmi.sweep_max_window)
+
+    def _on_timeout(self, now):
+        self._credit = 0
+        self.window = max(self.window // 2, 1)
+        if self._backoff:
+            self._backoff = min(self._backoff * 2,
+                                CONF.ipmi.sweep_max_backoff)
+        else:
+            self._backoff = min(CONF.ipmi.sweep_backoff,
+                                CONF.ipmi.sweep_max_backoff)
+        self._paused_until = max(self._paused_until, now + self._backoff)
+
+    def _bucket(self, subnet):
+        bucket = self._buckets.get(subnet)
+        if bucket is None:
+            bucket = _TokenBucket(CONF.ipmi.sweep_subnet_rate)
+            self._buckets[subnet] = bucket
+        return bucket
+
+    def _account(self, node, ok, value):
+        if ok:
+            self._on_success()
+        elif self._is_timeout(value):
+            self._on_timeout(time.time())
+            LOG.warning(_LW('BMC of node %(node)s timed out, sweep window '
+                            'is reduced to %(window)d'),
+                        {'node': node.name, 'window': self.window})
+
+    def _dispatch(self, func, pending, results, inflight, now):
+        """Start requests until the window is full or no subnet is ready.
+
+        :returns: (inflight, wait) pair, wait is the seconds until the next
+                  subnet is ready to take a request, or None.
+        """
+        if now < self._paused_until:
+            return inflight, self._paused_until - now
+        wait = None
+        for subnet in list(pending):
+            if inflight >= self.window:
+                break
+            bucket = self._bucket(subnet)
+            nodes = pending[subnet]
+            while nodes and inflight < self.window:
+                delay = bucket.wait_time(now)
+                if delay > 0:
+                    wait = delay if wait is None else min(wait, delay)
+                    break
+                node = nodes.popleft()
+                try:
+                    self._spawn(self._run, func, node, results)
+                except exception.NoFreeServiceWorker:
+                    # The worker pool is exhausted by other requests, shrink
+                    # the window to what is running now and retry later.
+                    nodes.appendleft(node)
+                    self.window = max(inflight, 1)
+                    return inflight, CONF.ipmi.sweep_backoff or 0.1
+                bucket.consume()
+                inflight += 1
+            if not nodes:
+                del pending[subnet]
+        return inflight, wait
+
+    def run(self, func, nodes, address_of, timeout):
+        """Yield (node, ok, value) tuples as the requests complete.
+
+        value is the return value of func(node) if ok is True, otherwise
+        the exception raised. The nodes not finished within timeout are
+        not yielded, the caller is expected to report them.
+
+        :param func: the function to run for each node.
+        :param nodes: the node objects.
+        :param address_of: callable returns the bmc address of a node.
+        :param timeout: seconds to wait for the whole sweep.
+        """
+        pending = collections.OrderedDict()
+        for node in nodes:
+            subnet = subnet_of(address_of(node))
+            pending.setdefault(subnet, collections.deque()).append(node)
+
+        results = queue.Queue()
+        inflight = 0
+        deadline = time.time() + timeout
+        while pending or inflight:
+            now = time.time()
+            if now >= deadline:
+                break
+            inflight, wait = self._dispatch(func, pending, results,
+                                            inflight, now)
+            if not inflight:
+                # Nothing is running, sleep until a subnet is ready.
+                time.sleep(min(wait or 0.1, max(deadline - now, 0)))
+                continue
+            get_timeout = deadline - now
+            if wait is not None and pending:
+                get_timeout = min(get_timeout, wait)
+            try:
+                node, ok, value = results.get(timeout=get_timeout)
+            except queue.Empty:
+                continue
+            inflight -= 1
+            self._account(node, ok, value)
+            yield node, ok, value
+            # Return the results that arrived in the meantime without
+            # blocking, so that the window is refilled in batches.
+            while inflight:
+                try:
+                    node, ok, value = results.get_nowait()
+                except queue.Empty:
+                    break
+                inflight -= 1
+                self._account(node, ok, value)
+                yield node, ok, value
+
+
+def is_timeout(exc):
+    """Return True if the exception raised from the IPMI plugin is timeout.
+
+    pyghmi reports the BMC timeout with error message only.
+    """
+    return 'timeout' in six.text_type(exc).lower()
@@ -1,10 +1,14 @@
 from oslo_log import log
+import requests
 
-from xcat3.common import client as http_client
+from xcat3.common import boot_device
+from xcat3.common import client_exception
 from xcat3.common import exception
+from xcat3.common.i18n import _, _LW
 from xcat3.common import states
 
 from xcat3.plugins.control import base
+from xcat3.plugins.control import openbmc_session
 
 LOG = log.getLogger(__name__)
 
@@ -12,7 +16,9 @@ url_dict = {
     "set_power_state":
         "/xyz/openbmc_project/state/host0/attr/RequestedHostTransition",
     "get_power_state":
-        "/xyz/openbmc_project/state/host0"}
+        "/xyz/openbmc_project/state/host0",
+    "boot_source":
+        "/xyz/openbmc_project/control/host0/boot_source/attr/BootSource"}
 
 data_dict = {
     states.POWER_COMMAND_ON:
@@ -22,9 +28,22 @@ data_dict = {
     states.POWER_COMMAND_RESET:
         "xyz.openbmc_project.State.Host.Transition.Reboot"}
 
+HOST_STATE_OFF = 'xyz.openbmc_project.State.Host.HostState.Off'
+HOST_STATE_RUNNING = 'xyz.openbmc_project.State.Host.HostState.Running'
+
+_BOOT_SOURCE = 'xyz.openbmc_project.Control.Boot.Source.Sources.'
+_BOOT_DEVICES_MAP = {
+    boot_device.DISK: _BOOT_SOURCE + 'Disk',
+    boot_device.NET: _BOOT_SOURCE + 'Network',
+    boot_device.CDROM: _BOOT_SOURCE + 'ExternalMedia',
+}
+
 
 class OPENBMCPlugin(base.ControlInterface):
-    headers = {'Content-Type': 'application/json'}
+
+    def __init__(self):
+        super(OPENBMCPlugin, self).__init__()
+        self._sessions = openbmc_session.SessionPool()
 
     def validate(self, node):
         bmc_address = node.control_info.get('bmc_address')
@@ -40,43 +59,97 @@ class OPENBMCPlugin(base.ControlInterface):
             raise exception.MissingParameterValue(
                 _("OPENBMC password was not specified."))
 
-    def _login(self, node):
-        login_url = 'https://' + node.control_info['bmc_address'] + '/login'
-        login_data = {"data": [node.control_info['bmc_username'],
-                               node.control_info['bmc_password']]}
-        client = http_client.HttpClient()
-        client.post(login_url, headers=self.headers, data=login_data)
-        return client
-
-    def _get_power_state(self, client, node):
-        request_url = 'https://' + node.control_info['bmc_address'] + url_dict[
-            'get_power_state']
-        reap, body = client.get(request_url, headers=self.headers)
+    def _request(self, node, method, url_key, body=None):
+        """Send request to the BMC of node with the pooled session.
+
+        :raises: OpenBMCFailure if the request fails.
+        """
+        try:
+            return self._sessions.request(node.control_info['bmc_address'],
+                                          node.control_info['bmc_username'],
+                                          node.control_info['bmc_password'],
+                                          method, url_dict[url_key], body)
+        except (client_exception.ClientException,
+                client_exception.ConnectionRefused,
+                requests.RequestException) as e:
+            msg = (_("OPENBMC %(method)s %(url)s failed for node %(node)s "
+                     "with the following error: %(error)s") %
+                   {'method': method, 'url': url_dict[url_key],
+                    'node': node.name, 'error': e})
+            LOG.error(msg)
+            raise exception.OpenBMCFailure(cmd=msg)
+
+    def _get_power_state(self, node):
+        body = self._request(node, 'GET', 'get_power_state')
         return body['data']['CurrentHostState']
 
     def get_power_state(self, node):
-        client = self._login(node)
-        return self._get_power_state(client, node)
+        """Return the power state of the node
+
+        :param node: the node to act on.
+        :raises: OpenBMCFailure when the REST call fails.
+        :returns: a power state.
+        """
+        state = self._get_power_state(node)
+        if state == HOST_STATE_RUNNING:
+            return states.POWER_ON
+        elif state == HOST_STATE_OFF:
+            return states.POWER_OFF
+        LOG.warning(_LW("OPENBMC get power state for node %(node)s returns "
+                        "%(state)s"), {'node': node.name, 'state': state})
+        return states.ERROR
 
     def set_power_state(self, node, power_state):
-        client = self._login(node)
+        """Set the power state of the node
 
+        :param node: the node to act on.
+        :param power_state: Any power state.
+        :raises: OpenBMCFailure when the REST call fails.
+        :raises: InvalidParameterValue when invalid power state is specified.
+        """
         if power_state == states.POWER_COMMAND_BOOT:
-            rpower_status = self._get_power_state(client, node)
-            if rpower_status == 'xyz.openbmc_project.State.Host.HostState.Off':
+            rpower_status = self._get_power_state(node)
+            if rpower_status == HOST_STATE_OFF:
                 request_data = {"data": data_dict[states.POWER_COMMAND_ON]}
             else:
                 request_data = {"data": data_dict[states.POWER_COMMAND_RESET]}
-        elif power_state == states.POWER_COMMAND_ON:
-            request_data = {"data": data_dict[states.POWER_COMMAND_ON]}
-        elif power_state == states.POWER_COMMAND_OFF:
-            request_data = {"data": data_dict[states.POWER_COMMAND_OFF]}
-        elif power_state == states.POWER_COMMAND_RESET:
-            request_data = {"data": data_dict[states.POWER_COMMAND_RESET]}
-
-        request_url = 'https://' + node.control_info['bmc_address'] + url_dict[
-            'set_power_state']
-        client.put(request_url, self.headers, request_data)
+        elif power_state in data_dict:
+            request_data = {"data": data_dict[power_state]}
+        else:
+            raise exception.InvalidParameterValue(
+                _("set_power_state called with an invalid power state: %s."
+                  ) % power_state)
+
+        self._request(node, 'PUT', 'set_power_state', request_data)
+
+    def get_boot_device(self, node):
+        """Return the boot device of the node
+
+        :param node: the node to act on.
+        :raises: OpenBMCFailure when the REST call fails.
+        :returns: the boot device
+        """
+        source = self._request(node, 'GET', 'boot_source')['data']
+        response = next((dev for dev, hdev in _BOOT_DEVICES_MAP.items() if
+                         hdev == source), boot_device.UNKNOWN)
+        if response == boot_device.UNKNOWN:
+            LOG.warning(_LW('OPENBMC get boot device for node %(node)s return'
+                            ' %(bootdev)s'),
+                        {'node': node.name, 'bootdev': source})
+        return response
+
+    def set_boot_device(self, node, boot_device):
+        """Set the boot device of the node
+
+        :param node: the node to act on.
+        :raises: InvalidParameterValue if boot_device is not supported.
+        :raises: OpenBMCFailure when the REST call fails.
+        """
+        if boot_device not in _BOOT_DEVICES_MAP:
+            raise exception.InvalidParameterValue(_(
+                "Invalid boot device %s specified.") % boot_device)
+        self._request(node, 'PUT', 'boot_source',
+                      {"data": _BOOT_DEVICES_MAP[boot_device]})
 
     def reboot(self, node):
         pass
@@ -0,0 +1,149 @@
+# coding=utf-8
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Pool of authenticated HTTPS sessions for the OpenBMC plugin."""
+
+import threading
+
+from oslo_log import log
+from requests import adapters
+
+from xcat3.common import client as http_client
+from xcat3.common import client_exception
+from xcat3.conf import CONF
+from xcat3.plugins.control import pool
+
+LOG = log.getLogger(__name__)
+
+
+class _Session(object):
+    def __init__(self):
+        self.client = http_client.HttpClient(insecure=CONF.openbmc.insecure)
+        # Keep-alive connections to the BMC, at most
+        # max_connections_per_host of them, further requests wait.
+        adapter = adapters.HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=CONF.openbmc.max_connections_per_host,
+            pool_block=True)
+        self.client.session.mount('https://', adapter)
+        self.semaphore = threading.Semaphore(
+            CONF.openbmc.max_connections_per_host)
+        self.login_lock = threading.Lock()
+        self.password = None
+        self.logged_in = False
+        # Increased on every login, so that concurrent requests failed with
+        # 401 renew the session only once.
+        self.generation = 0
+
+
+class SessionPool(pool.IdlePool):
+    """Keep an authenticated keep-alive session per (bmc_address, username).
+
+    The session cookie or X-Auth-Token from /login is reused by the
+    following requests. A request rejected with 401 logs in again and is
+    retried once. Sessions idle longer than [openbmc]session_idle_timeout
+    are logged out once no request uses them.
+    """
+
+    shared = True
+
+    @property
+    def idle_timeout(self):
+        return CONF.openbmc.session_idle_timeout
+
+    @staticmethod
+    def _url(address, path):
+        return 'https://%s%s' % (address, path)
+
+    @staticmethod
+    def _send(session, method, url, body=None):
+        return session.client.request(
+            url, method, headers={'Content-Type': 'application/json'},
+            body=body, timeout=CONF.openbmc.request_timeout)
+
+    def _connect(self, key, info):
+        return _Session()
+
+    def _close(self, key, session):
+        try:
+            if session.logged_in:
+                self._send(session, 'POST', self._url(key[0], '/logout'),
+                           body={'data': []})
+        except Exception as e:
+            # The session may be expired already, nothing else to do.
+            LOG.debug('Failed to logout OpenBMC session of %(bmc)s: %(err)s',
+                      {'bmc': key[0], 'err': e})
+        finally:
+            session.logged_in = False
+            session.client.session.close()
+
+    def _login(self, session, address, username, password, stale=None):
+        """Log in unless the session is valid and newer than stale.
+
+        :returns: the login generation of the session.
+        """
+        with session.login_lock:
+            if (session.logged_in and session.password == password and
+                    (stale is None or session.generation != stale)):
+                return session.generation
+            session.logged_in = False
+            session.client.session.headers.pop('X-Auth-Token', None)
+            resp, body = self._send(session, 'POST',
+                                    self._url(address, '/login'),
+                                    body={'data': [username, password]})
+            # bmcweb returns a token, phosphor-rest relies on the cookie
+            # kept by the requests session.
+            token = body.get('token') if isinstance(body, dict) else None
+            if token:
+                session.client.session.headers['X-Auth-Token'] = token
+            session.password = password
+            session.logged_in = True
+            session.generation += 1
+            return session.generation
+
+    def request(self, address, username, password, method, path, body=None):
+        """Send a REST request to the BMC with the pooled session.
+
+        :param address: the bmc address.
+        :param username: the bmc username.
+        :param password: the bmc password.
+        :param method: http method.
+        :param path: the url path on the BMC.
+        :param body: request body to send as json.
+        :returns: the decoded json body of the response.
+        :raises: ClientException on http error response.
+        """
+        key = (address, username)
+        # The password is checked by _login, the session is kept when it
+        # changes.
+        entry, reused = self._acquire(key, None)
+        session = entry.session
+        url = self._url(address, path)
+        try:
+            with session.semaphore:
+                generation = self._login(session, address, username,
+                                         password)
+                try:
+                    resp, ret = self._send(session, method, url, body)
+                except client_exception.Unauthorized:
+                    # The session expired on the BMC side, renew it and
+                    # retry.
+                    LOG.debug('OpenBMC session of %s expired, login again',
+                              address)
+                    self._login(session, address, username, password,
+                                stale=generation)
+                    resp, ret = self._send(session, method, url, body)
+        finally:
+            self._release(key, entry)
+        return ret
@@ -0,0 +1,197 @@
+# coding=utf-8
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Base of the pools of sessions to the BMCs and the hypervisors."""
+
+import abc
+import threading
+import time
+
+import six
+
+
+class Entry(object):
+    """A pooled session and its bookkeeping."""
+
+    def __init__(self, session, credential):
+        self.session = session
+        self.credential = credential
+        self.last_used = time.time()
+        # number of operations holding the session
+        self.users = 0
+
+
+@six.add_metaclass(abc.ABCMeta)
+class IdlePool(object):
+    """Keep the sessions by key and close them once idle.
+
+    A session is checked out with _acquire() and returned with _release().
+    It is reused by the next operation with the same key and credential,
+    if it is still healthy. Sessions not in use and idle longer than
+    idle_timeout are closed by reap(), which runs every idle_timeout / 2
+    seconds as sessions are returned.
+
+    The subclasses provide idle_timeout, the _connect and _close hooks, and
+    optionally _is_healthy. A shared pool hands the same session to many
+    operations at once, otherwise a session serves one operation at a time.
+    """
+
+    shared = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> [Entry, ]
+        self._entries = {}
+        self._key_locks = {}
+        self._last_reap = time.time()
+
+    @abc.abstractproperty
+    def idle_timeout(self):
+        """Seconds an unused session is kept."""
+
+    @abc.abstractmethod
+    def _connect(self, key, info):
+        """Return a new session for the key.
+
+        :param key: the key of the pool.
+        :param info: the info given to _acquire.
+        """
+
+    @abc.abstractmethod
+    def _close(self, key, session):
+        """Close the session, errors should be ignored."""
+
+    def _is_healthy(self, session):
+        return True
+
+    def _expired(self, entry, now):
+        return entry.users == 0 and now - entry.last_used >= self.idle_timeout
+
+    def _key_lock(self, key):
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self._key_locks[key] = lock
+            return lock
+
+    def _find(self, key, credential):
+        """Check out a pooled session, drop the ones not usable anymore.
+
+        :returns: the (entry or None, stale sessions to close) pair.
+        """
+        stale = []
+        now = time.time()
+        with self._lock:
+            entries = self._entries.get(key, [])
+            found = None
+            for entry in list(entries):
+                if entry.users and not self.shared:
+                    continue
+                if (entry.credential == credential and
+                        self._is_healthy(entry.session) and
+                        not self._expired(entry, now)):
+                    found = entry
+                    break
+                # The operations still using the session keep it, it is
+                # closed when the last of them returns it.
+                entries.remove(entry)
+                if entry.users == 0:
+                    stale.append(entry.session)
+            if found is not None:
+                found.users += 1
+            elif not entries:
+                self._entries.pop(key, None)
+        return found, stale
+
+    def _checkout(self, key, credential, info, fresh):
+        entry = None
+        stale = []
+        if not fresh:
+            entry, stale = self._find(key, credential)
+        for session in stale:
+            self._close(key, session)
+        if entry is not None:
+            return entry, True
+        entry = Entry(self._connect(key, info), credential)
+        entry.users = 1
+        with self._lock:
+            self._entries.setdefault(key, []).append(entry)
+        return entry, False
+
+    def _acquire(self, key, credential, info=None, fresh=False):
+        """Check out a session.
+
+        :param key: the key of the pool.
+        :param credential: what the session is authenticated with, a
+                           session is only reused with the same credential.
+        :param info: passed to _connect if a new session is needed.
+        :param fresh: if True, always connect a new session.
+        :returns: the (entry, reused) pair, the session is entry.session.
+        """
+        if not self.shared:
+            return self._checkout(key, credential, info, fresh)
+        # Serialize the connection per key, the operations waiting here
+        # reuse the session established by the first one.
+        with self._key_lock(key):
+            return self._checkout(key, credential, info, fresh)
+
+    def _release(self, key, entry, broken=False):
+        """Return a session checked out by _acquire.
+
+        :param broken: if True, the session is not given to others anymore.
+        """
+        with self._lock:
+            entry.users -= 1
+            entry.last_used = time.time()
+            entries = self._entries.get(key, [])
+            pooled = entry in entries
+            if pooled and broken:
+                entries.remove(entry)
+                if not entries:
+                    del self._entries[key]
+                pooled = False
+            close = not pooled and entry.users == 0
+        if close:
+            self._close(key, entry.session)
+        self._maybe_reap()
+
+    def reap(self, force=False):
+        """Close the sessions not in use and idle longer than idle_timeout.
+
+        :param force: if True, close all of the sessions not in use.
+        """
+        expired = []
+        now = time.time()
+        with self._lock:
+            for key in list(self._entries):
+                alive = []
+                for entry in self._entries[key]:
+                    if entry.users == 0 and (force or
+                                             self._expired(entry, now)):
+                        expired.append((key, entry.session))
+                    else:
+                        alive.append(entry)
+                if alive:
+                    self._entries[key] = alive
+                else:
+                    del self._entries[key]
+            self._last_reap = now
+        for key, session in expired:
+            self._close(key, session)
+
+    def _maybe_reap(self):
+        interval = max(self.idle_timeout / 2, 1)
+        if time.time() - self._last_reap >= interval:
+            self.reap()
@@ -25,20 +25,26 @@ Currently supported environments are:
     Virsh       (virsh)
 """
 
+import collections
 import os
+import threading
+import time
 
 from oslo_concurrency import processutils
 from oslo_log import log as logging
 from oslo_utils import excutils
 
 import retrying
+from six.moves import queue
 
 from xcat3.common import boot_device
 from xcat3.common import exception
 from xcat3.common.i18n import _, _LE, _LW
 from xcat3.common import states
 from xcat3.common import utils
+from xcat3.conf import CONF
 from xcat3.plugins.control import base
+from xcat3.plugins.control import ssh_session
 from xcat3.plugins import utils as plugin_utils
 
 LOG = logging.getLogger(__name__)
@@ -118,6 +124,8 @@ def _get_command_sets(virt_type):
     start_cmd / stop_cmd: Starts or stops the identified VM
     get_node_macs: Retrieves all MACs for an identified VM.
         One MAC per line, any standard format (see driver_utils.normalize_mac)
+    list_macs: Retrieves the MACs of all VMs with one remote command.
+        One "<VM name> <MAC>" pair per line.
     get_boot_device / set_boot_device: Gets or sets the primary boot device
     """
     if virt_type == "virsh":
@@ -131,6 +139,11 @@ def _get_command_sets(virt_type):
             'get_node_macs': (
                 "dumpxml {_NodeName_} | "
                 "awk -F \"'\" '/mac address/{print $2}'| tr -d ':'"),
+            'list_macs': (
+                "{_BaseCmd_} list --all --name | while read -r d; do "
+                "if [ -n \"$d\" ]; then {_BaseCmd_} dumpxml \"$d\" | "
+                "awk -F \"'\" -v d=\"$d\" '/mac address/{print d\" \"$2}'; "
+                "fi; done"),
             'set_boot_device': (
                 "EDITOR=\"sed -i '/<boot \(dev\|order\)=*\>/d;"
                 "/<\/os>/i\<boot dev=\\\"{_BootDevice_}\\\"/>'\" "
@@ -149,11 +162,13 @@ def _get_command_sets(virt_type):
                                               {'virt_type': virt_type})
 
 
-def _get_boot_device(ssh_obj, control_info):
+def _get_boot_device(ssh_obj, control_info, node_name=None):
     """Get the current boot device.
 
     :param ssh_obj: paramiko.SSHClient, an active ssh connection.
     :param control_info: information for accessing the node.
+    :param node_name: the name the host uses for the node, looked up if
+        not given.
     :raises: SSHCommandFailed on an error from ssh.
     :raises: NotImplementedError if the virt_type does not support
         getting the boot device.
@@ -164,23 +179,27 @@ def _get_boot_device(ssh_obj, control_info):
     cmd_to_exec = control_info['cmd_set'].get('get_boot_device')
     if cmd_to_exec:
         boot_device_map = _get_boot_device_map(control_info['virt_type'])
-        node_name = _get_hosts_name_for_node(ssh_obj, control_info)
+        node_name = node_name or _get_hosts_name_for_node(ssh_obj,
+                                                          control_info)
         base_cmd = control_info['cmd_set']['base_cmd']
         cmd_to_exec = cmd_to_exec.replace('{_NodeName_}', node_name)
         cmd_to_exec = cmd_to_exec.replace('{_BaseCmd_}', base_cmd)
-        stdout, stderr = _ssh_execute(ssh_obj, cmd_to_exec)
+        stdout, stderr = _execute_on_domain(ssh_obj, control_info,
+                                            cmd_to_exec)
         return next((dev for dev, hdev in boot_device_map.items()
                      if hdev == stdout), None)
     else:
         raise NotImplementedError()
 
 
-def _set_boot_device(ssh_obj, control_info, device):
+def _set_boot_device(ssh_obj, control_info, device, node_name=None):
     """Set the boot device.
 
     :param ssh_obj: paramiko.SSHClient, an active ssh connection.
     :param control_info: information for accessing the node.
     :param device: the boot device.
+    :param node_name: the name the host uses for the node, looked up if
+        not given.
     :raises: SSHCommandFailed on an error from ssh.
     :raises: NotImplementedError if the virt_type does not support
         setting the boot device.
@@ -190,12 +209,13 @@ def _set_boot_device(ssh_obj, control_info, device):
     """
     cmd_to_exec = control_info['cmd_set'].get('set_boot_device')
     if cmd_to_exec:
-        node_name = _get_hosts_name_for_node(ssh_obj, control_info)
+        node_name = node_name or _get_hosts_name_for_node(ssh_obj,
+                                                          control_info)
         base_cmd = control_info['cmd_set']['base_cmd']
         cmd_to_exec = cmd_to_exec.replace('{_NodeName_}', node_name)
         cmd_to_exec = cmd_to_exec.replace('{_BootDevice_}', device)
         cmd_to_exec = cmd_to_exec.replace('{_BaseCmd_}', base_cmd)
-        _ssh_execute(ssh_obj, cmd_to_exec)
+        _execute_on_domain(ssh_obj, control_info, cmd_to_exec)
     else:
         raise NotImplementedError()
 
@@ -223,6 +243,26 @@ def _ssh_execute(ssh_obj, cmd_to_exec):
     return output_list
 
 
+def _execute_on_domain(ssh_obj, control_info, cmd_to_exec):
+    """Executes a command on the VM found from the MAC index.
+
+    The VM may be renamed or undefined since the index was built, drop the
+    index of the host if the command fails.
+
+    :param ssh_obj: paramiko.SSHClient, an active ssh connection.
+    :param control_info: information for accessing the node.
+    :param cmd_to_exec: command to execute.
+    :returns: list of the lines of output from the command.
+    :raises: SSHCommandFailed on an error from ssh.
+
+    """
+    try:
+        return _ssh_execute(ssh_obj, cmd_to_exec)
+    except exception.SSHCommandFailed:
+        with excutils.save_and_reraise_exception():
+            _DOMAIN_INDEX.invalidate(control_info)
+
+
 def _parse_control_info(node):
     """Gets the information needed for accessing the node.
 
@@ -294,49 +334,153 @@ def _parse_control_info(node):
     return res
 
 
-def _get_power_status(ssh_obj, control_info):
+def _get_running_domains(ssh_obj, control_info):
+    """Returns the names of the VMs running on the host.
+
+    :param ssh_obj: paramiko.SSHClient, an active ssh connection.
+    :param control_info: information for accessing the node.
+    :returns: a set of VM names.
+    :raises: SSHCommandFailed on an error from ssh.
+
+    """
+    cmd_to_exec = "%s %s" % (control_info['cmd_set']['base_cmd'],
+                             control_info['cmd_set']['list_running'])
+    running_list = _ssh_execute(ssh_obj, cmd_to_exec)
+    # Command should return a list of running vms, names can be quoted.
+    return set(name.strip().strip('"') for name in running_list
+               if name.strip())
+
+
+def _get_power_status(ssh_obj, control_info, node_name=None):
     """Returns a node's current power state.
 
     :param ssh_obj: paramiko.SSHClient, an active ssh connection.
     :param control_info: information for accessing the node.
+    :param node_name: the name the host uses for the node, looked up if
+        not given.
     :returns: one of xcat3.common.states POWER_OFF, POWER_ON.
     :raises: NodeNotFound if could not find a VM corresponding to any
         of the provided MACs.
 
     """
-    power_state = None
-    node_name = _get_hosts_name_for_node(ssh_obj, control_info)
-    # Get a list of vms running on the host. If the command supports
-    # it, explicitly specify the desired node."
-    cmd_to_exec = "%s %s" % (control_info['cmd_set']['base_cmd'],
-                             control_info['cmd_set']['list_running'])
-    cmd_to_exec = cmd_to_exec.replace('{_NodeName_}', node_name)
-    running_list = _ssh_execute(ssh_obj, cmd_to_exec)
+    node_name = node_name or _get_hosts_name_for_node(ssh_obj, control_info)
+    # If the current node is not listed then we can assume it is not
+    # powered on.
+    if node_name in _get_running_domains(ssh_obj, control_info):
+        return states.POWER_ON
+    return states.POWER_OFF
+
+
+def _get_domains_by_mac(ssh_obj, control_info):
+    """Get the VM names on the host keyed by their MAC addresses.
+
+    :param ssh_obj: paramiko.SSHClient, an active ssh connection.
+    :param control_info: information for accessing the node.
+    :returns: a dict of normalized MAC address to VM name.
+    :raises: SSHCommandFailed on an error from ssh.
 
-    # Command should return a list of running vms. If the current node is
-    # not listed then we can assume it is not powered on.
-    quoted_node_name = '"%s"' % node_name
-    for node in running_list:
-        if not node:
+    """
+    cmd_to_exec = control_info['cmd_set']['list_macs'].replace(
+        '{_BaseCmd_}', control_info['cmd_set']['base_cmd'])
+    domains = {}
+    for line in _ssh_execute(ssh_obj, cmd_to_exec):
+        line = line.strip()
+        if not line or ' ' not in line:
             continue
+        name, mac = line.rsplit(' ', 1)
+        domains[utils.normalize_mac(mac)] = name
+    LOG.debug("Retrieved VM MAC addresses: %s", repr(domains))
+    return domains
 
-        if (quoted_node_name in node) or (node_name == node):
-            power_state = states.POWER_ON
-            break
-    if not power_state:
-        power_state = states.POWER_OFF
 
-    return power_state
+def _match_domain(domains, macs):
+    """Find the VM name of a node from the MACs of VMs on the host.
 
+    :param domains: a dict returned by _get_domains_by_mac.
+    :param macs: the MAC addresses of the node.
+    :returns: the VM name or None if not found.
+
+    """
+    for node_mac in macs:
+        name = domains.get(utils.normalize_mac(node_mac))
+        if name is not None:
+            LOG.debug("Found Mac address: %s", node_mac)
+            return name
+    return None
 
-def _get_connection(node):
-    """Returns an SSH client connected to a node.
 
-    :param node: the Node.
-    :returns: paramiko.SSHClient, an active ssh connection.
+class DomainIndex(object):
+    """MAC address to VM name index of the hypervisors.
 
+    The index of a host is built with one list_macs command and kept for
+    [ssh]domain_index_ttl seconds. A lookup which misses rebuilds the
+    index of the host, as the VM may be defined after the index was built.
     """
-    return utils.ssh_connect(_parse_control_info(node))
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        # host key -> (domains, refreshed_at)
+        self._index = {}
+
+    def _key_lock(self, key):
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self._key_locks[key] = lock
+            return lock
+
+    def domains(self, ssh_obj, control_info, stale_before=None):
+        """Return the index of the host, build it if it is expired.
+
+        :param ssh_obj: paramiko.SSHClient, an active ssh connection.
+        :param control_info: information for accessing the node.
+        :param stale_before: rebuild the index if it was built before or
+            at this time, the index built meanwhile by others is reused.
+        :returns: (domains, refreshed_at, refreshed) tuple.
+        :raises: SSHCommandFailed on an error from ssh.
+        """
+        key = ssh_session.ConnectionPool.host_key(control_info)
+        with self._key_lock(key):
+            entry = self._index.get(key)
+            now = time.time()
+            if (entry is not None and
+                    now - entry[1] < CONF.ssh.domain_index_ttl and
+                    (stale_before is None or entry[1] > stale_before)):
+                return entry[0], entry[1], False
+            domains = _get_domains_by_mac(ssh_obj, control_info)
+            with self._lock:
+                self._index[key] = (domains, now)
+            return domains, now, True
+
+    def lookup(self, ssh_obj, control_info):
+        """Get the VM name of a node, rebuild the index once on miss.
+
+        :param ssh_obj: paramiko.SSHClient, an active ssh connection.
+        :param control_info: information for accessing the node.
+        :returns: the VM name or None if not found.
+        :raises: SSHCommandFailed on an error from ssh.
+        """
+        domains, stamp, refreshed = self.domains(ssh_obj, control_info)
+        node_name = _match_domain(domains, control_info['macs'])
+        if node_name is None and not refreshed:
+            domains = self.domains(ssh_obj, control_info,
+                                   stale_before=stamp)[0]
+            node_name = _match_domain(domains, control_info['macs'])
+        return node_name
+
+    def invalidate(self, control_info=None):
+        """Drop the index of the host, or of all hosts if not given."""
+        with self._lock:
+            if control_info is None:
+                self._index.clear()
+            else:
+                self._index.pop(
+                    ssh_session.ConnectionPool.host_key(control_info), None)
+
+
+_DOMAIN_INDEX = DomainIndex()
 
 
 def _get_hosts_name_for_node(ssh_obj, control_info):
@@ -355,37 +499,7 @@ def _get_hosts_name_for_node(ssh_obj, control_info):
         retry_on_exception=lambda _: False,  # Do not retry on SSHCommandFailed
         stop_max_attempt_number=3, wait_fixed=3 * 1000)
     def _with_retries():
-        matched_name = None
-        cmd_to_exec = "%s %s" % (control_info['cmd_set']['base_cmd'],
-                                 control_info['cmd_set']['list_all'])
-        full_node_list = _ssh_execute(ssh_obj, cmd_to_exec)
-        LOG.debug("Retrieved Node List: %s", repr(full_node_list))
-        # for each node check Mac Addresses
-        for node in full_node_list:
-            if not node:
-                continue
-            LOG.debug("Checking Node: %s's Mac address.", node)
-            cmd_to_exec = "%s %s" % (control_info['cmd_set']['base_cmd'],
-                                     control_info['cmd_set']['get_node_macs'])
-            cmd_to_exec = cmd_to_exec.replace('{_NodeName_}', node)
-            hosts_node_mac_list = _ssh_execute(ssh_obj, cmd_to_exec)
-
-            for host_mac in hosts_node_mac_list:
-                if not host_mac:
-                    continue
-                for node_mac in control_info['macs']:
-                    if (utils.normalize_mac(host_mac)
-                        in utils.normalize_mac(node_mac)):
-                        LOG.debug("Found Mac address: %s", node_mac)
-                        matched_name = node
-                        break
-
-                if matched_name:
-                    break
-            if matched_name:
-                break
-
-        return matched_name
+        return _DOMAIN_INDEX.lookup(ssh_obj, control_info)
 
     try:
         return _with_retries()
@@ -404,44 +518,46 @@ def _power_on(ssh_obj, control_info):
     :returns: one of xcat3.common.states POWER_ON or ERROR.
 
     """
-    current_pstate = _get_power_status(ssh_obj, control_info)
+    node_name = _get_hosts_name_for_node(ssh_obj, control_info)
+    current_pstate = _get_power_status(ssh_obj, control_info, node_name)
     if current_pstate == states.POWER_ON:
-        _power_off(ssh_obj, control_info)
+        _power_off(ssh_obj, control_info, node_name)
 
-    node_name = _get_hosts_name_for_node(ssh_obj, control_info)
     cmd_to_power_on = "%s %s" % (control_info['cmd_set']['base_cmd'],
                                  control_info['cmd_set']['start_cmd'])
     cmd_to_power_on = cmd_to_power_on.replace('{_NodeName_}', node_name)
 
-    _ssh_execute(ssh_obj, cmd_to_power_on)
+    _execute_on_domain(ssh_obj, control_info, cmd_to_power_on)
 
-    current_pstate = _get_power_status(ssh_obj, control_info)
+    current_pstate = _get_power_status(ssh_obj, control_info, node_name)
     if current_pstate == states.POWER_ON:
         return current_pstate
     else:
         return states.ERROR
 
 
-def _power_off(ssh_obj, control_info):
+def _power_off(ssh_obj, control_info, node_name=None):
     """Power OFF this node.
 
     :param ssh_obj: paramiko.SSHClient, an active ssh connection.
     :param control_info: information for accessing the node.
+    :param node_name: the name the host uses for the node, looked up if
+        not given.
     :returns: one of xcat3.common.states POWER_OFF or ERROR.
 
     """
-    current_pstate = _get_power_status(ssh_obj, control_info)
+    node_name = node_name or _get_hosts_name_for_node(ssh_obj, control_info)
+    current_pstate = _get_power_status(ssh_obj, control_info, node_name)
     if current_pstate == states.POWER_OFF:
         return current_pstate
 
-    node_name = _get_hosts_name_for_node(ssh_obj, control_info)
     cmd_to_power_off = "%s %s" % (control_info['cmd_set']['base_cmd'],
                                   control_info['cmd_set']['stop_cmd'])
     cmd_to_power_off = cmd_to_power_off.replace('{_NodeName_}', node_name)
 
-    _ssh_execute(ssh_obj, cmd_to_power_off)
+    _execute_on_domain(ssh_obj, control_info, cmd_to_power_off)
 
-    current_pstate = _get_power_status(ssh_obj, control_info)
+    current_pstate = _get_power_status(ssh_obj, control_info, node_name)
     if current_pstate == states.POWER_OFF:
         return current_pstate
     else:
@@ -455,9 +571,14 @@ class SSHControl(base.ControlInterface):
     state of virtual machines via SSH.
 
     NOTE: This driver supports VirtualBox and Virsh commands.
-    NOTE: This driver does not currently support multi-node operations.
+    NOTE: Only the power state query is run per hypervisor for multiple
+          nodes, other operations share the pooled SSH connection.
     """
 
+    def __init__(self):
+        super(SSHControl, self).__init__()
+        self._connections = ssh_session.ConnectionPool()
+
     def get_properties(self):
         return COMMON_PROPERTIES
 
@@ -478,7 +599,8 @@ class SSHControl(base.ControlInterface):
                 _("Node %s does not have any nic associated with it."
                   ) % node.name)
         try:
-            _get_connection(node)
+            with self._connections.connection(_parse_control_info(node)):
+                pass
         except exception.SSHConnectFailed as e:
             raise exception.InvalidParameterValue(_("SSH connection cannot"
                                                     " be established: %s") % e)
@@ -509,8 +631,96 @@ class SSHControl(base.ControlInterface):
         """
         control_info = _parse_control_info(node)
         control_info['macs'] = plugin_utils.get_mac_addresses(node)
-        ssh_obj = _get_connection(node)
-        return _get_power_status(ssh_obj, control_info)
+        with self._connections.connection(control_info) as ssh_obj:
+            return _get_power_status(ssh_obj, control_info)
+
+    def _host_power_state(self, group, results):
+        """Query the power state of the nodes on one hypervisor.
+
+        Use the MAC index of the host and list the running VMs once, then
+        answer every node of the group from them.
+
+        :param group: list of (node, control_info) on the same host.
+        :param results: queue to put (node, ok, state_or_exception).
+        """
+        control_info = group[0][1]
+        try:
+            with self._connections.connection(control_info) as ssh_obj:
+                domains, stamp, refreshed = _DOMAIN_INDEX.domains(
+                    ssh_obj, control_info)
+                if not refreshed and any(
+                        _match_domain(domains, info['macs']) is None
+                        for node, info in group):
+                    domains = _DOMAIN_INDEX.domains(
+                        ssh_obj, control_info, stale_before=stamp)[0]
+                running = _get_running_domains(ssh_obj, control_info)
+        except Exception as e:
+            for node, info in group:
+                results.put((node, False, e))
+            return
+
+        for node, info in group:
+            node_name = _match_domain(domains, info['macs'])
+            if node_name is None:
+                results.put((node, False, exception.NodeNotFound(
+                    _("SSH driver was not able to find a VM with any of the "
+                      "specified MACs: %(macs)s for node %(node)s.") %
+                    {'macs': info['macs'], 'node': node.name})))
+            elif node_name in running:
+                results.put((node, True, states.POWER_ON))
+            else:
+                results.put((node, True, states.POWER_OFF))
+
+    def sweep_power_state(self, nodes, spawn, timeout):
+        """Query the power state of nodes grouped by hypervisor
+
+        :param nodes: the nodes to act on.
+        :param spawn: callable to start a function in a conductor worker.
+        :param timeout: seconds to wait for the whole query.
+        :returns: an iterator of (node, ok, state_or_exception) tuples.
+        """
+        errors = []
+        groups = collections.OrderedDict()
+        for node in nodes:
+            try:
+                control_info = _parse_control_info(node)
+                control_info['macs'] = plugin_utils.get_mac_addresses(node)
+                if not control_info['macs']:
+                    raise exception.MissingParameterValue(
+                        _("Node %s does not have any nic associated with "
+                          "it.") % node.name)
+            except Exception as e:
+                errors.append((node, False, e))
+                continue
+            key = ssh_session.ConnectionPool.host_key(control_info)
+            groups.setdefault(key, []).append((node, control_info))
+        return self._sweep(groups, errors, spawn, timeout)
+
+    def _sweep(self, groups, errors, spawn, timeout):
+        for error in errors:
+            yield error
+
+        results = queue.Queue()
+        pending = 0
+        for group in groups.values():
+            try:
+                spawn(self._host_power_state, group, results)
+            except Exception as e:
+                for node, info in group:
+                    yield node, False, e
+                continue
+            pending += len(group)
+
+        deadline = time.time() + timeout
+        while pending:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                yield results.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending -= 1
 
     def set_power_state(self, node, pstate):
         """Turn the power on or off.
@@ -531,20 +741,18 @@ class SSHControl(base.ControlInterface):
         """
         control_info = _parse_control_info(node)
         control_info['macs'] = plugin_utils.get_mac_addresses(node)
-        ssh_obj = _get_connection(node)
-
-        if pstate == states.POWER_ON:
-            state = _power_on(ssh_obj, control_info)
-        elif pstate == states.POWER_OFF:
-            state = _power_off(ssh_obj, control_info)
-        elif pstate == states.REBOOT:
-            state = _power_on(ssh_obj, control_info)
-            pstate = states.POWER_ON
-        else:
+        if pstate not in (states.POWER_ON, states.POWER_OFF, states.REBOOT):
             raise exception.InvalidParameterValue(
                 _("set_power_state called with invalid power state %s."
                   ) % pstate)
 
+        with self._connections.connection(control_info) as ssh_obj:
+            if pstate == states.POWER_OFF:
+                state = _power_off(ssh_obj, control_info)
+            else:
+                state = _power_on(ssh_obj, control_info)
+                pstate = states.POWER_ON
+
         if state != pstate:
             raise exception.PowerStateFailure(pstate=pstate)
 
@@ -572,14 +780,13 @@ class SSHControl(base.ControlInterface):
             raise exception.InvalidParameterValue(_(
                 "Invalid boot device %s specified.") % device)
         control_info['macs'] = plugin_utils.get_mac_addresses(node)
-        ssh_obj = _get_connection(node)
-
-        node_name = _get_hosts_name_for_node(ssh_obj, control_info)
         virt_type = control_info['virt_type']
 
         boot_device_map = _get_boot_device_map(control_info['virt_type'])
         try:
-            _set_boot_device(ssh_obj, control_info, boot_device_map[device])
+            with self._connections.connection(control_info) as ssh_obj:
+                _set_boot_device(ssh_obj, control_info,
+                                 boot_device_map[device])
         except NotImplementedError:
             with excutils.save_and_reraise_exception():
                 LOG.error(_LE("Failed to set boot device for node %(node)s, "
@@ -607,9 +814,10 @@ class SSHControl(base.ControlInterface):
         """
         control_info = _parse_control_info(node)
         control_info['macs'] = plugin_utils.get_mac_addresses(node)
-        ssh_obj = _get_connection(node)
+        response = None
         try:
-            response = _get_boot_device(ssh_obj, control_info)
+            with self._connections.connection(control_info) as ssh_obj:
+                response = _get_boot_device(ssh_obj, control_info)
         except NotImplementedError:
             LOG.warning(_LW("Failed to get boot device for node %(node)s, "
                             "virt_type %(vtype)s does not support this "
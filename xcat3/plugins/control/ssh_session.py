@@ -0,0 +1,92 @@
+# coding=utf-8
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Pool of SSH connections to the hypervisors for the SSH control plugin."""
+
+import contextlib
+
+from oslo_log import log
+
+from xcat3.common import utils
+from xcat3.conf import CONF
+from xcat3.plugins.control import pool
+
+LOG = log.getLogger(__name__)
+
+
+def _credential(control_info):
+    return (control_info.get('password'), control_info.get('key_contents'),
+            control_info.get('key_filename'))
+
+
+class ConnectionPool(pool.IdlePool):
+    """Keep one SSH connection per (host, port, username).
+
+    Unlike IPMI sessions, a paramiko transport multiplexes channels, so the
+    connection is shared by all of the operations on the same hypervisor at
+    the same time. Connections idle longer than
+    [ssh]connection_idle_timeout are closed once nobody uses them.
+    """
+
+    shared = True
+
+    @property
+    def idle_timeout(self):
+        return CONF.ssh.connection_idle_timeout
+
+    @staticmethod
+    def host_key(control_info):
+        """Return the key of the connection used for a node."""
+        return (control_info['host'], control_info.get('port', 22),
+                control_info['username'])
+
+    def _is_healthy(self, ssh_obj):
+        transport = ssh_obj.get_transport()
+        return transport is not None and transport.is_active()
+
+    def _connect(self, key, control_info):
+        return utils.ssh_connect(control_info)
+
+    def _close(self, key, ssh_obj):
+        try:
+            ssh_obj.close()
+        except Exception as e:
+            LOG.debug('Failed to close SSH connection: %s', e)
+
+    @contextlib.contextmanager
+    def connection(self, control_info):
+        """Context manager to get a connected paramiko.SSHClient.
+
+        :param control_info: the parsed control info of a node.
+        :raises: SSHConnectFailed if the connection can not be established.
+        """
+        if not CONF.ssh.connection_pool:
+            ssh_obj = utils.ssh_connect(control_info)
+            try:
+                yield ssh_obj
+            finally:
+                self._close(None, ssh_obj)
+            return
+
+        key = self.host_key(control_info)
+        entry, reused = self._acquire(key, _credential(control_info),
+                                      control_info)
+        try:
+            yield entry.session
+        except Exception:
+            # A failed command does not break the transport, only drop the
+            # connection if the transport is gone.
+            self._release(key, entry, not self._is_healthy(entry.session))
+            raise
+        self._release(key, entry)
@@ -1,6 +1,7 @@
 from oslo_log import log
 from xcat3.common import exception
 from xcat3.plugins.control import ipmi
+from xcat3.plugins.control import openbmc
 from xcat3.plugins.control import ssh
 from xcat3.plugins.boot import petitboot
 from xcat3.plugins.boot import pxe
@@ -15,6 +16,7 @@ class PluginMap(object):
     control_map = dict()
     control_map['ipmi'] = ipmi.IPMIPlugin()
     control_map['kvm'] = ssh.SSHControl()
+    control_map['openbmc'] = openbmc.OPENBMCPlugin()
     boot_map = dict()
     boot_map['pxe'] = pxe.PXEBoot()
     boot_map['petitboot'] = petitboot.Petitboot()
@@ -1,11 +1,9 @@
 # coding=utf-8
 
 import abc
-import jinja2
 import os
 import six
 import shutil
-import weakref
 from oslo_config import cfg
 
 from xcat3.common import utils
@@ -51,12 +49,13 @@ class OSImageInterface(base.BaseInterface):
         pass
 
     @abc.abstractmethod
-    def build_template(self, node, osimage, password):
+    def build_template(self, node, osimage, password, files):
         """Render kickstart template file
 
         :param node: the node to act on.
         :param osimage: osimage object.
         :param password: password for root user
+        :param files: the FileBatch to record the files of the node in.
         :raises: MissingParameterValue if a required parameter is missing.
         """
 
@@ -90,7 +89,6 @@ class BaseOSImage(OSImageInterface):
     def __init__(self):
         self._ensure()
         self.packages = self._get_pkg_list()
-        self.tmpl = None
 
     def validate(self, node, osimage):
         """validate the specific attribute
@@ -108,22 +106,15 @@ class BaseOSImage(OSImageInterface):
         """Return pkg list form pkg template"""
         pass
 
-    def build_template(self, node, osimage, password):
+    def build_template(self, node, osimage, password, files):
         """Render kickstart template file
 
         :param node: the node to act on.
         :param osimage: osimage object.
         :param password: password for root user.
+        :param files: the FileBatch to record the files of the node in.
         :raises: MissingParameterValue if a required parameter is missing.
         """
-        if self.tmpl is None or self.tmpl() is None:
-            template = os.path.join(self.TMPL_DIR, 'compute.tmpl')
-            tmpl_path, tmpl_name = os.path.split(template)
-            loader = jinja2.FileSystemLoader(tmpl_path)
-            env = jinja2.Environment(loader=loader)
-            self.tmpl = weakref.ref(env.get_template(tmpl_name))
-
-        tmpl = self.tmpl()
         opts = {'host_ip': CONF.conductor.host_ip,
                 'mac': node.mac,
                 'install_dir': '/install',
@@ -134,9 +125,9 @@ class BaseOSImage(OSImageInterface):
                 'api_port': CONF.api.port,
                 'node': node.name,
                 }
-        cfg = tmpl.render(opts)
         node_tmpl = os.path.join(AUTOINST_DIR, node.name)
-        utils.write_to_file(node_tmpl, cfg)
+        files.render(node.name, node_tmpl,
+                     os.path.join(self.TMPL_DIR, 'compute.tmpl'), opts)
 
     def clean(self, node):
         """Clean up the files for deploying node"""